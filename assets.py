@@ -0,0 +1,203 @@
+# assets.py
+# Static asset bundles. The stylesheets a page needs are concatenated and minified into one
+# file named after a hash of its content (app.3f9c2a1b7d4e.css), with gzip and brotli copies
+# written next to it. Because the name changes whenever the content does, the bundle is served
+# as immutable with a one-year max-age: a first visit makes one stylesheet request and a repeat
+# visit makes none. Templates ask for a bundle by name and get the current hashed URL:
+#
+#   {{ stylesheet_links("app.css") }}
+#
+# Bundles are built once per deploy: as a build step (python assets.py), by preload() in the
+# serve.py master before it forks, or otherwise on first use. A build only writes files when the
+# content changed, so a read-only file system works once the build step has run. A missing
+# source file is an error, not a silent fallback to one request per stylesheet.
+# The .br copies need the brotli package (pip install brotli); without it only gzip is written.
+
+import argparse
+import gzip
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, Response, abort, request, send_file, url_for
+from markupsafe import Markup, escape
+
+# a year: the longest max-age caches are expected to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+CACHE_CONTROL = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+# precompressed copies, in order of preference
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_STRING_OR_COMMENT = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/""", re.S)
+_STRING = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+
+
+class AssetBundles:
+    """
+    Builds and serves content-hashed CSS bundles for a Flask app.
+
+    bundles maps a bundle name ("app.css") to its source files, relative to
+    source_dir (the app's static folder by default) and in the order the page
+    loaded them. Built files go to <static folder>/<out_dir> and are served
+    under url_prefix.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        bundles: Dict[str, List[str]],
+        source_dir: Optional[str] = None,
+        out_dir: str = "dist",
+        url_prefix: str = "/assets",
+        keep: int = 2
+    ):
+        self.app = app
+        self.bundles = bundles
+        self.source_dir = source_dir or app.static_folder
+        self.out_dir = os.path.join(app.static_folder or "static", out_dir)
+        self.url_prefix = url_prefix
+        # older builds kept per bundle, so pages rendered just before a deploy still get their CSS
+        self.keep = keep
+        # bundle name -> built file name, filled by build()
+        self.built: Dict[str, str] = {}
+        self._build_lock = threading.Lock()
+
+        app.add_url_rule(f"{url_prefix}/<path:filename>", "assets", self.serve)
+        app.add_template_global(self.stylesheet_links, "stylesheet_links")
+
+    def build(self) -> Dict[str, str]:
+        """
+        (Re)build every bundle whose content changed. Returns {bundle name:
+        built file name}. Raises OSError if a source can't be read or the
+        output can't be written.
+        """
+        with self._build_lock:
+            built = {name: self._build(name, sources) for name, sources in self.bundles.items()}
+            self.built = built
+        return dict(built)
+
+    def stylesheet_links(self, name: str) -> Markup:
+        """<link> tag for a bundle's current build (built here if nothing built it yet)."""
+        if name not in self.built:
+            self.build()
+        href = url_for("assets", filename=self.built[name])
+        return Markup('<link rel="stylesheet" href="%s">') % escape(href)
+
+    def resolve(self, filename: str, accept_encoding: str = "") -> Optional[Tuple[str, Optional[str]]]:
+        """
+        (path, content encoding) of the best copy of a built file for a client
+        sending accept_encoding, or None if filename isn't a build on disk.
+        Kept older builds are served too, for pages rendered before a rebuild.
+        """
+        if not any(self._build_name(name).match(filename) for name in self.bundles):
+            return None
+        path = os.path.join(self.out_dir, filename)
+        if not os.path.isfile(path):
+            return None
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        for encoding, suffix in _ENCODINGS:
+            if encoding in accepted and os.path.exists(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+    def serve(self, filename: str) -> Response:
+        found = self.resolve(filename, request.headers.get("Accept-Encoding", ""))
+        if found is None:
+            abort(404)
+        path, encoding = found
+        response = send_file(path, mimetype="text/css", max_age=IMMUTABLE_MAX_AGE, conditional=True, etag=True)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        response.vary.add("Accept-Encoding")
+        return response
+
+    # ===== HELPER METHODS =====
+
+    def _build(self, name: str, sources: List[str]) -> str:
+        parts = []
+        for source in sources:
+            with open(os.path.join(self.source_dir, source), encoding="utf-8") as f:
+                parts.append(f.read())
+        content = minify_css("\n".join(parts)).encode("utf-8")
+
+        stem, ext = os.path.splitext(name)
+        filename = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+        path = os.path.join(self.out_dir, filename)
+        if not os.path.exists(path):
+            os.makedirs(self.out_dir, exist_ok=True)
+            # compressed copies first, so no worker serves the new name without them
+            for encoding, suffix in _ENCODINGS:
+                compressed = _compress(content, encoding)
+                if compressed is not None:
+                    _write(path + suffix, compressed)
+            _write(path, content)
+            print(f"[AssetBundles] built {filename} from {len(sources)} files ({len(content)} bytes)")
+        self._prune(name, filename)
+        return filename
+
+    def _build_name(self, name: str) -> re.Pattern:
+        stem, ext = os.path.splitext(name)
+        return re.compile(rf"{re.escape(stem)}\.[0-9a-f]{{12}}{re.escape(ext)}$")
+
+    def _prune(self, name: str, current: str) -> None:
+        pattern = self._build_name(name)
+        builds = [f for f in os.listdir(self.out_dir) if pattern.match(f) and f != current]
+        builds.sort(key=lambda f: os.path.getmtime(os.path.join(self.out_dir, f)), reverse=True)
+        for old in builds[max(0, self.keep - 1):]:
+            for suffix in ("",) + tuple(suffix for _, suffix in _ENCODINGS):
+                try:
+                    os.remove(os.path.join(self.out_dir, old + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and the whitespace CSS doesn't need; quoted strings are left as they are."""
+    css = _STRING_OR_COMMENT.sub(lambda m: m.group(1) or "", css)
+    parts = _STRING.split(css)
+    # odd indexes are the strings the split kept
+    for i in range(0, len(parts), 2):
+        part = re.sub(r"\s+", " ", parts[i])
+        # not around ":" before a value or "+"/"-": "a :hover" and calc(1px + 2px) need theirs
+        part = re.sub(r" ?([{};,>]) ?", r"\1", part)
+        part = part.replace(": ", ":").replace(";}", "}")
+        parts[i] = part
+    return "".join(parts).strip()
+
+
+def _compress(content: bytes, encoding: str) -> Optional[bytes]:
+    if encoding == "gzip":
+        # mtime=0: the same content always compresses to the same bytes
+        return gzip.compress(content, compresslevel=9, mtime=0)
+    try:
+        import brotli # type: ignore
+    except ImportError:
+        return None
+    return brotli.compress(content, mode=brotli.MODE_TEXT, quality=11)
+
+
+def _write(path: str, data: bytes) -> None:
+    # write then rename, so a worker never serves a half-written file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the app's static asset bundles.")
+    parser.parse_args(argv)
+
+    # only the bundle definitions are needed, not the app's background threads
+    os.environ["APP_PRELOAD"] = "1"
+    import main as app_main
+    for name, filename in app_main.asset_bundles.build().items():
+        print(f"{name}: {filename}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
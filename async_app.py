@@ -0,0 +1,217 @@
+# async_app.py
+# Event-loop front end for the web app. The I/O-bound game routes run as coroutines on
+# aiohttp, so one worker keeps hundreds of Steam lookups in flight without a thread each.
+# Every other route (auth, index, stats) is handed to the Flask app from main.py on a small
+# thread pool and behaves exactly as it does under a WSGI server.
+#
+#   pip install aiohttp
+#   python async_app.py --port 8080
+
+import argparse
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web # type: ignore
+from multidict import CIMultiDict # type: ignore
+
+import main as flask_main
+from assets import CACHE_CONTROL
+from main import split_genres, parse_count, parse_ids
+from package import random_game, steam_game_info
+from package.upstream_guard import UpstreamError
+
+# Threads for the blocking work left: Flask routes, session checks, building the genre index and
+# the sqlite reads/writes of the game store and metadata cache. None of them wait on Steam, so
+# this stays small no matter how many lookups are in flight.
+BLOCKING_WORKERS = 16
+
+AUTH_SERVICE = web.AppKey("auth_service", object)
+
+# hop-by-hop headers are the server's business, and aiohttp sets its own length
+_SKIP_RESPONSE_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length"}
+
+
+@web.middleware
+async def upstream_errors(request, handler):
+    try:
+        return await handler(request)
+    except UpstreamError:
+        # Steam is down/throttling us and nothing usable was cached
+        return web.json_response({"error": "Game service temporarily unavailable"}, status=503)
+
+
+async def random_game_route(request):
+    any_genres = split_genres(request.query.getall("any_genre", []))
+    all_genres = split_genres(request.query.getall("all_genre", []))
+
+    if "count" in request.query:
+        count, error = parse_count(request.query["count"])
+        if error:
+            return web.json_response({"error": error}, status=400)
+        games = await random_game.get_random_games_async(count, any_genres=any_genres, all_genres=all_genres)
+        if not games:
+            return web.json_response({"error": "Game not found"}, status=404)
+        return web.json_response({"games": games, "requested": count})
+
+    game = await random_game.get_random_game_async(any_genres=any_genres, all_genres=all_genres)
+    if not game:
+        if any_genres or all_genres:
+            return web.json_response({"error": "No games match the selected filters"}, status=404)
+        return web.json_response({"error": "Game not found"}, status=404)
+    return web.json_response(game)
+
+
+async def games_bulk_route(request):
+    appids, error = parse_ids(request.query.getall("ids", []))
+    if error:
+        return web.json_response({"error": error}, status=400)
+
+    games, missing, failed = await random_game.get_games_async(appids)
+    return web.json_response({
+        "games": {str(appid): game for appid, game in games.items()},
+        "missing": missing,
+        "failed": failed
+    })
+
+
+async def next_game_route(request):
+    session_token = request.headers.get("X-Session-Token") or request.query.get("session_token")
+    if not session_token:
+        return web.json_response({"error": "session_token is required"}, status=400)
+    # the auth service may hit the database, so it runs on the blocking pool
+    user = await asyncio.to_thread(request.app[AUTH_SERVICE].get_user_from_session, session_token)
+    if not user:
+        return web.json_response({"error": "Invalid or expired session."}, status=401)
+
+    game = await random_game.get_next_game_async(
+        session_token,
+        any_genres=split_genres(request.query.getall("any_genre", [])),
+        all_genres=split_genres(request.query.getall("all_genre", []))
+    )
+    if not game:
+        return web.json_response({"error": "No games match the selected filters"}, status=404)
+    return web.json_response(game)
+
+
+async def game_genres_route(request):
+    index = await random_game.get_genre_index_async()
+    return web.json_response(index.genre_counts())
+
+
+class WSGIFallback:
+    """
+    aiohttp handler that runs a WSGI app on the loop's default executor for everything not served natively.
+
+    Request and response bodies are buffered in memory, not streamed: what comes through here
+    is small JSON and HTML (the stylesheet bundle is served natively). Don't route uploads or
+    large downloads through it.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    async def __call__(self, request):
+        body = await request.read()
+        environ = self._environ(request, body)
+        status, headers, data = await asyncio.get_running_loop().run_in_executor(None, self._run, environ)
+        response_headers = CIMultiDict(
+            (name, value) for name, value in headers if name.lower() not in _SKIP_RESPONSE_HEADERS
+        )
+        return web.Response(status=int(status.split(" ", 1)[0]), headers=response_headers, body=data)
+
+    # ===== HELPER METHODS =====
+
+    def _run(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"], started["headers"] = status, headers
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            data = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return started["status"], started["headers"], data
+
+    def _environ(self, request, body):
+        environ = {
+            "REQUEST_METHOD": request.method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": request.path,
+            "QUERY_STRING": request.query_string,
+            "SERVER_NAME": request.url.host or "localhost",
+            "SERVER_PORT": str(request.url.port or ""),
+            "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+            "REMOTE_ADDR": request.remote or "",
+            "CONTENT_TYPE": request.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": request.scheme,
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name in request.headers.keys():
+            key = "HTTP_" + name.upper().replace("-", "_")
+            if key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH") and key not in environ:
+                environ[key] = ",".join(request.headers.getall(name))
+        return environ
+
+
+async def asset_route(request):
+    found = flask_main.asset_bundles.resolve(request.match_info["filename"], request.headers.get("Accept-Encoding", ""))
+    if found is None:
+        raise web.HTTPNotFound()
+    path, encoding = found
+    headers = {"Content-Type": "text/css", "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return web.FileResponse(path, headers=headers)
+
+
+def create_app(wsgi_app=None, auth_service=None, blocking_workers=BLOCKING_WORKERS):
+    """aiohttp app serving the game routes natively and everything else through wsgi_app (main.py's Flask app by default)."""
+    app = web.Application(middlewares=[upstream_errors])
+    app[AUTH_SERVICE] = auth_service or flask_main.auth_service
+
+    async def on_startup(app):
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=blocking_workers, thread_name_prefix="async-blocking")
+        )
+        # reading games.txt is blocking file I/O; get it done before the first request (no-op if preloaded)
+        await asyncio.to_thread(random_game.game_catalog.load)
+
+    async def on_cleanup(app):
+        await steam_game_info.close_aio_session()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    app.router.add_get("/game/random", random_game_route)
+    app.router.add_get("/games", games_bulk_route)
+    app.router.add_get("/game/next", next_game_route)
+    app.router.add_get("/game/genres", game_genres_route)
+    app.router.add_get(flask_main.asset_bundles.url_prefix + "/{filename}", asset_route)
+    # registered last, so it only sees what the routes above didn't match
+    app.router.add_route("*", "/{tail:.*}", WSGIFallback(wsgi_app or flask_main.app))
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the app on an asyncio event loop.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--blocking-workers", type=int, default=BLOCKING_WORKERS)
+    args = parser.parse_args(argv)
+
+    web.run_app(create_app(blocking_workers=args.blocking_workers), host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,196 @@
+# python file that compares concurrency against memory for one worker process:
+# the threaded WSGI path (main.py's Flask app under werkzeug, a thread per request)
+# against the event-loop path (async_app.py). A stub Steam store with fixed latency
+# answers every upstream call, and every request asks for an app id nobody asked for
+# before, so nothing is served from cache.
+#   python bench/async_concurrency.py --levels 50,200,500 --latency 0.25
+# Linux only (reads the worker's memory and thread count from /proc).
+
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ===== worker side (run as a child process) =====
+
+def serve(mode, port, store_url):
+    sys.path.insert(0, REPO_ROOT)
+    # the game modules import each other as package.* (see tests/conftest.py)
+    package = types.ModuleType("package")
+    package.__path__ = [os.path.join(REPO_ROOT, "repositories")]
+    sys.modules.setdefault("package", package)
+    from package import random_game, steam_game_info
+    steam_game_info.configure_http(store_url=store_url)
+    # measure the request path, not our own politeness towards Steam
+    steam_game_info.configure_upstream(rate=1_000_000, burst=1_000_000)
+    steam_game_info.configure_cache(path=":memory:")
+
+    import main
+    random_game.random_game_buffer.stop()
+    steam_game_info.refresher.stop()
+
+    if mode == "sync":
+        import logging
+        from werkzeug.serving import make_server # type: ignore
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", port, main.app, threaded=True)
+        server.socket.listen(4096)
+        server.serve_forever()
+    else:
+        from aiohttp import web # type: ignore
+        import async_app
+        web.run_app(async_app.create_app(), host="127.0.0.1", port=port, backlog=4096, print=None)
+
+# ===== driver side =====
+
+def start_stub_store(latency):
+    """aiohttp app standing in for store.steampowered.com; every answer takes `latency` seconds."""
+    from aiohttp import web # type: ignore
+
+    async def details(request):
+        await asyncio.sleep(latency)
+        appid = request.query["appids"]
+        return web.json_response({appid: {"success": True, "data": {"name": f"App {appid}", "genres": []}}})
+
+    async def reviews(request):
+        await asyncio.sleep(latency)
+        return web.json_response({"query_summary": {"review_score_desc": "Mostly Positive"}})
+
+    app = web.Application()
+    app.router.add_get("/api/appdetails", details)
+    app.router.add_get("/appreviews/{appid}", reviews)
+    return app
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def proc_status(pid):
+    """(resident MB, thread count) of a process."""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            values[name] = value.split()
+    return int(values["VmRSS"][0]) / 1024, int(values["Threads"][0])
+
+async def wait_until_up(port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"worker did not start listening on port {port}")
+
+async def run_level(session, port, pid, concurrency, appids):
+    """Fire `concurrency` requests at once; returns latencies, errors and peak RSS/threads while they ran."""
+    peak = list(proc_status(pid))
+    done = asyncio.Event()
+
+    async def sample():
+        while not done.is_set():
+            rss, threads = proc_status(pid)
+            peak[0], peak[1] = max(peak[0], rss), max(peak[1], threads)
+            await asyncio.sleep(0.02)
+
+    async def one():
+        started = time.perf_counter()
+        try:
+            async with session.get(f"http://127.0.0.1:{port}/games?ids={next(appids)}") as response:
+                body = await response.json()
+                ok = response.status == 200 and body.get("games")
+        except Exception:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    sampler = asyncio.ensure_future(sample())
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    latencies = sorted(latency for latency, ok in results if ok)
+    return {
+        "ok": len(latencies),
+        "errors": concurrency - len(latencies),
+        "wall": wall,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p99": latencies[int(len(latencies) * 0.99) - 1] if latencies else float("nan"),
+        "rss": peak[0],
+        "threads": peak[1],
+    }
+
+async def bench_mode(mode, levels, store_url, appids):
+    import aiohttp # type: ignore
+    port = free_port()
+    worker = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", mode, "--port", str(port), "--store-url", store_url],
+        cwd=REPO_ROOT, stdout=subprocess.DEVNULL
+    )
+    try:
+        await wait_until_up(port)
+        idle_rss, idle_threads = proc_status(worker.pid)
+        print(f"\n{mode}: idle {idle_rss:.1f} MB, {idle_threads} threads")
+        print(f"{'concurrency':>11} {'ok':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'peak MB':>8} {'threads':>7} {'KB/in-flight':>12}")
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as session:
+            for concurrency in levels:
+                r = await run_level(session, port, worker.pid, concurrency, appids)
+                per_request = (r["rss"] - idle_rss) * 1024 / concurrency
+                print(f"{concurrency:>11} {r['ok']:>6} {r['errors']:>6} {r['ok'] / r['wall']:>8.1f} "
+                      f"{r['p50'] * 1000:>8.0f} {r['p99'] * 1000:>8.0f} {r['rss']:>8.1f} {r['threads']:>7} "
+                      f"{per_request:>12.1f}")
+    finally:
+        worker.terminate()
+        worker.wait()
+
+async def drive(args):
+    from aiohttp import web # type: ignore
+    runner = web.AppRunner(start_stub_store(args.latency))
+    await runner.setup()
+    stub_port = free_port()
+    await web.TCPSite(runner, "127.0.0.1", stub_port, backlog=4096).start()
+    store_url = f"http://127.0.0.1:{stub_port}"
+
+    # fresh app ids for every request across both modes, so no lookup is a cache hit
+    appids = itertools.count(10_000_000)
+    try:
+        for mode in args.modes:
+            await bench_mode(mode, args.levels, store_url, appids)
+    finally:
+        await runner.cleanup()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrency vs memory per worker: threaded WSGI vs asyncio.")
+    parser.add_argument("--levels", default="50,200,500",
+                        type=lambda value: [int(v) for v in value.split(",")],
+                        help="comma-separated numbers of simultaneous requests")
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds the stub store takes per call")
+    parser.add_argument("--modes", default="sync,async", type=lambda value: value.split(","))
+    parser.add_argument("--serve", choices=["sync", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--store-url", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.port, args.store_url)
+        return 0
+    asyncio.run(drive(args))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+# python file that measures how long a fresh interpreter takes to import main.py
+# run it on two checkouts (or before/after building games.bin) to compare:
+#   python bench/startup_time.py --runs 10 --top 15
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the game modules import each other as package.*; register that name over the checkout's
+# repositories/ the way tests/conftest.py does, so `import main` works from a plain checkout
+PACKAGE_ALIAS = (
+    "import os, sys, types; "
+    "package = types.ModuleType('package'); "
+    "package.__path__ = [os.path.join(os.getcwd(), 'repositories')]; "
+    "sys.modules.setdefault('package', package); "
+)
+
+# time the import alone: without it main starts its background threads, which go on to
+# open the stores and call Steam while the timed process is exiting
+CHILD_ENV = dict(os.environ, APP_PRELOAD="1")
+
+def time_import(module, runs, cwd):
+    """Wall-clock seconds for `python -c 'import <module>'`, one fresh process per run."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", PACKAGE_ALIAS + f"import {module}"], cwd=cwd, env=CHILD_ENV,
+                       check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def import_breakdown(module, cwd, top):
+    """Slowest imports by cumulative time, parsed from `python -X importtime`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PACKAGE_ALIAS + f"import {module}"], cwd=cwd,
+                            env=CHILD_ENV, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure interpreter start + import time of the web app.")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="how many slow imports to list (0 to skip)")
+    parser.add_argument("--cwd", default=REPO_ROOT)
+    args = parser.parse_args(argv)
+
+    baseline = time_import("sys", args.runs, args.cwd)
+    samples = time_import(args.module, args.runs, args.cwd)
+    print(f"bare interpreter : median {statistics.median(baseline) * 1000:8.1f} ms")
+    print(f"import {args.module:<10}: median {statistics.median(samples) * 1000:8.1f} ms, "
+          f"min {min(samples) * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms ({args.runs} runs)")
+
+    if args.top:
+        print("\nslowest imports (cumulative):")
+        for cumulative_us, name in import_breakdown(args.module, args.cwd, args.top):
+            print(f"{cumulative_us / 1000:8.1f} ms  {name}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
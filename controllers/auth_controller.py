@@ -11,6 +11,8 @@ from services.auth_service import (
     TokenExpiredError,
     UserNotFoundError
 )
+from services.password_hasher import HasherBusyError
+from services.login_throttle import LoginThrottledError
 
 class AuthController:
     def __init__(self, auth_service: AuthService):
@@ -43,10 +45,12 @@ class AuthController:
             return {"error": str(e)}, 409
         except GamerTagAlreadyExistsError as e:
             return {"error": str(e)}, 409
+        except HasherBusyError as e:
+            return {"error": str(e)}, 503
         except Exception:
             return {"error": "Internal server error"}, 500
 
-    def sign_in(self, data):
+    def sign_in(self, data, client_ip=None):
         try:
             email = data.get("email")
             password = data.get("password")
@@ -54,7 +58,7 @@ class AuthController:
             if not email or not password:
                 return {"error": "email and password are required"}, 400
 
-            user, session = self.auth_service.login(email, password, require_verification=False)
+            user, session = self.auth_service.login(email, password, require_verification=False, client_ip=client_ip)
 
             return {
                 "session_token": session.token,
@@ -71,6 +75,10 @@ class AuthController:
             return {"error": str(e)}, 401
         except AccountNotVerifiedError as e:
             return {"error": str(e)}, 403
+        except LoginThrottledError as e:
+            return {"error": str(e), "retry_after": e.retry_after}, 429
+        except HasherBusyError as e:
+            return {"error": str(e)}, 503
         except Exception:
             return {"error": "Internal server error"}, 500
 
@@ -176,5 +184,7 @@ class AuthController:
             return {"error": str(e)}, 400
         except WeakPasswordError as e:
             return {"error": str(e)}, 400
+        except HasherBusyError as e:
+            return {"error": str(e)}, 503
         except Exception:
             return {"error": "Internal server error"}, 500
\ No newline at end of file
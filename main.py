@@ -1,21 +1,53 @@
 # main.py
+import hmac
+import os
+import time
+from functools import wraps
 from flask import Flask, render_template, jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Random game import from your 'package' folder
+from package import random_game
 from package.random_game import get_random_game
+from package import steam_game_info
+from package.upstream_guard import UpstreamError
 
-# Auth layers from your folders (production: use real MySQL repository)
+# Auth layers from your folders (production: use the MySQL backend)
 from controllers.auth_controller import AuthController
 from services.auth_service import AuthService
 from services.email_service import EmailService
-from repositories.user_repository import UserRepository
+from services.email_queue import EmailQueue
+from services.session_cache import SessionCache
+from services.session_sweeper import SessionSweeper
+from services.password_hasher import PasswordHasher
+from services.login_throttle import LoginThrottle
+from services.session_tokens import SessionTokens
+from repositories.user_store import create_user_store
+from assets import AssetBundles
 
 app = Flask(__name__)
 
+# How many reverse proxies (nginx, a load balancer) sit in front of the app. With N > 0 the client
+# address (request.remote_addr, which the sign-in throttle limits) is read from the N-th
+# X-Forwarded-For entry from the right; with 0 the header is ignored, since clients can set it freely
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", "0"))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+# Importing this module starts the background threads (start_background()) unless APP_PRELOAD=1:
+# serve.py imports the app once in a master process, forks workers and starts them in each worker.
+PRELOAD = os.environ.get("APP_PRELOAD") == "1"
+
 # =======================
 # Dependency Injection (Production)
 # =======================
 
+# index.html's stylesheets (kept next to it in repositories/), served as one minified,
+# content-hashed bundle. Built by preload(), by "python assets.py", or on first use.
+asset_bundles = AssetBundles(app, {
+    "app.css": ["base.css", "layout.css", "header.css", "gamecard.css", "filters.css", "button.css"],
+}, source_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), "repositories"))
+
 # Fill these in with your real DB credentials and name
 conn_params = {
     "host": "127.0.0.1",
@@ -24,27 +56,243 @@ conn_params = {
     "database": "project_326"  # TODO: set your DB name
 }
 
-user_repo = UserRepository(conn_params)
+# User/session storage backend:
+#   "mysql"  - production
+#   "sqlite" - single-node deployments; path can be ":memory:"
+#   "memory" - benchmarks and load tests without a database server (nothing is persisted)
+# MySQL schema changes ship as migrations: python -m repositories.user_schema migrate (sqlite migrates on startup)
+USER_STORE = "mysql"
+user_store_options = {
+    # Pooled connections: size it below MySQL's max_connections divided by the number of workers
+    "mysql": {"conn_params": conn_params, "pool_size": 10, "max_lifetime": 30 * 60, "acquire_timeout": 5.0},
+    "sqlite": {"path": "users.db"},
+    "memory": {},
+}
+user_repo = create_user_store(USER_STORE, **user_store_options[USER_STORE])
+# Outbound email: durable sqlite outbox drained by background SMTP senders.
+# Set SMTP_HOST to turn it on (e.g. a local sink: python -m aiosmtpd -n -l localhost:1025);
+# without it, emails are only printed.
+email_outbox = None
+if os.environ.get("SMTP_HOST"):
+    email_outbox = EmailQueue(
+        path="email_outbox.db",
+        smtp_host=os.environ["SMTP_HOST"],
+        smtp_port=int(os.environ.get("SMTP_PORT", "25")),
+        username=os.environ.get("SMTP_USER"),
+        password=os.environ.get("SMTP_PASSWORD"),
+        starttls=os.environ.get("SMTP_STARTTLS") == "1",
+        workers=2,
+        batch_size=20,
+    )
 # Base URL used in EmailService to build verification/reset links printed/sent
-email_service = EmailService(base_url="http://localhost:5000")
-auth_service = AuthService(user_repo, email_service)
+email_service = EmailService(base_url="http://localhost:5000", outbox=email_outbox)
+# Token -> user cache so session checks on hot routes skip MySQL entirely. A signout only
+# invalidates this process's copy, so with several workers the TTL is how long another worker
+# may still accept a signed-out database session; after_fork shortens it to SHARED_SESSION_CACHE_TTL
+session_cache = SessionCache(max_entries=50_000, ttl=60)
+SHARED_SESSION_CACHE_TTL = 5
+# bcrypt off the request threads: a burst of sign-ins queues here (bounded) and then gets 503s.
+# The cost is pinned so every process hashes to the same one; lower-cost hashes are upgraded in
+# the background on login. Measure it for your hardware once: python -m services.password_hasher
+password_hasher = PasswordHasher(workers=4, max_queue=32, rounds=int(os.environ.get("BCRYPT_ROUNDS", "12")))
+# Sign-in attempts over these limits get a 429 before any database lookup or bcrypt check
+login_throttle = LoginThrottle(ip_limit=30, ip_window=60, email_limit=5, email_window=5 * 60, max_keys=100_000)
+# Session mode:
+#   "database" - random tokens looked up in the sessions table
+#   "signed"   - HMAC-signed tokens checked without the database; needs SESSION_SECRET set
+#                (the same value on every worker) and the revoked_tokens migration
+SESSION_MODE = "database"
+session_tokens = None
+if SESSION_MODE == "signed":
+    session_tokens = SessionTokens(os.environ.get("SESSION_SECRET", ""), user_repo, refresh_interval=5)
+auth_service = AuthService(
+    user_repo, email_service,
+    session_cache=session_cache, password_hasher=password_hasher, login_throttle=login_throttle,
+    session_tokens=session_tokens
+)
 auth_controller = AuthController(auth_service)
 
+# Expired sessions are deleted here in small batches instead of on every login
+session_sweeper = SessionSweeper(
+    user_repo, interval=5 * 60, batch_size=1000, sweep_revocations=session_tokens is not None
+)
+
+def start_background():
+    """Start this process's background threads."""
+    if email_outbox:
+        email_outbox.start()
+    if session_tokens:
+        session_tokens.start()
+    session_sweeper.start()
+    # Background stale-while-revalidate refresh of cached Steam metadata
+    steam_game_info.start_refresher()
+    # Keep a buffer of pre-resolved games so /game/random never waits on Steam
+    random_game.start_buffer(low_watermark=8, high_watermark=32)
+
+def stop_background(timeout=5.0):
+    """Stop the background threads, letting each finish the batch it is working on."""
+    random_game.random_game_buffer.stop(timeout)
+    steam_game_info.refresher.stop(timeout)
+    session_sweeper.stop(timeout)
+    if session_tokens:
+        session_tokens.stop(timeout)
+    if email_outbox:
+        email_outbox.stop(timeout)
+
+def preload():
+    """Load the read-only data once, before forking, so every worker shares it copy-on-write."""
+    asset_bundles.build()
+    random_game.game_catalog.load()
+    steam_game_info.game_cache.warm()
+    random_game.get_genre_index()
+
+def after_fork(workers=1):
+    """
+    In a forked worker: its own database handles, its share of the Steam request budget
+    and, next to other workers, a session cache TTL short enough for their signouts.
+    """
+    user_repo.after_fork()
+    if email_outbox:
+        email_outbox.after_fork()
+    steam_game_info.after_fork(share=1 / workers)
+    random_game.after_fork()
+    if workers > 1 and session_tokens is None:
+        # signed tokens are checked against the shared revocation list before the cache;
+        # database sessions aren't, so keep another worker's signout from going unseen for long
+        session_cache.ttl = min(session_cache.ttl, SHARED_SESSION_CACHE_TTL)
+
+def warm_up(timeout=10.0):
+    """Wait (up to timeout) for the random game buffer to fill before taking traffic. Returns its size."""
+    buffer = random_game.random_game_buffer
+    deadline = time.monotonic() + timeout
+    while buffer.running and len(buffer) < buffer.low_watermark and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return len(buffer)
+
+if not PRELOAD:
+    start_background()
+
 # =======================
 # Routes
 # =======================
 
+# The stats routes expose internals (pools, queues, breaker state): they only answer requests
+# with an X-Admin-Token header matching ADMIN_TOKEN, and look like any unknown URL otherwise
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+def admin_only(view):
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        token = request.headers.get("X-Admin-Token", "")
+        if not ADMIN_TOKEN or not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+            return jsonify({"error": "Not found"}), 404
+        return view(*args, **kwargs)
+    return guarded
+
+@app.errorhandler(UpstreamError)
+def upstream_unavailable(e):
+    # Steam is down/throttling us and nothing usable was cached
+    return jsonify({"error": "Game service temporarily unavailable"}), 503
+
 @app.route("/")
 def index():
     return render_template("index.html")
 
+# Query parsing shared with the async game routes in async_app.py
+
+def split_genres(values):
+    # accepts ?any_genre=Action&any_genre=RPG as well as ?any_genre=Action,RPG
+    return [g.strip() for value in values for g in value.split(",") if g.strip()]
+
+def parse_count(value):
+    """(count, error message) for ?count=."""
+    try:
+        count = int(value)
+    except ValueError:
+        return None, "count must be an integer"
+    if not 1 <= count <= random_game.MAX_BATCH:
+        return None, f"count must be between 1 and {random_game.MAX_BATCH}"
+    return count, None
+
+def parse_ids(values):
+    """(app ids, error message) for ?ids=."""
+    try:
+        appids = [int(i) for value in values for i in value.split(",") if i.strip()]
+    except ValueError:
+        return None, "ids must be comma-separated integers"
+    if not appids:
+        return None, "ids is required"
+    if len(appids) > random_game.MAX_BATCH:
+        return None, f"at most {random_game.MAX_BATCH} ids per request"
+    return appids, None
+
+def _genre_args(name):
+    return split_genres(request.args.getlist(name))
+
 @app.get("/game/random")
 def random_game_route():
-    game = get_random_game()
+    any_genres = _genre_args("any_genre")
+    all_genres = _genre_args("all_genre")
+
+    count = request.args.get("count")
+    if count is not None:
+        count, error = parse_count(count)
+        if error:
+            return jsonify({"error": error}), 400
+        games = random_game.get_random_games(count, any_genres=any_genres, all_genres=all_genres)
+        if not games:
+            return jsonify({"error": "Game not found"}), 404
+        return jsonify({"games": games, "requested": count}), 200
+
+    game = get_random_game(any_genres=any_genres, all_genres=all_genres)
     if not game:
+        if any_genres or all_genres:
+            return jsonify({"error": "No games match the selected filters"}), 404
         return jsonify({"error": "Game not found"}), 404
     return jsonify(game), 200
 
+@app.get("/games")
+def games_bulk_route():
+    appids, error = parse_ids(request.args.getlist("ids"))
+    if error:
+        return jsonify({"error": error}), 400
+
+    games, missing, failed = random_game.get_games(appids)
+    return jsonify({
+        "games": {str(appid): game for appid, game in games.items()},
+        "missing": missing,
+        "failed": failed
+    }), 200
+
+@app.get("/game/next")
+def next_game_route():
+    session_token = request.headers.get("X-Session-Token") or request.args.get("session_token")
+    if not session_token:
+        return jsonify({"error": "session_token is required"}), 400
+    if not auth_service.get_user_from_session(session_token):
+        return jsonify({"error": "Invalid or expired session."}), 401
+
+    any_genres = _genre_args("any_genre")
+    all_genres = _genre_args("all_genre")
+    game = random_game.get_next_game(session_token, any_genres=any_genres, all_genres=all_genres)
+    if not game:
+        return jsonify({"error": "No games match the selected filters"}), 404
+    return jsonify(game), 200
+
+@app.get("/game/genres")
+def game_genres_route():
+    return jsonify(random_game.get_genre_index().genre_counts()), 200
+
+@app.get("/game/cache/stats")
+@admin_only
+def game_cache_stats_route():
+    stats = steam_game_info.game_cache.stats()
+    stats["refresher"] = steam_game_info.refresher.stats()
+    stats["buffer"] = random_game.random_game_buffer.stats()
+    stats["upstream"] = steam_game_info.upstream.stats()
+    stats["dead_apps"] = steam_game_info.dead_apps.stats()
+    return jsonify(stats), 200
+
 # --------- Auth Routes (Production) ----------
 
 @app.post("/api/auth/signup")
@@ -56,7 +304,9 @@ def signup():
 @app.post("/api/auth/signin")
 def signin():
     body = request.get_json(force=True, silent=True) or {}
-    payload, status = auth_controller.sign_in(body)
+    payload, status = auth_controller.sign_in(body, client_ip=request.remote_addr)
+    if status == 429:
+        return jsonify(payload), status, {"Retry-After": str(payload["retry_after"])}
     return jsonify(payload), status
 
 @app.post("/api/auth/signout")
@@ -87,9 +337,29 @@ def reset_password():
     payload, status = auth_controller.reset_password(body)
     return jsonify(payload), status
 
+@app.get("/api/auth/hasher/stats")
+@admin_only
+def password_hasher_stats():
+    stats = password_hasher.stats()
+    stats["login_throttle"] = login_throttle.stats()
+    return jsonify(stats), 200
+
+@app.get("/api/db/pool/stats")
+@admin_only
+def db_pool_stats():
+    stats = user_repo.pool_stats()
+    stats["session_sweeper"] = session_sweeper.stats()
+    if session_tokens:
+        stats["session_tokens"] = session_tokens.stats()
+    if email_outbox:
+        stats["email_outbox"] = email_outbox.stats()
+    return jsonify(stats), 200
+
 # =======================
 
 if __name__ == "__main__":
     # Dependencies:
     #   pip install flask bcrypt mysql-connector-python
+    # The game routes can also run on an event loop (pip install aiohttp): python async_app.py
+    # Production (preloaded master + forked workers): python serve.py
     app.run(debug=True)
\ No newline at end of file
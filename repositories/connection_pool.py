@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+class PoolTimeoutError(Exception): pass
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of database connections.
+
+    - connect(): opens a new raw connection
+    - is_healthy(conn): checked before handing out a connection that sat idle
+      longer than check_idle_after seconds
+    - reset(conn): run when a connection comes back, e.g. to roll back an
+      open read transaction so the next user doesn't see a stale snapshot
+
+    Connections older than max_lifetime are closed and replaced instead of
+    being reused. acquire waits up to acquire_timeout for a free connection
+    and then raises PoolTimeoutError.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        size: int = 10,
+        max_lifetime: float = 30 * 60,
+        acquire_timeout: float = 5.0,
+        check_idle_after: float = 30.0,
+        is_healthy: Optional[Callable[[Any], bool]] = None,
+        reset: Optional[Callable[[Any], None]] = None,
+    ):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self._connect = connect
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.acquire_timeout = acquire_timeout
+        self.check_idle_after = check_idle_after
+        self._is_healthy = is_healthy
+        self._reset = reset
+
+        self._idle = deque()
+        self._open = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "acquired": 0, "waited": 0, "timeouts": 0, "created": 0, "closed": 0,
+            "failed_health_checks": 0, "expired": 0, "wait_seconds": 0.0, "max_in_use": 0
+        }
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... -- the connection goes back to the pool afterwards."""
+        pooled = self.acquire()
+        broken = False
+        try:
+            yield pooled.conn
+        except BaseException:
+            broken = not self._rollback_quietly(pooled.conn)
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def acquire(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.acquire_timeout
+        waited_from = None
+        with self._cond:
+            while True:
+                pooled = self._idle.pop() if self._idle else None
+                if pooled is not None or self._open < self.size:
+                    # reserve the slot before doing any I/O outside the lock
+                    if pooled is None:
+                        self._open += 1
+                    self._mark_acquired(waited_from)
+                    break
+
+                if waited_from is None:
+                    waited_from = time.monotonic()
+                    self._stats["waited"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available within {self.acquire_timeout}s (pool size {self.size})."
+                    )
+                self._cond.wait(remaining)
+
+        try:
+            if pooled is not None:
+                pooled = self._validate(pooled)
+            if pooled is None:
+                pooled = self._open_new()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return pooled
+
+    def release(self, pooled: _PooledConnection, broken: bool = False) -> None:
+        if not broken and self._reset is not None:
+            try:
+                self._reset(pooled.conn)
+            except Exception:
+                broken = True
+
+        expired = time.monotonic() - pooled.created_at > self.max_lifetime
+        if broken or expired:
+            self._close(pooled, "expired" if expired and not broken else None)
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._in_use -= 1
+            self._cond.notify()
+
+    def after_fork(self) -> None:
+        """
+        In a forked worker: forget the parent's connections without closing
+        them (closing would end the session for the parent too).
+        """
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._open = 0
+        self._in_use = 0
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for pooled in idle:
+            self._close(pooled)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "saturation": self._in_use / self.size,
+            })
+        stats["wait_seconds"] = round(stats["wait_seconds"], 6)
+        return stats
+
+    # ===== HELPER METHODS =====
+
+    def _mark_acquired(self, waited_from: Optional[float]) -> None:
+        self._in_use += 1
+        self._stats["acquired"] += 1
+        self._stats["max_in_use"] = max(self._stats["max_in_use"], self._in_use)
+        if waited_from is not None:
+            self._stats["wait_seconds"] += time.monotonic() - waited_from
+
+    def _validate(self, pooled: _PooledConnection) -> Optional[_PooledConnection]:
+        """Returns the connection if it is still usable, otherwise closes it and returns None."""
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime:
+            self._close(pooled, "expired")
+            return None
+        if self._is_healthy is not None and now - pooled.last_used > self.check_idle_after:
+            try:
+                healthy = self._is_healthy(pooled.conn)
+            except Exception:
+                healthy = False
+            if not healthy:
+                self._close(pooled, "failed_health_checks")
+                return None
+        return pooled
+
+    def _open_new(self) -> _PooledConnection:
+        pooled = _PooledConnection(self._connect())
+        with self._cond:
+            self._stats["created"] += 1
+        return pooled
+
+    def _close(self, pooled: _PooledConnection, reason: Optional[str] = None) -> None:
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["closed"] += 1
+            if reason:
+                self._stats[reason] += 1
+
+    def _rollback_quietly(self, conn) -> bool:
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
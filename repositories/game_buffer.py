@@ -0,0 +1,131 @@
+# python file that keeps a ring buffer of already-resolved random games
+# a background producer tops it up so /game/random just pops a ready payload
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+
+class RandomGameBuffer:
+    """
+    Bounded FIFO of known-good game payloads.
+
+    The producer thread refills the buffer up to high_watermark whenever it
+    drops below low_watermark. pop() is O(1) and never touches the network;
+    it returns None on an underrun so the caller can resolve a game inline.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[], Optional[dict]],
+        low_watermark: int = 8,
+        high_watermark: int = 32,
+        failure_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        if not 0 <= low_watermark < high_watermark:
+            raise ValueError("need 0 <= low_watermark < high_watermark")
+        self.resolve = resolve
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.failure_backoff = failure_backoff
+        self.max_backoff = max_backoff
+
+        self._games = deque(maxlen=high_watermark)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._stats = {"pops": 0, "underruns": 0, "produced": 0, "resolve_failures": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> "RandomGameBuffer":
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._produce, name="random-game-buffer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def pop(self) -> Optional[dict]:
+        with self._cond:
+            return self._pop()
+
+    def try_pop(self) -> Optional[dict]:
+        """
+        pop() for an event loop: never waits for the lock. If the producer
+        holds it right now, this counts as an underrun and returns None.
+        """
+        if not self._cond.acquire(blocking=False):
+            return None
+        try:
+            return self._pop()
+        finally:
+            self._cond.release()
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = len(self._games)
+        stats["low_watermark"] = self.low_watermark
+        stats["high_watermark"] = self.high_watermark
+        stats["running"] = self._running
+        return stats
+
+    # ===== HELPER METHODS =====
+
+    def _pop(self) -> Optional[dict]:
+        self._stats["pops"] += 1
+        if not self._games:
+            self._stats["underruns"] += 1
+            self._cond.notify()
+            return None
+        game = self._games.popleft()
+        if len(self._games) < self.low_watermark:
+            self._cond.notify()
+        return game
+
+    def _produce(self) -> None:
+        failures = 0
+        while True:
+            with self._cond:
+                while self._running and len(self._games) >= self.low_watermark:
+                    self._cond.wait()
+                if not self._running:
+                    return
+
+            # fill all the way to the high watermark, one resolved game at a time
+            while self._running and len(self._games) < self.high_watermark:
+                try:
+                    game = self.resolve()
+                except Exception:
+                    game = None
+
+                if game is None:
+                    # a single dead app id is normal; back off only when upstream keeps failing
+                    with self._cond:
+                        self._stats["resolve_failures"] += 1
+                    failures += 1
+                    if failures >= 3:
+                        time.sleep(min(self.max_backoff, self.failure_backoff * 2 ** (failures - 3)))
+                    continue
+
+                failures = 0
+                with self._cond:
+                    self._games.append(game)
+                    self._stats["produced"] += 1
@@ -0,0 +1,286 @@
+# python file that caches steam game info so repeat lookups skip the network
+# keeps a small in-memory LRU tier in front of a sqlite file that survives restarts
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class GameInfoCache:
+    """
+    Read-through cache for Steam store lookups.
+
+    Keys are tuples such as ("details", appid, cc, lang). Every entry carries
+    its own TTL so callers can expire review summaries faster than the
+    name/genres/price block. An entry past its TTL can still be served as
+    stale for another `stale_ttl` seconds while it is being refreshed.
+    """
+
+    def __init__(self, path: str = "steam_cache.db", max_entries: int = 2048):
+        self.path = path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        # opened on first use, so importing the app doesn't create the file
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Any]:
+        """Return the cached value for key, or None if it is missing or past its TTL."""
+        value, fresh = self.lookup(key)
+        return value if fresh else None
+
+    def lookup(self, key: tuple) -> Tuple[Optional[Any], bool]:
+        """
+        Return (value, fresh). A stale-but-servable entry comes back as
+        (value, False); a missing or fully expired one as (None, False).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at, stale_until = entry
+                if stale_until > now:
+                    self._memory.move_to_end(key)
+                    fresh = expires_at > now
+                    self._stats["hits" if fresh else "stale_hits"] += 1
+                    return value, fresh
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            row = self._db.execute(
+                "SELECT value, expires_at, stale_until FROM game_cache WHERE key = ?",
+                (self._disk_key(key),)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None, False
+
+            expires_at = row[1]
+            stale_until = row[2] if row[2] is not None else expires_at
+            if stale_until <= now:
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None, False
+
+            value = json.loads(row[0])
+            self._remember(key, value, expires_at, stale_until)
+            fresh = expires_at > now
+            self._stats["disk_hits" if fresh else "stale_hits"] += 1
+            return value, fresh
+
+    def warm(self, limit: Optional[int] = None) -> int:
+        """
+        Load the most recently stored, still servable disk entries into the
+        memory tier (at most max_entries). Returns how many were loaded.
+        """
+        limit = min(limit or self.max_entries, self.max_entries)
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value, expires_at, stale_until FROM game_cache"
+                " WHERE COALESCE(stale_until, expires_at) > ? ORDER BY expires_at DESC LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            # oldest first, so the newest entries end up most recently used
+            for disk_key, value, expires_at, stale_until in reversed(rows):
+                self._remember(self._memory_key(disk_key), json.loads(value), expires_at, stale_until or expires_at)
+        return len(rows)
+
+    def after_fork(self) -> None:
+        """In a forked worker: drop the inherited connection so the next use opens its own; a SQLite handle must not be used on both sides of a fork."""
+        if self.path != ":memory:":
+            self._connection = None
+
+    def set(self, key: tuple, value: Any, ttl: float, stale_ttl: float = 0) -> None:
+        """Store value under key in both tiers: fresh for ttl seconds, servable as stale for stale_ttl more."""
+        expires_at = time.time() + ttl
+        stale_until = expires_at + stale_ttl
+        with self._lock:
+            self._remember(key, value, expires_at, stale_until)
+            self._db.execute(
+                "INSERT OR REPLACE INTO game_cache (key, value, expires_at, stale_until) VALUES (?, ?, ?, ?)",
+                (self._disk_key(key), json.dumps(value), expires_at, stale_until)
+            )
+            self._db.commit()
+
+    def invalidate(self, key: tuple) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute("DELETE FROM game_cache WHERE key = ?", (self._disk_key(key),))
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM game_cache")
+            self._db.commit()
+
+    def expiring(self, before: float) -> List[Tuple[tuple, float]]:
+        """(key, expires_at) for hot (memory tier) entries whose TTL ends before the given timestamp."""
+        with self._lock:
+            return [
+                (key, expires_at)
+                for key, (_, expires_at, stale_until) in self._memory.items()
+                if expires_at < before and stale_until > time.time()
+            ]
+
+    def stats(self) -> dict:
+        """Hit/miss counters plus the current size of the memory tier."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        served = stats["hits"] + stats["disk_hits"] + stats["stale_hits"]
+        lookups = served + stats["misses"]
+        stats["hit_rate"] = served / lookups if lookups else 0.0
+        return stats
+
+    # ===== HELPER METHODS =====
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._connect()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS game_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " stale_until REAL)"
+        )
+        columns = {row[1] for row in db.execute("PRAGMA table_info(game_cache)")}
+        if "stale_until" not in columns:
+            db.execute("ALTER TABLE game_cache ADD COLUMN stale_until REAL")
+        db.commit()
+        return db
+
+    def _remember(self, key: tuple, value: Any, expires_at: float, stale_until: float) -> None:
+        self._memory[key] = (value, expires_at, stale_until)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_key(self, key: tuple) -> str:
+        return ":".join(str(part) for part in key)
+
+    def _memory_key(self, disk_key: str) -> tuple:
+        # inverse of _disk_key for the keys we store: ("details", appid, cc, lang) and the like
+        return tuple(int(part) if part.isdigit() else part for part in disk_key.split(":"))
+
+
+class DeadAppCache:
+    """
+    Negative cache for app ids Steam reports as unavailable (delisted or
+    region-locked for a country code).
+
+    A dead app is skipped for a backoff window that doubles with every
+    failed re-probe, from base_ttl up to max_ttl. Once the window has passed
+    the app is eligible again, so the next lookup re-probes it.
+    """
+
+    def __init__(self, path: str = "steam_cache.db", base_ttl: float = 60 * 60, max_ttl: float = 7 * 24 * 60 * 60):
+        self.path = path
+        self.base_ttl = base_ttl
+        self.max_ttl = max_ttl
+        self._lock = threading.Lock()
+        self._stats = {"skipped": 0, "marked": 0, "revived": 0}
+        # the file is opened and read on first use, so importing the app doesn't create it
+        self._connection: Optional[sqlite3.Connection] = None
+        self._entries: Optional[Dict[Tuple[int, str], Tuple[int, float]]] = None
+        self._open_lock = threading.Lock()
+
+    def is_dead(self, appid: int, cc: str = "us") -> bool:
+        """True while the app is inside its backoff window (a lookup would be wasted)."""
+        entry = self._dead.get((appid, cc))
+        return entry is not None and entry[1] > time.time()
+
+    def should_skip(self, appid: int, cc: str = "us") -> bool:
+        """is_dead() for the lookup path; counts the upstream call it saves."""
+        if not self.is_dead(appid, cc):
+            return False
+        with self._lock:
+            self._stats["skipped"] += 1
+        return True
+
+    def mark_dead(self, appid: int, cc: str = "us") -> float:
+        """Record a success: false answer; returns when the app should be probed again."""
+        with self._lock:
+            failures = self._dead.get((appid, cc), (0, 0.0))[0] + 1
+            retry_at = time.time() + min(self.max_ttl, self.base_ttl * 2 ** (failures - 1))
+            self._dead[(appid, cc)] = (failures, retry_at)
+            self._stats["marked"] += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO dead_apps (appid, cc, failures, retry_at) VALUES (?, ?, ?, ?)",
+                (appid, cc, failures, retry_at)
+            )
+            self._db.commit()
+        return retry_at
+
+    def after_fork(self) -> None:
+        """In a forked worker: drop the inherited connection (see GameInfoCache.after_fork)."""
+        if self.path != ":memory:":
+            self._connection = None
+
+    def mark_alive(self, appid: int, cc: str = "us") -> None:
+        if (appid, cc) not in self._dead:
+            return
+        with self._lock:
+            if self._dead.pop((appid, cc), None) is not None:
+                self._stats["revived"] += 1
+                self._db.execute("DELETE FROM dead_apps WHERE appid = ? AND cc = ?", (appid, cc))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tracked"] = len(self._dead)
+            stats["excluded"] = sum(1 for _, retry_at in self._dead.values() if retry_at > now)
+        return stats
+
+    # ===== HELPER METHODS =====
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._open()
+        return self._connection
+
+    @property
+    def _dead(self) -> Dict[Tuple[int, str], Tuple[int, float]]:
+        if self._entries is None:
+            self._open()
+        return self._entries
+
+    def _open(self) -> None:
+        with self._open_lock:
+            if self._connection is None:
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS dead_apps ("
+                    " appid INTEGER NOT NULL,"
+                    " cc TEXT NOT NULL,"
+                    " failures INTEGER NOT NULL,"
+                    " retry_at REAL NOT NULL,"
+                    " PRIMARY KEY (appid, cc))"
+                )
+                db.commit()
+                self._connection = db
+            if self._entries is None:
+                self._entries = {
+                    (appid, cc): (failures, retry_at)
+                    for appid, cc, failures, retry_at in self._connection.execute(
+                        "SELECT appid, cc, failures, retry_at FROM dead_apps"
+                    )
+                }
@@ -0,0 +1,135 @@
+# python file that loads the list of steam app ids we pick random games from
+# ids are deduplicated and kept in a compact uint32 array, loaded on first use;
+# a prebuilt binary snapshot can be memory-mapped instead so forked workers share it:
+#   python -m repositories.game_catalog games.txt games.bin
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Optional, Sequence
+
+SNAPSHOT_MAGIC = b"GCAT"
+SNAPSHOT_VERSION = 1
+# magic, version, count, reserved -> 16 bytes so the id array stays 4-byte aligned
+_HEADER = struct.Struct("<4sIII")
+
+
+def read_game_ids(filename: str = "games.txt") -> array:
+    """App ids from a text file in file order, duplicates and blank lines dropped."""
+    seen = {}
+    with open(filename, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                seen.setdefault(int(line), None)
+    return array("I", seen)
+
+
+def write_snapshot(ids: Sequence[int], path: str) -> None:
+    ids = array("I", ids)
+    if ids.itemsize != 4:
+        raise RuntimeError("array('I') is not 32-bit on this platform")
+    if sys.byteorder != "little":
+        ids.byteswap()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(ids), 0))
+        f.write(ids.tobytes())
+    os.replace(tmp_path, path)
+
+
+class GameCatalog:
+    """
+    Deduplicated, read-only list of catalog app ids.
+
+    Nothing is read until the ids are first needed. If `snapshot` points at
+    a file written by write_snapshot() that is newer than the text file, it
+    is memory-mapped instead of parsed, so workers forked from one parent
+    share the same pages.
+    """
+
+    def __init__(self, filename: str = "games.txt", snapshot: Optional[str] = None):
+        self.filename = filename
+        self.snapshot = snapshot
+        self.source = None
+        self._ids = None
+        self._mmap = None
+        self._lock = threading.Lock()
+
+    @property
+    def ids(self) -> Sequence[int]:
+        if self._ids is None:
+            with self._lock:
+                if self._ids is None:
+                    self._ids = self._load()
+        return self._ids
+
+    def load(self) -> "GameCatalog":
+        """Force the load now, e.g. in a parent process before it forks workers."""
+        self.ids
+        return self
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> int:
+        return self.ids[position]
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    # ===== HELPER METHODS =====
+
+    def _load(self) -> Sequence[int]:
+        if self.snapshot and self._snapshot_is_current():
+            ids = self._map_snapshot()
+            if ids is not None:
+                self.source = self.snapshot
+                return ids
+        self.source = self.filename
+        return read_game_ids(self.filename)
+
+    def _snapshot_is_current(self) -> bool:
+        try:
+            snapshot_mtime = os.path.getmtime(self.snapshot)
+        except OSError:
+            return False
+        try:
+            return snapshot_mtime >= os.path.getmtime(self.filename)
+        except OSError:
+            # no text file to compare against; the snapshot is all we have
+            return True
+
+    def _map_snapshot(self) -> Optional[Sequence[int]]:
+        if sys.byteorder != "little":
+            return None
+        with open(self.snapshot, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < _HEADER.size:
+            mapped.close()
+            return None
+        magic, version, count, _ = _HEADER.unpack_from(mapped)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or len(mapped) != _HEADER.size + 4 * count:
+            mapped.close()
+            return None
+        self._mmap = mapped
+        return memoryview(mapped)[_HEADER.size:].cast("I")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a memory-mappable snapshot of the game id catalog.")
+    parser.add_argument("games", nargs="?", default="games.txt", help="file with one Steam app id per line")
+    parser.add_argument("snapshot", nargs="?", default="games.bin", help="output snapshot path")
+    args = parser.parse_args(argv)
+
+    ids = read_game_ids(args.games)
+    write_snapshot(ids, args.snapshot)
+    print(f"[game_catalog] wrote {len(ids)} unique app ids to {args.snapshot}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
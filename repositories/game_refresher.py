@@ -0,0 +1,134 @@
+# python file that refreshes cached steam game info in the background
+# lets /game/random serve a stale copy right away while a worker refetches it,
+# and proactively refreshes hot entries shortly before they expire
+
+import heapq
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+
+class GameRefresher:
+    """
+    Small delayed-job scheduler for cache refreshes.
+
+    refresh(key) is called on a worker thread for every enqueued cache key.
+    A key is only ever queued once at a time, so a burst of stale reads for
+    the same game turns into a single upstream fetch.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[tuple], None],
+        cache,
+        workers: int = 2,
+        scan_interval: float = 30.0,
+        refresh_ahead: float = 300.0,
+        jitter: float = 60.0,
+        max_queue: int = 2048,
+    ):
+        self.refresh = refresh
+        self.cache = cache
+        self.workers = workers
+        self.scan_interval = scan_interval
+        self.refresh_ahead = refresh_ahead
+        self.jitter = jitter
+        self.max_queue = max_queue
+
+        self._heap = []
+        self._pending = set()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._stats = {"enqueued": 0, "dropped": 0, "refreshed": 0, "failed": 0, "scans": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> "GameRefresher":
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        for i in range(self.workers):
+            self._spawn(self._work, f"game-refresh-{i}")
+        self._spawn(self._scan, "game-refresh-scan")
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(self, key: tuple, delay: float = 0.0) -> bool:
+        """Schedule a refresh of key after delay seconds. Returns False if it was already queued or the queue is full."""
+        with self._cond:
+            if key in self._pending:
+                return False
+            if len(self._heap) >= self.max_queue:
+                self._stats["dropped"] += 1
+                return False
+            self._pending.add(key)
+            heapq.heappush(self._heap, (time.monotonic() + delay, key))
+            self._stats["enqueued"] += 1
+            self._cond.notify()
+            return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = len(self._heap)
+        stats["running"] = self._running
+        return stats
+
+    # ===== HELPER METHODS =====
+
+    def _spawn(self, target, name) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while self._running:
+                    if self._heap:
+                        wait = self._heap[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if not self._running:
+                    return
+                _, key = heapq.heappop(self._heap)
+
+            try:
+                self.refresh(key)
+                outcome = "refreshed"
+            except Exception:
+                outcome = "failed"
+
+            with self._cond:
+                self._pending.discard(key)
+                self._stats[outcome] += 1
+
+    def _scan(self) -> None:
+        while True:
+            with self._cond:
+                if self._running:
+                    self._cond.wait(self.scan_interval)
+                if not self._running:
+                    return
+                self._stats["scans"] += 1
+
+            # refresh entries before they go stale, spread over the jitter window
+            now = time.time()
+            for key, expires_at in self.cache.expiring(now + self.refresh_ahead):
+                window = max(0.0, min(self.jitter, expires_at - now))
+                self.enqueue(key, delay=random.uniform(0, window))
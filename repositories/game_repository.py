@@ -1,2 +1,155 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence
+
+
 class GameRepository:
-    pass
\ No newline at end of file
+    """
+    Local store of Steam metadata, filled offline by repositories/ingest_catalog.py.
+
+    Each app id maps to the same payload get_steam_game_info returns, or to an
+    "unavailable" marker when Steam reported success: false for it.
+    """
+
+    def __init__(self, db_path: str = "games.db", reload_interval: float = 60.0):
+        self.db_path = db_path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        # opened on first use, so importing the app doesn't create the file
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+        self._available_ids = None
+        self._available_loaded_at = 0.0
+        # (appids checked, covered?) from the last covers() call
+        self._coverage = None
+        self._coverage_checked_at = 0.0
+
+    def get(self, appid: int) -> Optional[dict]:
+        sql = "SELECT payload FROM games WHERE appid = ? AND available = 1"
+        with self._lock:
+            row = self._conn.execute(sql, (appid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_fetched_at(self, appid: int) -> Optional[float]:
+        sql = "SELECT fetched_at FROM games WHERE appid = ?"
+        with self._lock:
+            row = self._conn.execute(sql, (appid,)).fetchone()
+        return row[0] if row else None
+
+    def upsert(self, appid: int, game: Optional[dict], fetched_at: Optional[float] = None) -> None:
+        """Store a fetched payload. game=None records the app id as unavailable."""
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO games (appid, available, name, payload, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (appid, 1 if game else 0, game.get("name") if game else None,
+                     json.dumps(game) if game else None, fetched_at)
+                )
+                self._conn.execute("DELETE FROM game_genres WHERE appid = ?", (appid,))
+                if game:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO game_genres (genre, appid) VALUES (?, ?)",
+                        [(genre, appid) for genre in game.get("genres", [])]
+                    )
+            self._available_ids = None
+            self._coverage = None
+
+    def stale_ids(self, appids: Iterable[int], max_age: float) -> List[int]:
+        """Return the app ids that are missing from the store or older than max_age seconds."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            fresh = {
+                row[0] for row in
+                self._conn.execute("SELECT appid FROM games WHERE fetched_at >= ?", (cutoff,))
+            }
+        return [appid for appid in appids if appid not in fresh]
+
+    def available_ids(self) -> List[int]:
+        """
+        App ids with a usable payload. Cached in memory and re-read every
+        reload_interval seconds so a separate ingest run shows up on its own.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._available_ids is None or now - self._available_loaded_at > self.reload_interval:
+                self._available_ids = [
+                    row[0] for row in
+                    self._conn.execute("SELECT appid FROM games WHERE available = 1 ORDER BY appid")
+                ]
+                self._available_loaded_at = now
+            return self._available_ids
+
+    def covers(self, appids: Sequence[int]) -> bool:
+        """
+        True when the store has a row (available or not) for every id in
+        appids, i.e. an ingest over them has finished. Re-checked every
+        reload_interval seconds, like available_ids.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (self._coverage is None or self._coverage[0] is not appids
+                    or now - self._coverage_checked_at > self.reload_interval):
+                covered = False
+                # fewer rows than ids can't cover them; skip reading every id
+                if self._conn.execute("SELECT COUNT(*) FROM games").fetchone()[0] >= len(appids):
+                    stored = {row[0] for row in self._conn.execute("SELECT appid FROM games")}
+                    covered = all(appid in stored for appid in appids)
+                self._coverage = (appids, covered)
+                self._coverage_checked_at = now
+            return self._coverage[1]
+
+    def ids_by_genre(self, genre: str) -> List[int]:
+        sql = "SELECT appid FROM game_genres WHERE genre = ? ORDER BY appid"
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, (genre,))]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def reload(self) -> None:
+        """Forget in-memory state so rows written by another process (the ingester) show up."""
+        with self._lock:
+            self._available_ids = None
+            self._coverage = None
+
+    def after_fork(self) -> None:
+        """In a forked worker: drop the inherited connection so the next use opens its own; a SQLite handle must not be used on both sides of a fork."""
+        if self.db_path != ":memory:":
+            self._connection = None
+
+    # ===== HELPER METHODS =====
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._connect()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                " appid INTEGER PRIMARY KEY,"
+                " available INTEGER NOT NULL,"
+                " name TEXT,"
+                " payload TEXT,"
+                " fetched_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_games_fetched_at ON games (fetched_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_games_available ON games (available)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS game_genres ("
+                " genre TEXT NOT NULL,"
+                " appid INTEGER NOT NULL,"
+                " PRIMARY KEY (genre, appid))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_game_genres_appid ON game_genres (appid)")
+        return conn
@@ -0,0 +1,116 @@
+# python file with an inverted genre index over the game catalog
+# every genre maps to a bitset (a python int) of catalog positions, so
+# "Action or RPG" / "Indie and Puzzle" filters are just bitwise OR / AND
+
+import random
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# number of set bits in every possible byte, used to walk bitsets a byte at a time
+_BYTE_POPCOUNT = [bin(i).count("1") for i in range(256)]
+
+
+class GenreIndex:
+    """
+    Genre -> bitset index over a fixed list of app ids.
+
+    Bit i of a bitset stands for catalog position i. update() keeps the index
+    current as metadata for a single game arrives or changes.
+    """
+
+    def __init__(self, appids: Sequence[int]):
+        self.appids = list(appids)
+        self._positions = {appid: i for i, appid in enumerate(self.appids)}
+        self._bits: Dict[str, int] = {}
+        self._game_genres: Dict[int, frozenset] = {}
+        self._known = 0
+        self._lock = threading.Lock()
+
+    def update(self, appid: int, genres: Optional[Iterable[str]]) -> None:
+        """Set the genres of one game. genres=None drops it from the index (e.g. it was delisted)."""
+        position = self._positions.get(appid)
+        if position is None:
+            return
+        bit = 1 << position
+        new = frozenset(genres) if genres is not None else frozenset()
+
+        with self._lock:
+            old = self._game_genres.get(position, frozenset())
+            for genre in old - new:
+                remaining = self._bits[genre] & ~bit
+                if remaining:
+                    self._bits[genre] = remaining
+                else:
+                    del self._bits[genre]
+            for genre in new - old:
+                self._bits[genre] = self._bits.get(genre, 0) | bit
+
+            if genres is None:
+                self._game_genres.pop(position, None)
+                self._known &= ~bit
+            else:
+                self._game_genres[position] = new
+                self._known |= bit
+
+    def match(self, any_of: Iterable[str] = (), all_of: Iterable[str] = ()) -> int:
+        """Bitset of games having at least one genre from any_of and every genre in all_of."""
+        any_of, all_of = list(any_of), list(all_of)
+        with self._lock:
+            result = self._known
+            if any_of:
+                union = 0
+                for genre in any_of:
+                    union |= self._bits.get(genre, 0)
+                result &= union
+            for genre in all_of:
+                result &= self._bits.get(genre, 0)
+        return result
+
+    def pick(self, bits: int, rng: random.Random = random) -> Optional[int]:
+        """Uniformly random app id out of a bitset, or None if it is empty."""
+        total = bits.bit_count()
+        if total == 0:
+            return None
+        return self.appids[_nth_set_bit(bits, rng.randrange(total))]
+
+    def sample(self, bits: int, k: int, rng: random.Random = random) -> List[int]:
+        """Up to k distinct app ids drawn uniformly without replacement from a bitset."""
+        picked = []
+        total = bits.bit_count()
+        while bits and len(picked) < k:
+            position = _nth_set_bit(bits, rng.randrange(total))
+            bits &= ~(1 << position)
+            total -= 1
+            picked.append(self.appids[position])
+        return picked
+
+    def unindexed(self) -> int:
+        """Bitset of games whose genres aren't known yet (never looked up, or dropped)."""
+        with self._lock:
+            return ((1 << len(self.appids)) - 1) & ~self._known
+
+    def appids_for(self, bits: int) -> List[int]:
+        return [self.appids[i] for i in range(bits.bit_length()) if bits >> i & 1]
+
+    def genre_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {genre: bits.bit_count() for genre, bits in sorted(self._bits.items())}
+
+    def __len__(self) -> int:
+        return self._known.bit_count()
+
+
+def _nth_set_bit(bits: int, n: int) -> int:
+    """Position of the n-th (0-based) set bit, skipping whole bytes by popcount."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        count = _BYTE_POPCOUNT[byte]
+        if n >= count:
+            n -= count
+            continue
+        for bit in range(8):
+            if byte >> bit & 1:
+                if n == 0:
+                    return byte_index * 8 + bit
+                n -= 1
+    raise ValueError("n is out of range for this bitset")
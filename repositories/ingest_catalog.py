@@ -0,0 +1,104 @@
+# python file that materializes games.txt into the local game store (games.db)
+# run it offline / from cron so /game/random can be served without calling Steam.
+# like main.py it imports the game modules as package.*, so run it from main.py's directory:
+#   python -m package.ingest_catalog --games games.txt --db games.db
+# re-running only refetches app ids that are missing or older than --max-age,
+# so an interrupted run just picks up where it stopped
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from package.game_repository import GameRepository
+from package.game_catalog import read_game_ids
+from package.rate_limiter import TokenBucket
+from package.steam_game_info import fetch_app_details, fetch_review_summary
+
+# Each app id costs two upstream requests (appdetails + appreviews)
+REQUESTS_PER_GAME = 2
+# tries for the reviews half before the game is left for the next run
+REVIEW_ATTEMPTS = 3
+
+class ReviewsUnavailable(Exception):
+    """The review summary couldn't be fetched (throttled, breaker open, timeout)."""
+
+def fetch_game(appid, cc="us", lang="en", review_attempts=REVIEW_ATTEMPTS, backoff=1.0):
+    """
+    Uncached fetch of one game. Returns None when Steam reports the app as unavailable.
+    Raises ReviewsUnavailable rather than storing a made-up "No reviews" summary
+    when the reviews call keeps failing.
+    """
+    details = fetch_app_details(appid, cc, lang)
+    if details is None:
+        return None
+    for attempt in range(review_attempts):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        # None means the call failed; a game without reviews comes back as Steam's "No reviews"
+        review_text = fetch_review_summary(appid)
+        if review_text is not None:
+            return dict(details, review_summary=review_text)
+    raise ReviewsUnavailable(f"review summary unavailable after {review_attempts} attempts")
+
+def ingest(repo, appids, workers=4, rate=4.0, max_age=24 * 60 * 60, cc="us", lang="en", log=print):
+    """
+    Fetch every stale or missing app id into repo.
+
+    Parallelism is bounded by `workers` and upstream traffic by `rate`
+    requests per second. Each game is committed as soon as it arrives.
+    Returns a dict of counters.
+    """
+    todo = repo.stale_ids(appids, max_age)
+    stats = {"total": len(appids), "skipped": len(appids) - len(todo), "stored": 0, "unavailable": 0, "failed": 0}
+    log(f"[ingest] {len(todo)} of {len(appids)} app ids need fetching")
+    if not todo:
+        return stats
+
+    bucket = TokenBucket(rate=rate, capacity=max(REQUESTS_PER_GAME, rate))
+
+    def work(appid):
+        bucket.acquire(REQUESTS_PER_GAME)
+        return fetch_game(appid, cc, lang)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+        futures = {pool.submit(work, appid): appid for appid in todo}
+        for done, future in enumerate(as_completed(futures), start=1):
+            appid = futures[future]
+            try:
+                game = future.result()
+            except Exception as e:
+                # leave it out of the store so the next run retries it
+                stats["failed"] += 1
+                log(f"[ingest] {appid}: {e}")
+                continue
+
+            repo.upsert(appid, game)
+            stats["stored" if game else "unavailable"] += 1
+            if done % 50 == 0:
+                log(f"[ingest] {done}/{len(todo)} done")
+
+    stats["seconds"] = round(time.monotonic() - started, 2)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch Steam metadata for games.txt into the local game store.")
+    parser.add_argument("--games", default="games.txt", help="file with one Steam app id per line")
+    parser.add_argument("--db", default="games.db", help="sqlite file backing GameRepository")
+    parser.add_argument("--workers", type=int, default=4, help="max concurrent fetches")
+    parser.add_argument("--rate", type=float, default=4.0, help="max upstream requests per second")
+    parser.add_argument("--max-age", type=float, default=24 * 60 * 60, help="refetch entries older than this many seconds")
+    parser.add_argument("--cc", default="us")
+    parser.add_argument("--lang", default="en")
+    args = parser.parse_args(argv)
+
+    repo = GameRepository(args.db)
+    stats = ingest(
+        repo, list(read_game_ids(args.games)),
+        workers=args.workers, rate=args.rate, max_age=args.max_age, cc=args.cc, lang=args.lang
+    )
+    print(f"[ingest] {stats}")
+    return 1 if stats["failed"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,238 @@
+import copy
+import dataclasses
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
+from models.user import User, Session
+from repositories.user_store import UserStore, LocalLocks, DuplicateEmailError, DuplicateGamerTagError
+
+# User attributes that have a lookup index, like the columns with one in MySQL
+_INDEXED = ("email", "gamer_tag", "verification_token", "reset_token")
+
+
+class InMemoryUserRepository(UserStore):
+    """
+    UserStore kept in dicts, for benchmarks, load tests and local runs.
+    Nothing is persisted.
+
+    Every lookup is a dict hit, email and gamer_tag are unique like in the
+    real schema, ids come back as strings like from a database, and callers
+    always get copies, so mutating a returned User changes nothing until
+    update() is called.
+    """
+
+    def __init__(self):
+        self._users: Dict[str, User] = {}
+        self._index: Dict[str, Dict[str, str]] = {name: {} for name in _INDEXED}
+        self._sessions: Dict[str, Session] = {}
+        # token_id -> (expires_at, revoked_at); user_id -> when all their signed sessions were revoked
+        self._revoked_tokens: Dict[str, Tuple[datetime, datetime]] = {}
+        self._revoked_users: Dict[str, datetime] = {}
+        self._lock = threading.RLock()
+        self._locks = LocalLocks()
+
+    # (kind, key, previous value) for every write inside a unit of work
+    _undo: Optional[List[tuple]] = None
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Run several repository calls as one transaction; other threads wait
+        for the block to finish. If the block raises, its writes are undone.
+        """
+        if self._undo is not None:
+            yield self
+            return
+        with self._lock:
+            repo = copy.copy(self)
+            repo._undo = []
+            try:
+                yield repo
+            except BaseException:
+                for kind, key, previous in reversed(repo._undo):
+                    self._put(kind, key, previous)
+                raise
+
+    def pool_stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "users": len(self._users), "sessions": len(self._sessions)}
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        return self._get_indexed("email", email)
+
+    def get_by_gamer_tag(self, gamer_tag: str) -> Optional[User]:
+        return self._get_indexed("gamer_tag", gamer_tag)
+
+    def get_by_id(self, user_id: str) -> Optional[User]:
+        with self._lock:
+            return copy.copy(self._users.get(str(user_id)))
+
+    def get_by_verification_token(self, token: str) -> Optional[User]:
+        return self._get_indexed("verification_token", token)
+
+    def get_by_reset_token(self, token: str) -> Optional[User]:
+        return self._get_indexed("reset_token", token)
+
+    def find_conflicts(self, email: str, gamer_tag: str) -> Set[str]:
+        conflicts = set()
+        with self._lock:
+            if email in self._index["email"]:
+                conflicts.add("email")
+            if gamer_tag in self._index["gamer_tag"]:
+                conflicts.add("gamer_tag")
+        return conflicts
+
+    def insert(self, user: User) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            self._check_unique(user)
+            self._write_user(str(user.id), dataclasses.replace(user, id=str(user.id), created_at=now, updated_at=now))
+
+    def update(self, user: User) -> None:
+        with self._lock:
+            stored = self._users.get(str(user.id))
+            if stored is None:
+                return
+            self._check_unique(user)
+            self._write_user(str(user.id), dataclasses.replace(user, id=str(user.id), created_at=stored.created_at, updated_at=datetime.utcnow()))
+
+    # ===== SESSION METHODS =====
+
+    def create_session(self, session: Session) -> None:
+        with self._lock:
+            self._write_session(session.token, dataclasses.replace(session, user_id=str(session.user_id)))
+
+    def get_session(self, token: str) -> Optional[Session]:
+        with self._lock:
+            return copy.copy(self._sessions.get(token))
+
+    def get_user_by_session_token(self, token: str) -> Optional[Tuple[Session, User]]:
+        with self._lock:
+            session = self._sessions.get(token)
+            user = self._users.get(str(session.user_id)) if session else None
+            if user is None:
+                return None
+            return copy.copy(session), copy.copy(user)
+
+    def delete_session(self, token: str) -> bool:
+        with self._lock:
+            if token not in self._sessions:
+                return False
+            self._write_session(token, None)
+            return True
+
+    def delete_expired_sessions(self, limit: Optional[int] = None) -> int:
+        now = datetime.utcnow()
+        with self._lock:
+            expired = sorted(
+                (session.expires_at, token)
+                for token, session in self._sessions.items()
+                if session.expires_at < now
+            )
+            if limit is not None:
+                expired = expired[:limit]
+            for _, token in expired:
+                self._write_session(token, None)
+        return len(expired)
+
+    # ===== SIGNED-SESSION REVOCATIONS =====
+
+    def revoke_token(self, token_id: str, expires_at: datetime) -> None:
+        with self._lock:
+            if token_id not in self._revoked_tokens:
+                self._write("revoked_token", token_id, (expires_at, datetime.utcnow()))
+
+    def is_token_revoked(self, token_id: str) -> bool:
+        with self._lock:
+            return token_id in self._revoked_tokens
+
+    def revoke_user_sessions(self, user_id: str, revoked_at: datetime) -> None:
+        with self._lock:
+            if str(user_id) in self._users:
+                self._write("revoked_user", str(user_id), revoked_at)
+
+    def load_revocations(self, since: datetime) -> Tuple[List[str], Dict[str, datetime]]:
+        now = datetime.utcnow()
+        with self._lock:
+            token_ids = [
+                token_id for token_id, (expires_at, revoked_at) in self._revoked_tokens.items()
+                if revoked_at > since and expires_at > now
+            ]
+            users = {user_id: at for user_id, at in self._revoked_users.items() if at > since}
+        return token_ids, users
+
+    def delete_expired_revocations(self, limit: Optional[int] = None) -> int:
+        now = datetime.utcnow()
+        with self._lock:
+            expired = sorted(
+                (expires_at, token_id)
+                for token_id, (expires_at, _) in self._revoked_tokens.items()
+                if expires_at < now
+            )
+            if limit is not None:
+                expired = expired[:limit]
+            for _, token_id in expired:
+                self._write("revoked_token", token_id, None)
+        return len(expired)
+
+    def advisory_lock(self, name: str):
+        # nothing outside this process can see the data, so a local lock is enough
+        return self._locks.hold(name)
+
+    # ===== HELPER METHODS =====
+
+    def _get_indexed(self, name: str, value: str) -> Optional[User]:
+        with self._lock:
+            user_id = self._index[name].get(value)
+            return copy.copy(self._users[user_id]) if user_id is not None else None
+
+    def _check_unique(self, user: User) -> None:
+        owner = self._index["email"].get(user.email)
+        if owner is not None and owner != str(user.id):
+            raise DuplicateEmailError(f"Duplicate entry '{user.email}' for key 'email'")
+        owner = self._index["gamer_tag"].get(user.gamer_tag)
+        if owner is not None and owner != str(user.id):
+            raise DuplicateGamerTagError(f"Duplicate entry '{user.gamer_tag}' for key 'gamer_tag'")
+
+    def _write_user(self, user_id: str, user: Optional[User]) -> None:
+        self._write("user", user_id, user)
+
+    def _write_session(self, token: str, session: Optional[Session]) -> None:
+        self._write("session", token, session)
+
+    def _write(self, kind: str, key: str, value) -> None:
+        """Set (or with None, delete) one record, remembering the old value inside a unit of work."""
+        if self._undo is not None:
+            self._undo.append((kind, key, self._table(kind).get(key)))
+        self._put(kind, key, value)
+
+    def _table(self, kind: str) -> dict:
+        return {
+            "user": self._users,
+            "session": self._sessions,
+            "revoked_token": self._revoked_tokens,
+            "revoked_user": self._revoked_users,
+        }[kind]
+
+    def _put(self, kind: str, key: str, value) -> None:
+        if kind == "user":
+            self._put_user(key, value)
+        elif value is None:
+            self._table(kind).pop(key, None)
+        else:
+            self._table(kind)[key] = value
+
+    def _put_user(self, user_id: str, user: Optional[User]) -> None:
+        old = self._users.pop(user_id, None)
+        if old is not None:
+            for name in _INDEXED:
+                value = getattr(old, name)
+                if value is not None and self._index[name].get(value) == user_id:
+                    del self._index[name][value]
+        if user is not None:
+            self._users[user_id] = user
+            for name in _INDEXED:
+                value = getattr(user, name)
+                if value is not None:
+                    self._index[name][value] = user_id
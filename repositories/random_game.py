@@ -1,23 +1,373 @@
 # python file that will generate a random game from a list of app ids
 # relies on steam_game_info.py to get game info based on app id
 
+import asyncio
 import random
-from package.steam_game_info import get_steam_game_info
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from package import steam_game_info
+from package.steam_game_info import get_steam_game_info, get_steam_game_info_async
+from package.game_buffer import RandomGameBuffer
+from package.genre_index import GenreIndex
+from package.shuffle_stream import ShuffleSessions
+from package.game_catalog import GameCatalog
+from package.game_repository import GameRepository
 
-# Example Steam AppIDs for demo
-GAME_IDS = []
+# Deduplicated app ids, read on first use (or mmapped from games.bin if it was built)
+game_catalog = GameCatalog("games.txt", snapshot="games.bin")
 
-def load_game_ids(filename="games.txt"):
-    game_ids = []
-    with open(filename, "r") as f:
-        for line in f:
-            game_ids.append(int(line))
-    return game_ids
+def configure_catalog(filename="games.txt", snapshot=None):
+    global game_catalog, _genre_index
+    game_catalog = GameCatalog(filename, snapshot=snapshot)
+    _genre_index = None
+    return game_catalog
 
-GAME_IDS = load_game_ids()
+# Local store filled by ingest_catalog.py; once it covers the catalog we never call Steam here
+game_repository = GameRepository()
 
-def get_random_game():
-    appid = random.choice(GAME_IDS)
-    return get_steam_game_info(appid)
+def local_pool():
+    """
+    The store's available ids, when it has a row for every catalog id. Until an
+    ingest finishes, None: sampling only the rows ingested so far would shrink
+    the pool, so picks come from the catalog (local rows are still used per id).
+    """
+    if game_repository.covers(game_catalog.ids):
+        return game_repository.available_ids() or None
+    return None
 
+def resolve_game(appid):
+    """Local store first, then the (cached) Steam lookup."""
+    return game_repository.get(appid) or get_steam_game_info(appid)
 
+def is_excluded(appid):
+    """Known-dead app ids stay out of every sampling pool until their re-probe is due."""
+    return steam_game_info.dead_apps.is_dead(appid)
+
+def draw_catalog_appid(tries=16):
+    """Uniform draw from the catalog minus excluded ids (rejection sampling; dead ids are rare)."""
+    appid = None
+    for _ in range(tries):
+        appid = game_catalog[random.randrange(len(game_catalog))]
+        if not is_excluded(appid):
+            return appid
+    return appid
+
+def resolve_random_game(attempts=3):
+    local_ids = local_pool()
+    if local_ids:
+        return game_repository.get(random.choice(local_ids))
+
+    # a re-probed id can still turn out dead; draw again rather than hand back a 404
+    for _ in range(attempts):
+        game = resolve_game(draw_catalog_appid())
+        if game is not None:
+            return game
+    return None
+
+# Genre -> bitset index over the catalog, built on first filtered request from
+# whatever metadata is already local and kept current by steam_game_info refreshes
+_genre_index = None
+_genre_index_lock = threading.Lock()
+
+def get_genre_index():
+    global _genre_index
+    if _genre_index is None:
+        with _genre_index_lock:
+            if _genre_index is None:
+                index = GenreIndex(game_catalog.ids)
+                for appid in index.appids:
+                    details = game_repository.get(appid)
+                    if details is None:
+                        details, _ = steam_game_info.game_cache.lookup(("details", appid, "us", "en"))
+                    if details is not None and not is_excluded(appid):
+                        index.update(appid, details.get("genres", []))
+                _genre_index = index
+    return _genre_index
+
+def _on_details(key, details):
+    kind, appid, cc, lang = key
+    if _genre_index is not None and (cc, lang) == ("us", "en"):
+        _genre_index.update(appid, details.get("genres", []) if details else None)
+
+steam_game_info.details_listeners.append(_on_details)
+
+# A filter only matches games whose genres are known. With no ingest and a cold metadata cache
+# hardly any are, so when nothing indexed matches, look up this many games the index hasn't
+# seen yet instead of answering 404. Their details land in the index through _on_details,
+# so it fills in as filters get used.
+UNINDEXED_PROBES = 8
+
+def _matches_filters(game, any_genres, all_genres):
+    genres = set(game.get("genres") or [])
+    return (not any_genres or not genres.isdisjoint(any_genres)) and genres.issuperset(all_genres)
+
+def _unindexed_sample(index, count):
+    return [appid for appid in index.sample(index.unindexed(), max(count, UNINDEXED_PROBES)) if not is_excluded(appid)]
+
+def probe_unindexed(index, any_genres, all_genres, count=1):
+    """Up to count games matching the filters among catalog games the index knows nothing about yet."""
+    games, _, _ = get_games(_unindexed_sample(index, count))
+    return [game for game in games.values() if _matches_filters(game, any_genres, all_genres)][:count]
+
+# Already-resolved games ready to hand out; main.py starts its producer thread
+random_game_buffer = RandomGameBuffer(resolve_random_game)
+
+def start_buffer(low_watermark=8, high_watermark=32):
+    global random_game_buffer
+    if (low_watermark, high_watermark) != (random_game_buffer.low_watermark, random_game_buffer.high_watermark):
+        random_game_buffer.stop()
+        random_game_buffer = RandomGameBuffer(resolve_random_game, low_watermark, high_watermark)
+    return random_game_buffer.start()
+
+def get_random_game(any_genres=None, all_genres=None):
+    if any_genres or all_genres:
+        return get_filtered_random_game(any_genres or [], all_genres or [])
+
+    game = random_game_buffer.pop() if random_game_buffer.running else None
+    if game is not None:
+        return game
+    # underrun (or buffer not started): resolve one inline like before
+    return resolve_random_game()
+
+def get_filtered_random_game(any_genres, all_genres, attempts=3):
+    """Uniform pick among catalog games matching the genre filters (any-of and/or all-of)."""
+    index = get_genre_index()
+    matches = index.match(any_of=any_genres, all_of=all_genres)
+    for _ in range(attempts):
+        appid = index.pick(matches)
+        if appid is None:
+            break
+        game = resolve_game(appid)
+        if game is not None:
+            return game
+        # resolve_game found it delisted, which also dropped it from the index
+        matches &= index.match(any_of=any_genres, all_of=all_genres)
+    found = probe_unindexed(index, any_genres, all_genres)
+    return found[0] if found else None
+
+# "Next Game" order per session: a seeded permutation of the catalog, state is (seed, cursor)
+shuffle_sessions = ShuffleSessions()
+
+def get_next_game(session_token, any_genres=None, all_genres=None, attempts=3):
+    """Next game in this session's no-repeat shuffle, honoring the same genre filters as get_random_game."""
+    index = get_genre_index()
+    allowed = index.match(any_of=any_genres or [], all_of=all_genres or []) if (any_genres or all_genres) else None
+    if allowed == 0:
+        # nothing indexed matches yet: no order to follow, hand out a fresh match
+        found = probe_unindexed(index, any_genres or [], all_genres or [])
+        return found[0] if found else None
+    size = len(index.appids)
+    # known-dead ids are skipped for free; only real lookups count against attempts
+    for _ in range(size):
+        position = shuffle_sessions.next_position(session_token, size, allowed)
+        if position is None:
+            return None
+        appid = index.appids[position]
+        if is_excluded(appid):
+            continue
+        game = resolve_game(appid)
+        if game is not None:
+            return game
+        attempts -= 1
+        if attempts <= 0:
+            break
+    return None
+
+# Batch lookups (/game/random?count=N, /games?ids=...) resolve games in parallel on their own
+# pool; steam_game_info's executor is reserved for the reviews half of each lookup
+MAX_BATCH = 20
+BATCH_WORKERS = 8
+_batch_executor = None
+_batch_lock = threading.Lock()
+
+def _get_batch_executor():
+    global _batch_executor
+    if _batch_executor is None:
+        with _batch_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="game-batch")
+    return _batch_executor
+
+def after_fork():
+    """Reset per-process state in a worker forked from a process that imported this module."""
+    global _batch_executor, _batch_lock
+    game_repository.after_fork()
+    _batch_executor, _batch_lock = None, threading.Lock()
+
+def get_games(appids):
+    """
+    Resolve several app ids in parallel.
+
+    Returns (games, missing, failed): games maps appid -> payload, missing
+    lists ids Steam reports as unavailable, failed lists ids whose lookup
+    raised (e.g. upstream timeout).
+    """
+    appids = list(dict.fromkeys(appids))[:MAX_BATCH]
+    futures = [(appid, _get_batch_executor().submit(resolve_game, appid)) for appid in appids]
+    games, missing, failed = {}, [], []
+    for appid, future in futures:
+        try:
+            game = future.result()
+        except Exception:
+            failed.append(appid)
+            continue
+        if game is None:
+            missing.append(appid)
+        else:
+            games[appid] = game
+    return games, missing, failed
+
+def get_random_games(count, any_genres=None, all_genres=None):
+    """Up to count distinct random games in one call; fewer if some picks can't be resolved."""
+    count = max(0, min(count, MAX_BATCH))
+    if any_genres or all_genres:
+        index = get_genre_index()
+        appids = index.sample(index.match(any_of=any_genres or [], all_of=all_genres or []), count)
+        games, _, _ = get_games(appids)
+        picked = list(games.values())
+        if len(picked) < count:
+            picked += probe_unindexed(index, any_genres or [], all_genres or [], count - len(picked))
+        return picked
+
+    picked = _pop_buffered(count)
+    pool = local_pool() or game_catalog
+    tried = set()
+    # a few rounds so delisted picks get replaced instead of shrinking the batch
+    for _ in range(3):
+        appids = _draw_batch(pool, count - len(picked), tried)
+        if not appids:
+            break
+        games, _, _ = get_games(appids)
+        picked.extend(games.values())
+    return picked
+
+def _pop_buffered(count, wait=True):
+    picked = []
+    while random_game_buffer.running and len(picked) < count:
+        game = random_game_buffer.pop() if wait else random_game_buffer.try_pop()
+        if game is None:
+            break
+        picked.append(game)
+    return picked
+
+def _draw_batch(pool, remaining, tried):
+    """Up to `remaining` distinct ids from pool not tried yet (and added to tried) or excluded."""
+    if remaining <= 0:
+        return []
+    positions = random.sample(range(len(pool)), min(remaining + len(tried), len(pool)))
+    appids = [pool[i] for i in positions if pool[i] not in tried and not is_excluded(pool[i])][:remaining]
+    tried.update(appids)
+    return appids
+
+# Async versions of the lookups above for the event-loop request path (async_app.py).
+# Same picks, caches and fallbacks; a lookup awaits aiohttp instead of holding a thread,
+# and batches are gathered on the loop instead of going through _batch_executor.
+# Anything that reads or writes sqlite (the game store, the metadata cache) runs on the
+# loop's default executor. What stays on the loop is in memory: the catalog, dead-app
+# checks, the genre index and shuffle state, whose locks only ever guard a few bit or
+# dict operations, and the buffer, which is only popped when its lock is free.
+
+async def resolve_game_async(appid):
+    return await asyncio.to_thread(game_repository.get, appid) or await get_steam_game_info_async(appid)
+
+async def resolve_random_game_async(attempts=3):
+    local_ids = await asyncio.to_thread(local_pool)
+    if local_ids:
+        return await asyncio.to_thread(game_repository.get, random.choice(local_ids))
+
+    for _ in range(attempts):
+        game = await resolve_game_async(draw_catalog_appid())
+        if game is not None:
+            return game
+    return None
+
+async def get_genre_index_async():
+    # the first build walks the whole catalog's cached metadata; keep it off the event loop
+    if _genre_index is None:
+        return await asyncio.to_thread(get_genre_index)
+    return _genre_index
+
+async def get_random_game_async(any_genres=None, all_genres=None):
+    if any_genres or all_genres:
+        return await get_filtered_random_game_async(any_genres or [], all_genres or [])
+
+    game = random_game_buffer.try_pop() if random_game_buffer.running else None
+    if game is not None:
+        return game
+    return await resolve_random_game_async()
+
+async def get_filtered_random_game_async(any_genres, all_genres, attempts=3):
+    index = await get_genre_index_async()
+    matches = index.match(any_of=any_genres, all_of=all_genres)
+    for _ in range(attempts):
+        appid = index.pick(matches)
+        if appid is None:
+            break
+        game = await resolve_game_async(appid)
+        if game is not None:
+            return game
+        matches &= index.match(any_of=any_genres, all_of=all_genres)
+    found = await probe_unindexed_async(index, any_genres, all_genres)
+    return found[0] if found else None
+
+async def probe_unindexed_async(index, any_genres, all_genres, count=1):
+    games, _, _ = await get_games_async(_unindexed_sample(index, count))
+    return [game for game in games.values() if _matches_filters(game, any_genres, all_genres)][:count]
+
+async def get_next_game_async(session_token, any_genres=None, all_genres=None, attempts=3):
+    index = await get_genre_index_async()
+    allowed = index.match(any_of=any_genres or [], all_of=all_genres or []) if (any_genres or all_genres) else None
+    if allowed == 0:
+        found = await probe_unindexed_async(index, any_genres or [], all_genres or [])
+        return found[0] if found else None
+    size = len(index.appids)
+    for _ in range(size):
+        position = shuffle_sessions.next_position(session_token, size, allowed)
+        if position is None:
+            return None
+        appid = index.appids[position]
+        if is_excluded(appid):
+            continue
+        game = await resolve_game_async(appid)
+        if game is not None:
+            return game
+        attempts -= 1
+        if attempts <= 0:
+            break
+    return None
+
+async def get_games_async(appids):
+    """get_games on the event loop: all lookups in flight at once. Same (games, missing, failed) result."""
+    appids = list(dict.fromkeys(appids))[:MAX_BATCH]
+    results = await asyncio.gather(*(resolve_game_async(appid) for appid in appids), return_exceptions=True)
+    games, missing, failed = {}, [], []
+    for appid, game in zip(appids, results):
+        if isinstance(game, BaseException):
+            failed.append(appid)
+        elif game is None:
+            missing.append(appid)
+        else:
+            games[appid] = game
+    return games, missing, failed
+
+async def get_random_games_async(count, any_genres=None, all_genres=None):
+    count = max(0, min(count, MAX_BATCH))
+    if any_genres or all_genres:
+        index = await get_genre_index_async()
+        appids = index.sample(index.match(any_of=any_genres or [], all_of=all_genres or []), count)
+        games, _, _ = await get_games_async(appids)
+        picked = list(games.values())
+        if len(picked) < count:
+            picked += await probe_unindexed_async(index, any_genres or [], all_genres or [], count - len(picked))
+        return picked
+
+    picked = _pop_buffered(count, wait=False)
+    pool = await asyncio.to_thread(local_pool) or game_catalog
+    tried = set()
+    for _ in range(3):
+        appids = _draw_batch(pool, count - len(picked), tried)
+        if not appids:
+            break
+        games, _, _ = await get_games_async(appids)
+        picked.extend(games.values())
+    return picked
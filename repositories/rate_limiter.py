@@ -0,0 +1,78 @@
+# python file with a thread-safe token bucket used to pace calls to the Steam store
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `capacity`.
+
+    acquire() blocks until enough tokens are available (or the timeout runs
+    out); acquire_async() waits the same way without blocking the event
+    loop; try_acquire() never blocks. Both waiting forms reject a request
+    for more tokens than the bucket can ever hold.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        self._check_fits(tokens)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._wait(tokens, deadline)
+            if wait is None:
+                return True
+            if wait <= 0:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        self._check_fits(tokens)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._wait(tokens, deadline)
+            if wait is None:
+                return True
+            if wait <= 0:
+                return False
+            await asyncio.sleep(wait)
+
+    def _check_fits(self, tokens: float) -> None:
+        # the bucket never holds more than capacity, so waiting for more would never end
+        if tokens > self.capacity:
+            raise ValueError(f"cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+
+    def _wait(self, tokens: float, deadline: Optional[float]) -> Optional[float]:
+        """Take the tokens and return None, or return how long to sleep before trying again (<= 0: give up)."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return None
+            wait = (tokens - self._tokens) / self.rate
+        if deadline is not None:
+            wait = min(wait, deadline - time.monotonic())
+        return wait
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
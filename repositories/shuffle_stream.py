@@ -0,0 +1,129 @@
+# python file that gives every session its own no-repeat walk through the catalog
+# the order comes from a seeded pseudo-random permutation (a small Feistel network),
+# so a session only needs to remember (seed, cursor) instead of a shuffled list
+
+import secrets
+import threading
+from typing import Optional
+
+_MASK64 = (1 << 64) - 1
+
+
+def _splitmix64(value: int) -> int:
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class FeistelPermutation:
+    """
+    Bijection on range(size) derived from a 64-bit seed.
+
+    A balanced Feistel network permutes [0, 2**bits); indexes that land
+    outside range(size) are walked forward until they fall inside, which
+    keeps the mapping a permutation of range(size).
+    """
+
+    def __init__(self, size: int, seed: int, rounds: int = 4):
+        if size <= 0:
+            raise ValueError("size must be positive")
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self._half_bits = bits // 2
+        self._half_mask = (1 << self._half_bits) - 1
+        self._keys = []
+        for _ in range(rounds):
+            seed = _splitmix64(seed)
+            self._keys.append(seed & 0xFFFFFFFF)
+
+    def __call__(self, index: int) -> int:
+        value = index
+        while True:
+            left, right = value >> self._half_bits, value & self._half_mask
+            for key in self._keys:
+                mixed = ((right ^ key) * 0x45D9F3B) & 0xFFFFFFFF
+                mixed ^= mixed >> 16
+                left, right = right, left ^ (mixed & self._half_mask)
+            value = (left << self._half_bits) | right
+            if value < self.size:
+                return value
+
+
+class ShuffleSessions:
+    """
+    Per-session without-replacement iterators over catalog positions.
+
+    State per session is a (seed, cursor) pair. When a session has walked
+    the whole catalog it starts a new pass with a fresh seed. The oldest
+    sessions are dropped once max_sessions is reached.
+    """
+
+    def __init__(self, max_sessions: int = 500_000):
+        self.max_sessions = max_sessions
+        self._states = {}
+        self._lock = threading.Lock()
+        self._stats = {"draws": 0, "new_sessions": 0, "new_passes": 0, "evictions": 0}
+
+    def next_position(self, session_key: str, size: int, allowed: Optional[int] = None) -> Optional[int]:
+        """
+        Next unseen catalog position for this session, restricted to the bits
+        set in `allowed` (None means every position). Returns None if no
+        position matches.
+        """
+        if size <= 0:
+            return None
+        while True:
+            with self._lock:
+                state = self._states.get(session_key)
+            # under a filter the walk can take many steps, so it runs outside the lock and is
+            # only kept if no concurrent request for this session moved the cursor meanwhile
+            seed, cursor = state if state is not None else (secrets.randbits(64), 0)
+            position, seed, cursor, new_passes = _walk(size, seed, cursor, allowed)
+
+            with self._lock:
+                if self._states.get(session_key) is not state:
+                    continue  # lost the race: walk again from the state that won
+                if state is None:
+                    self._stats["new_sessions"] += 1
+                    while len(self._states) >= self.max_sessions:
+                        del self._states[next(iter(self._states))]
+                        self._stats["evictions"] += 1
+                else:
+                    # re-inserting keeps dict order least-recently-used first
+                    del self._states[session_key]
+                self._states[session_key] = (seed, cursor)
+                self._stats["draws"] += 1
+                self._stats["new_passes"] += new_passes
+            return position
+
+    def reset(self, session_key: str) -> None:
+        with self._lock:
+            self._states.pop(session_key, None)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._states)
+        return stats
+
+
+def _walk(size: int, seed: int, cursor: int, allowed: Optional[int]):
+    """(position or None, seed, cursor, passes started) after the next allowed step from (seed, cursor)."""
+    permutation = FeistelPermutation(size, seed)
+    new_passes = 0
+    # the rest of this pass plus, if needed, one full fresh pass
+    for _ in range(2 * size):
+        if cursor >= size:
+            seed, cursor = _splitmix64(seed), 0
+            permutation = FeistelPermutation(size, seed)
+            new_passes += 1
+        candidate = permutation(cursor)
+        cursor += 1
+        if allowed is None or allowed >> candidate & 1:
+            return candidate, seed, cursor, new_passes
+    return None, seed, cursor, new_passes
@@ -0,0 +1,277 @@
+import copy
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
+from models.user import User, Session
+from repositories import user_schema
+from repositories.user_store import UserStore, LocalLocks, DuplicateEmailError, DuplicateGamerTagError
+
+USER_COLUMNS = """id, email, password_hash, gamer_tag, is_verified, verification_token,
+                  reset_token, reset_token_expires_at, created_at, updated_at"""
+
+# fixed-width text so timestamps compare correctly as strings
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class SQLiteUserRepository(UserStore):
+    """
+    SQLite-backed UserStore for single-node deployments and local benchmarks.
+
+    path is a database file or ":memory:". All threads share one connection
+    behind a lock (a ":memory:" database only exists on the connection that
+    created it); SQLite serializes writers anyway.
+    """
+
+    def __init__(self, path: str = "users.db"):
+        self.path = path
+        self._db = self._connect()
+        self._lock = threading.RLock()
+        self._locks = LocalLocks()
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self.migrate()
+
+    _in_transaction = False
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Run several repository calls in one transaction; other threads wait
+        for the block to finish. Commits on exit, rolls back if it raises.
+        """
+        if self._in_transaction:
+            yield self
+            return
+        with self._lock:
+            self._db.execute("BEGIN")
+            repo = copy.copy(self)
+            repo._in_transaction = True
+            try:
+                yield repo
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def migrate(self) -> List[int]:
+        # a single-node database, so it is safe to migrate on startup
+        with self._lock:
+            return user_schema.migrate(self._db, "sqlite")
+
+    def after_fork(self) -> None:
+        # a ":memory:" database can't be reopened; the child keeps its private copy
+        if self.path != ":memory:":
+            self._db = self._connect()
+
+    def pool_stats(self) -> dict:
+        return {"backend": "sqlite", "path": self.path}
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        return self._fetch_user(f"SELECT {USER_COLUMNS} FROM users WHERE email = ?", email)
+
+    def get_by_gamer_tag(self, gamer_tag: str) -> Optional[User]:
+        return self._fetch_user(f"SELECT {USER_COLUMNS} FROM users WHERE gamer_tag = ?", gamer_tag)
+
+    def get_by_id(self, user_id: str) -> Optional[User]:
+        return self._fetch_user(f"SELECT {USER_COLUMNS} FROM users WHERE id = ?", str(user_id))
+
+    def get_by_verification_token(self, token: str) -> Optional[User]:
+        return self._fetch_user(f"SELECT {USER_COLUMNS} FROM users WHERE verification_token = ?", token)
+
+    def get_by_reset_token(self, token: str) -> Optional[User]:
+        return self._fetch_user(f"SELECT {USER_COLUMNS} FROM users WHERE reset_token = ?", token)
+
+    def find_conflicts(self, email: str, gamer_tag: str) -> Set[str]:
+        sql = """
+            SELECT email, gamer_tag FROM users WHERE email = ?
+            UNION ALL
+            SELECT email, gamer_tag FROM users WHERE gamer_tag = ?
+        """
+        conflicts = set()
+        with self._lock:
+            rows = self._db.execute(sql, (email, gamer_tag)).fetchall()
+        for row in rows:
+            if row["email"] == email:
+                conflicts.add("email")
+            if row["gamer_tag"] == gamer_tag:
+                conflicts.add("gamer_tag")
+        return conflicts
+
+    def insert(self, user: User) -> None:
+        sql = f"INSERT INTO users ({USER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        now = _to_db(datetime.utcnow())
+        with self._lock:
+            try:
+                self._db.execute(sql, (
+                    str(user.id), user.email, user.password_hash, user.gamer_tag,
+                    int(user.is_verified), user.verification_token,
+                    user.reset_token, _to_db(user.reset_token_expires_at), now, now
+                ))
+            except sqlite3.IntegrityError as e:
+                self._raise_duplicate(e)
+                raise
+
+    def update(self, user: User) -> None:
+        sql = """
+            UPDATE users
+            SET email=?, password_hash=?, gamer_tag=?, is_verified=?, verification_token=?,
+                reset_token=?, reset_token_expires_at=?, updated_at=?
+            WHERE id=?
+        """
+        with self._lock:
+            try:
+                self._db.execute(sql, (
+                    user.email, user.password_hash, user.gamer_tag,
+                    int(user.is_verified), user.verification_token,
+                    user.reset_token, _to_db(user.reset_token_expires_at),
+                    _to_db(datetime.utcnow()), str(user.id)
+                ))
+            except sqlite3.IntegrityError as e:
+                self._raise_duplicate(e)
+                raise
+
+    # ===== SESSION METHODS =====
+
+    def create_session(self, session: Session) -> None:
+        sql = "INSERT INTO sessions (token, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)"
+        with self._lock:
+            self._db.execute(sql, (
+                session.token, str(session.user_id), _to_db(session.created_at), _to_db(session.expires_at)
+            ))
+
+    def get_session(self, token: str) -> Optional[Session]:
+        sql = "SELECT token, user_id, created_at, expires_at FROM sessions WHERE token = ?"
+        with self._lock:
+            row = self._db.execute(sql, (token,)).fetchone()
+        return self._row_to_session(row) if row else None
+
+    def get_user_by_session_token(self, token: str) -> Optional[Tuple[Session, User]]:
+        sql = """
+            SELECT s.token, s.user_id, s.created_at AS session_created_at, s.expires_at,
+                   u.id, u.email, u.password_hash, u.gamer_tag, u.is_verified, u.verification_token,
+                   u.reset_token, u.reset_token_expires_at, u.created_at, u.updated_at
+            FROM sessions s JOIN users u ON u.id = s.user_id
+            WHERE s.token = ?
+        """
+        with self._lock:
+            row = self._db.execute(sql, (token,)).fetchone()
+        if not row:
+            return None
+        session = self._row_to_session(dict(row, created_at=row["session_created_at"]))
+        return session, self._row_to_user(row)
+
+    def delete_session(self, token: str) -> bool:
+        with self._lock:
+            return self._db.execute("DELETE FROM sessions WHERE token = ?", (token,)).rowcount > 0
+
+    def delete_expired_sessions(self, limit: Optional[int] = None) -> int:
+        now = _to_db(datetime.utcnow())
+        if limit is None:
+            sql, params = "DELETE FROM sessions WHERE expires_at < ?", (now,)
+        else:
+            # DELETE ... LIMIT needs a compile-time option, so go through the primary key
+            sql = """
+                DELETE FROM sessions WHERE token IN (
+                    SELECT token FROM sessions WHERE expires_at < ? ORDER BY expires_at LIMIT ?
+                )
+            """
+            params = (now, limit)
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    # ===== SIGNED-SESSION REVOCATIONS =====
+
+    def revoke_token(self, token_id: str, expires_at: datetime) -> None:
+        sql = "INSERT OR IGNORE INTO revoked_tokens (token_id, expires_at, revoked_at) VALUES (?, ?, ?)"
+        with self._lock:
+            self._db.execute(sql, (token_id, _to_db(expires_at), _to_db(datetime.utcnow())))
+
+    def is_token_revoked(self, token_id: str) -> bool:
+        sql = "SELECT 1 FROM revoked_tokens WHERE token_id = ?"
+        with self._lock:
+            return self._db.execute(sql, (token_id,)).fetchone() is not None
+
+    def revoke_user_sessions(self, user_id: str, revoked_at: datetime) -> None:
+        sql = "UPDATE users SET sessions_revoked_at = ? WHERE id = ?"
+        with self._lock:
+            self._db.execute(sql, (_to_db(revoked_at), str(user_id)))
+
+    def load_revocations(self, since: datetime) -> Tuple[List[str], Dict[str, datetime]]:
+        with self._lock:
+            tokens = self._db.execute(
+                "SELECT token_id FROM revoked_tokens WHERE revoked_at > ? AND expires_at > ?",
+                (_to_db(since), _to_db(datetime.utcnow()))
+            ).fetchall()
+            users = self._db.execute(
+                "SELECT id, sessions_revoked_at FROM users WHERE sessions_revoked_at > ?", (_to_db(since),)
+            ).fetchall()
+        return [row[0] for row in tokens], {row[0]: _from_db(row[1]) for row in users}
+
+    def delete_expired_revocations(self, limit: Optional[int] = None) -> int:
+        now = _to_db(datetime.utcnow())
+        if limit is None:
+            sql, params = "DELETE FROM revoked_tokens WHERE expires_at < ?", (now,)
+        else:
+            sql = """
+                DELETE FROM revoked_tokens WHERE token_id IN (
+                    SELECT token_id FROM revoked_tokens WHERE expires_at < ? ORDER BY expires_at LIMIT ?
+                )
+            """
+            params = (now, limit)
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    def advisory_lock(self, name: str):
+        # one node only, so a lock in this process is as wide as it needs to be
+        return self._locks.hold(name)
+
+    # ===== HELPER METHODS =====
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _fetch_user(self, sql: str, value) -> Optional[User]:
+        with self._lock:
+            row = self._db.execute(sql, (value,)).fetchone()
+        return self._row_to_user(row) if row else None
+
+    def _raise_duplicate(self, error) -> None:
+        """Map "UNIQUE constraint failed: users.<column>" onto the column that caused it."""
+        message = str(error)
+        if "users.gamer_tag" in message:
+            raise DuplicateGamerTagError(message) from error
+        if "users.email" in message:
+            raise DuplicateEmailError(message) from error
+
+    def _row_to_user(self, row) -> User:
+        return User(
+            id=row["id"],
+            email=row["email"],
+            password_hash=row["password_hash"],
+            gamer_tag=row["gamer_tag"],
+            is_verified=bool(row["is_verified"]),
+            verification_token=row["verification_token"],
+            reset_token=row["reset_token"],
+            reset_token_expires_at=_from_db(row["reset_token_expires_at"]),
+            created_at=_from_db(row["created_at"]),
+            updated_at=_from_db(row["updated_at"]),
+        )
+
+    def _row_to_session(self, row) -> Session:
+        return Session(
+            token=row["token"],
+            user_id=row["user_id"],
+            created_at=_from_db(row["created_at"]),
+            expires_at=_from_db(row["expires_at"])
+        )
+
+
+def _to_db(value: Optional[datetime]) -> Optional[str]:
+    return value.strftime(_DATETIME_FORMAT) if value is not None else None
+
+def _from_db(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, _DATETIME_FORMAT) if value is not None else None
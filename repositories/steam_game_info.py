@@ -1,35 +1,359 @@
 # python file that will pull steam game info based on app id
 # will display name, price, genres, image, description, and release date 
 
-import requests # type: ignore
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from package.game_cache import DeadAppCache, GameInfoCache
+from package.game_refresher import GameRefresher
+from package.rate_limiter import TokenBucket
+from package.upstream_guard import UpstreamError, UpstreamGuard
+
+# Upstream settings. STORE_URL can be pointed at a local stub server for testing.
+STORE_URL = "https://store.steampowered.com"
+DETAILS_TIMEOUT = 10
+REVIEWS_TIMEOUT = 5
+POOL_SIZE = 32
+# connections the async path (async_app.py) may hold open at once; it waits on sockets, not threads
+ASYNC_POOL_SIZE = 256
+
+# Cache settings (seconds). Review summaries drift faster than name/genres/price.
+# Past its TTL an entry is still served (and refreshed in the background) for STALE_TTL more.
+DETAILS_TTL = 24 * 60 * 60
+REVIEWS_TTL = 60 * 60
+STALE_TTL = 7 * 24 * 60 * 60
+
+game_cache = GameInfoCache()
+# App ids Steam answered success: false for, skipped with exponential backoff
+dead_apps = DeadAppCache()
+
+# Shared keep-alive session and the pool that runs the reviews call next to appdetails.
+# Both are created on first use so importing this module stays cheap (requests is heavy)
+# and each forked worker builds its own.
+http_session = None
+fetch_executor = None
+_http_lock = threading.Lock()
+
+def _new_session(pool_size):
+    import requests # type: ignore
+    from requests.adapters import HTTPAdapter # type: ignore
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_http_session():
+    global http_session
+    if http_session is None:
+        with _http_lock:
+            if http_session is None:
+                http_session = _new_session(POOL_SIZE)
+    return http_session
+
+def get_fetch_executor():
+    global fetch_executor
+    if fetch_executor is None:
+        with _http_lock:
+            if fetch_executor is None:
+                fetch_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="steam-fetch")
+    return fetch_executor
+
+# aiohttp session for the async path. Created on first use inside the worker's event loop
+# (it belongs to that loop) and closed by close_aio_session() when the app shuts down.
+aio_session = None
+
+def get_aio_session():
+    global aio_session
+    if aio_session is None or aio_session.closed:
+        import aiohttp # type: ignore
+        connector = aiohttp.TCPConnector(limit=ASYNC_POOL_SIZE, ttl_dns_cache=300)
+        aio_session = aiohttp.ClientSession(connector=connector)
+    return aio_session
+
+async def close_aio_session():
+    global aio_session
+    session, aio_session = aio_session, None
+    if session is not None:
+        await session.close()
+
+def _is_upstream_failure(exc):
+    """4xx answers (other than 429) mean Steam is up and answering; they don't trip the breaker."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        # aiohttp.ClientResponseError carries the status itself
+        status = getattr(exc, "status", None)
+    if status is not None:
+        return status >= 500 or status == 429
+    return True
+
+# Every real request to Steam goes through this: concurrent identical requests are
+# coalesced, a global token bucket paces them and a circuit breaker fails fast on outages
+upstream = UpstreamGuard(is_failure=_is_upstream_failure)
+
+def configure_upstream(rate=5.0, burst=20.0, max_wait=2.0, failure_threshold=5, reset_timeout=30.0):
+    global upstream
+    upstream = UpstreamGuard(
+        rate=rate, burst=burst, max_wait=max_wait,
+        failure_threshold=failure_threshold, reset_timeout=reset_timeout,
+        is_failure=_is_upstream_failure
+    )
+    return upstream
+
+def _get_json(key, url, timeout):
+    def get():
+        response = get_http_session().get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    return upstream.call(key, get)
+
+async def _get_json_async(key, url, timeout):
+    import aiohttp # type: ignore
+    async def get():
+        async with get_aio_session().get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+    return await upstream.call_async(key, get)
+
+def configure_http(store_url=None, details_timeout=None, reviews_timeout=None, pool_size=None, async_pool_size=None):
+    """
+    Point the fetch layer at another host and/or change timeouts and pool sizes.
+    async_pool_size applies to the next aiohttp session, so set it before the async app starts.
+    """
+    global STORE_URL, DETAILS_TIMEOUT, REVIEWS_TIMEOUT, POOL_SIZE, ASYNC_POOL_SIZE, http_session, fetch_executor
+    if async_pool_size is not None:
+        ASYNC_POOL_SIZE = async_pool_size
+    if store_url is not None:
+        STORE_URL = store_url.rstrip("/")
+    if details_timeout is not None:
+        DETAILS_TIMEOUT = details_timeout
+    if reviews_timeout is not None:
+        REVIEWS_TIMEOUT = reviews_timeout
+    if pool_size is not None and pool_size != POOL_SIZE:
+        POOL_SIZE = pool_size
+        with _http_lock:
+            old_session, old_executor = http_session, fetch_executor
+            http_session, fetch_executor = None, None
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+        if old_session is not None:
+            old_session.close()
+
+def after_fork(share=1.0):
+    """
+    Reset per-process state in a worker forked from a process that imported this module:
+    own cache connections and HTTP clients, and `share` of the Steam request budget
+    (1 / number of workers, so all of them together stay within it).
+    """
+    global http_session, fetch_executor, aio_session, _http_lock
+    game_cache.after_fork()
+    dead_apps.after_fork()
+    http_session, fetch_executor, aio_session = None, None, None
+    _http_lock = threading.Lock()
+    bucket = upstream.bucket
+    upstream.bucket = TokenBucket(rate=bucket.rate * share, capacity=max(1.0, bucket.capacity * share))
+
+def configure_cache(path="steam_cache.db", max_entries=2048, details_ttl=None, reviews_ttl=None, stale_ttl=None):
+    """Swap in a differently sized/located cache and optionally change the TTLs."""
+    global game_cache, dead_apps, DETAILS_TTL, REVIEWS_TTL, STALE_TTL
+    game_cache = GameInfoCache(path=path, max_entries=max_entries)
+    dead_apps = DeadAppCache(path=path)
+    refresher.cache = game_cache
+    if details_ttl is not None:
+        DETAILS_TTL = details_ttl
+    if reviews_ttl is not None:
+        REVIEWS_TTL = reviews_ttl
+    if stale_ttl is not None:
+        STALE_TTL = stale_ttl
+    return game_cache
+
+def refresh_cache_entry(key):
+    """Refetch one cache key from Steam. Runs on the refresher's worker threads."""
+    kind, appid, cc, lang = key
+    if kind == "details":
+        details = fetch_app_details(appid, cc, lang)
+        if details is None:
+            # delisted since we cached it; stop serving the old copy
+            game_cache.invalidate(key)
+            dead_apps.mark_dead(appid, cc)
+            _notify_details(key, None)
+        else:
+            _store_details(key, details)
+    elif kind == "reviews":
+        review_text = fetch_review_summary(appid)
+        if review_text is not None:
+            game_cache.set(key, review_text, REVIEWS_TTL, STALE_TTL)
+
+# Callbacks run as fn(key, details_or_None) whenever game details are (re)fetched,
+# e.g. to keep the genre index current
+details_listeners = []
+
+def _store_details(key, details):
+    game_cache.set(key, details, DETAILS_TTL, STALE_TTL)
+    _notify_details(key, details)
+
+def _notify_details(key, details):
+    for listener in details_listeners:
+        try:
+            listener(key, details)
+        except Exception:
+            pass
+
+# Stale-while-revalidate workers; main.py starts them with start_refresher()
+refresher = GameRefresher(refresh_cache_entry, game_cache)
+
+def start_refresher(workers=2, scan_interval=30.0, refresh_ahead=300.0, jitter=60.0):
+    refresher.workers = workers
+    refresher.scan_interval = scan_interval
+    refresher.refresh_ahead = refresh_ahead
+    refresher.jitter = jitter
+    return refresher.start()
+
+def _cached(key):
+    """Cache read that serves stale entries when a background refresh can take care of them."""
+    value, fresh = game_cache.lookup(key)
+    if value is None or fresh:
+        return value
+    if refresher.running:
+        refresher.enqueue(key)
+        return value
+    return None
+
+def _lookup_local(appid, cc, lang):
+    """Cached details and review summary for one game: (details, review_text, skip), skip=True for known-dead apps."""
+    details = _cached(("details", appid, cc, lang))
+    if details is None and dead_apps.should_skip(appid, cc):
+        # known dead/region-locked and not due for a re-probe yet
+        return None, None, True
+    return details, _cached(("reviews", appid, cc, lang)), False
+
+def _record_details(key, details):
+    """Store a fresh appdetails answer; None means Steam reported the app as unavailable."""
+    kind, appid, cc, lang = key
+    if details is None:
+        dead_apps.mark_dead(appid, cc)
+        _notify_details(key, None)
+    else:
+        dead_apps.mark_alive(appid, cc)
+        _store_details(key, details)
 
 # Steam API function
 def get_steam_game_info(appid: int, cc="us", lang="en"):
-    url = f"https://store.steampowered.com/api/appdetails?appids={appid}&cc={cc}&l={lang}"
-    response = requests.get(url)
-    data = response.json()
+    details_key = ("details", appid, cc, lang)
+    reviews_key = ("reviews", appid, cc, lang)
+    details, review_text, skip = _lookup_local(appid, cc, lang)
+    if skip:
+        return None
+
+    # the two upstream calls are independent, so run the reviews one alongside appdetails
+    reviews_future = None
+    if review_text is None:
+        reviews_future = get_fetch_executor().submit(fetch_review_summary, appid)
+
+    if details is None:
+        try:
+            details = fetch_app_details(appid, cc, lang)
+        except Exception:
+            # Steam is erroring or we are throttled/short-circuited: an old copy beats an error
+            details, _ = game_cache.lookup(details_key)
+            if details is None:
+                raise
+            if reviews_future is not None:
+                reviews_future.cancel()
+            return dict(details, review_summary=review_text or "No reviews")
+        _record_details(details_key, details)
+        if details is None:
+            return None
+
+    if reviews_future is not None:
+        review_text = reviews_future.result()
+        if review_text is None:
+            # don't pin a transient failure in the cache
+            review_text = "No reviews"
+        else:
+            game_cache.set(reviews_key, review_text, REVIEWS_TTL, STALE_TTL)
+
+    return dict(details, review_summary=review_text)
+
+async def get_steam_game_info_async(appid: int, cc="us", lang="en"):
+    """
+    get_steam_game_info for the event loop: same caches, guard and fallbacks, no thread held
+    while Steam answers. The cache and dead-app reads and writes go to sqlite under locks the
+    refresher threads share, so they run on the loop's default executor, never on the loop.
+    """
+    details_key = ("details", appid, cc, lang)
+    reviews_key = ("reviews", appid, cc, lang)
+    details, review_text, skip = await asyncio.to_thread(_lookup_local, appid, cc, lang)
+    if skip:
+        return None
+
+    reviews_task = None
+    if review_text is None:
+        reviews_task = asyncio.ensure_future(fetch_review_summary_async(appid))
+    try:
+        if details is None:
+            try:
+                details = await fetch_app_details_async(appid, cc, lang)
+            except Exception:
+                details, _ = await asyncio.to_thread(game_cache.lookup, details_key)
+                if details is None:
+                    raise
+                return dict(details, review_summary=review_text or "No reviews")
+            await asyncio.to_thread(_record_details, details_key, details)
+            if details is None:
+                return None
+
+        if reviews_task is not None:
+            review_text = await reviews_task
+            if review_text is None:
+                review_text = "No reviews"
+            else:
+                await asyncio.to_thread(game_cache.set, reviews_key, review_text, REVIEWS_TTL, STALE_TTL)
+        return dict(details, review_summary=review_text)
+    finally:
+        # early returns and errors (or the request itself being cancelled) drop the reviews call
+        if reviews_task is not None and not reviews_task.done():
+            reviews_task.cancel()
 
+def fetch_app_details(appid: int, cc="us", lang="en"):
+    url = f"{STORE_URL}/api/appdetails?appids={appid}&cc={cc}&l={lang}"
+    return _parse_details(appid, _get_json(("details", appid, cc, lang), url, DETAILS_TIMEOUT))
+
+async def fetch_app_details_async(appid: int, cc="us", lang="en"):
+    url = f"{STORE_URL}/api/appdetails?appids={appid}&cc={cc}&l={lang}"
+    return _parse_details(appid, await _get_json_async(("details", appid, cc, lang), url, DETAILS_TIMEOUT))
+
+def _parse_details(appid, data):
     if not data[str(appid)]["success"]:
         return None
 
     game_data = data[str(appid)]["data"]
-    
-    review_url = f"https://store.steampowered.com/appreviews/{appid}?json=1&num_per_page=1"
-    try:
-        review_resp = requests.get(review_url, timeout=10)
-        review_resp.raise_for_status()
-        review_data = review_resp.json()
-        review_summary = review_data.get("query_summary", {})
-        review_text = review_summary.get("review_score_desc", "No reviews")
-    except (requests.RequestException, ValueError):
-        review_text = "No reviews"
-                
     return {
         "name": game_data.get("name", "N/A"),
         "price": game_data.get("price_overview", {}).get("final_formatted", "Free"),
         "genres": [g["description"] for g in game_data.get("genres", [])],
         "image": game_data.get("header_image", ""),
         "short_description": game_data.get("short_description", "N/A"),
-        "release_date": game_data.get("release_date", {}).get("date", "N/A"),
-        "review_summary": review_text
-    }
\ No newline at end of file
+        "release_date": game_data.get("release_date", {}).get("date", "N/A")
+    }
+
+def fetch_review_summary(appid: int):
+    import requests # type: ignore
+    review_url = f"{STORE_URL}/appreviews/{appid}?json=1&num_per_page=1"
+    try:
+        review_data = _get_json(("reviews", appid), review_url, REVIEWS_TIMEOUT)
+        review_summary = review_data.get("query_summary", {})
+        return review_summary.get("review_score_desc", "No reviews")
+    except (requests.RequestException, ValueError, UpstreamError):
+        return None
+
+async def fetch_review_summary_async(appid: int):
+    import aiohttp # type: ignore
+    review_url = f"{STORE_URL}/appreviews/{appid}?json=1&num_per_page=1"
+    try:
+        review_data = await _get_json_async(("reviews", appid), review_url, REVIEWS_TIMEOUT)
+        review_summary = review_data.get("query_summary", {})
+        return review_summary.get("review_score_desc", "No reviews")
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, UpstreamError):
+        return None
@@ -0,0 +1,218 @@
+# python file that protects the Steam store from us (and us from it)
+# concurrent lookups for the same key share one in-flight call, every real call
+# takes a token from a global bucket, and a circuit breaker fails fast while Steam errors
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from package.rate_limiter import TokenBucket
+
+class UpstreamError(Exception): pass
+class UpstreamThrottledError(UpstreamError): pass
+class CircuitOpenError(UpstreamError): pass
+
+
+class SingleFlight:
+    """Runs fn once per key at a time; callers arriving meanwhile wait for and share that result."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn: Callable[[], Any]):
+        """Returns (result, shared). shared is True when another caller's call was reused."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: callers on the event loop await the leader's task instead of blocking."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn: Callable[[], Awaitable[Any]]):
+        """Returns (result, shared), like SingleFlight.do."""
+        task = self._calls.get(key)
+        if task is not None:
+            # shield: one impatient caller being cancelled must not cancel the shared call
+            return await asyncio.shield(task), True
+
+        task = self._calls[key] = asyncio.ensure_future(fn())
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), False
+
+    def _finished(self, key, task) -> None:
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            # mark the error as seen even if every caller gave up waiting for it
+            task.exception()
+
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive failures.
+    open -> half_open once reset_timeout has passed; one trial call is let through.
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_running = False
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """Give back a half-open trial slot that ended up not calling upstream."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+
+class UpstreamGuard:
+    """Single-flight + token bucket + circuit breaker around calls to one upstream."""
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: float = 20.0,
+        max_wait: float = 2.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.bucket = TokenBucket(rate=rate, capacity=burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.flights = SingleFlight()
+        self.async_flights = AsyncSingleFlight()
+        self.max_wait = max_wait
+        self.is_failure = is_failure or (lambda e: True)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0, "throttled": 0, "short_circuited": 0, "failures": 0}
+
+    def call(self, key, fn: Callable[..., Any], *args, **kwargs):
+        result, shared = self.flights.do(key, lambda: self._guarded(fn, *args, **kwargs))
+        if shared:
+            self._count("coalesced")
+        return result
+
+    async def call_async(self, key, fn: Callable[..., Awaitable[Any]], *args, **kwargs):
+        """call() for a coroutine function; shares the bucket, breaker and stats with the threaded callers."""
+        result, shared = await self.async_flights.do(key, lambda: self._guarded_async(fn, *args, **kwargs))
+        if shared:
+            self._count("coalesced")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["breaker_state"] = self.breaker.state
+        return stats
+
+    # ===== HELPER METHODS =====
+
+    def _guarded(self, fn, *args, **kwargs):
+        self._check_breaker()
+        self._admit(self.bucket.acquire(timeout=self.max_wait))
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record(e)
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _guarded_async(self, fn, *args, **kwargs):
+        self._check_breaker()
+        self._admit(await self.bucket.acquire_async(timeout=self.max_wait))
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            # nobody is waiting for the answer any more; not a verdict on upstream health
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            self._record(e)
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _check_breaker(self) -> None:
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError("Steam store is failing; not calling it for now.")
+
+    def _admit(self, got_token: bool) -> None:
+        if not got_token:
+            # the call never happened, so this says nothing about upstream health
+            self.breaker.release_trial()
+            self._count("throttled")
+            raise UpstreamThrottledError("Steam store request budget exhausted.")
+        self._count("calls")
+
+    def _record(self, e: Exception) -> None:
+        if self.is_failure(e):
+            self._count("failures")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
@@ -1,21 +1,103 @@
+import copy
+import re
 import mysql.connector
-from typing import Optional
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
 from models.user import User, Session
+from repositories.connection_pool import ConnectionPool
+from repositories import user_schema
+from repositories.user_store import UserStore, DuplicateEmailError, DuplicateGamerTagError
 
-class UserRepository:
-    def __init__(self, conn_params: dict):
+# key name at the end of a 1062 message: "... for key 'users.uq_users_email'" (MySQL 8) or "'uq_users_email'"
+_DUPLICATE_KEY = re.compile(r"for key '(?:[^']*\.)?([^'.]+)'\s*$")
+# unique keys on users -> the column they guard; the bare names are what a pre-migration table used
+_DUPLICATE_KEYS = {
+    "uq_users_email": DuplicateEmailError,
+    "email": DuplicateEmailError,
+    "uq_users_gamer_tag": DuplicateGamerTagError,
+    "gamer_tag": DuplicateGamerTagError,
+}
+
+class UserRepository(UserStore):
+    """
+    MySQL-backed UserStore on a pool of connections.
+
+    Connections run in autocommit mode: a single statement commits (or, for a
+    SELECT, reads) on its own, so nothing is left open to roll back when the
+    connection goes back to the pool. Multi-statement work goes through
+    unit_of_work(), which is the only place a transaction is started.
+    """
+
+    def __init__(
+        self,
+        conn_params: dict,
+        pool_size: int = 10,
+        max_lifetime: float = 30 * 60,
+        acquire_timeout: float = 5.0,
+        check_idle_after: float = 30.0,
+    ):
         self.conn_params = conn_params
+        self.pool = ConnectionPool(
+            connect=lambda: mysql.connector.connect(autocommit=True, **self.conn_params),
+            size=pool_size,
+            max_lifetime=max_lifetime,
+            acquire_timeout=acquire_timeout,
+            check_idle_after=check_idle_after,
+            is_healthy=lambda conn: conn.is_connected(),
+            reset=self._reset_conn,
+        )
+
+    _bound_conn = None
 
     def _get_conn(self):
-        return mysql.connector.connect(**self.conn_params)
+        """Borrow a pooled connection: `with self._get_conn() as conn:` returns it to the pool."""
+        if self._bound_conn is not None:
+            return nullcontext(self._bound_conn)
+        return self.pool.connection()
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Run several repository calls on one connection and one transaction.
+
+            with user_repo.unit_of_work() as repo:
+                repo.delete_expired_sessions()
+                repo.create_session(session)
+
+        Commits when the block exits normally, rolls back if it raises.
+        """
+        if self._bound_conn is not None:
+            # already inside a unit of work; just join it
+            yield self
+            return
+        with self.pool.connection() as conn:
+            conn.start_transaction()
+            repo = copy.copy(self)
+            repo._bound_conn = conn
+            yield repo
+            conn.commit()
+
+    def migrate(self) -> List[int]:
+        """
+        Apply pending schema migrations. Run it once per deploy
+        (python -m repositories.user_schema migrate), not from every worker.
+        """
+        with self.pool.connection() as conn:
+            return user_schema.migrate(conn, "mysql")
+
+    def after_fork(self) -> None:
+        self.pool.after_fork()
+
+    def pool_stats(self) -> dict:
+        return self.pool.stats()
 
     def get_by_email(self, email: str) -> Optional[User]:
         sql = """
             SELECT id, email, password_hash, gamer_tag, is_verified, verification_token, 
                    reset_token, reset_token_expires_at, created_at, updated_at
             FROM users WHERE email = %s
-        """
+        """ + self._for_update()
         with self._get_conn() as conn:
             with conn.cursor(dictionary=True) as cur:
                 cur.execute(sql, (email,))
@@ -27,7 +109,7 @@ class UserRepository:
             SELECT id, email, password_hash, gamer_tag, is_verified, verification_token,
                    reset_token, reset_token_expires_at, created_at, updated_at
             FROM users WHERE gamer_tag = %s
-        """
+        """ + self._for_update()
         with self._get_conn() as conn:
             with conn.cursor(dictionary=True) as cur:
                 cur.execute(sql, (gamer_tag,))
@@ -39,7 +121,7 @@ class UserRepository:
             SELECT id, email, password_hash, gamer_tag, is_verified, verification_token,
                    reset_token, reset_token_expires_at, created_at, updated_at
             FROM users WHERE id = %s
-        """
+        """ + self._for_update()
         with self._get_conn() as conn:
             with conn.cursor(dictionary=True) as cur:
                 cur.execute(sql, (user_id,))
@@ -51,7 +133,7 @@ class UserRepository:
             SELECT id, email, password_hash, gamer_tag, is_verified, verification_token,
                    reset_token, reset_token_expires_at, created_at, updated_at
             FROM users WHERE verification_token = %s
-        """
+        """ + self._for_update()
         with self._get_conn() as conn:
             with conn.cursor(dictionary=True) as cur:
                 cur.execute(sql, (token,))
@@ -63,14 +145,36 @@ class UserRepository:
             SELECT id, email, password_hash, gamer_tag, is_verified, verification_token,
                    reset_token, reset_token_expires_at, created_at, updated_at
             FROM users WHERE reset_token = %s
-        """
+        """ + self._for_update()
         with self._get_conn() as conn:
             with conn.cursor(dictionary=True) as cur:
                 cur.execute(sql, (token,))
                 row = cur.fetchone()
                 return self._row_to_user(row) if row else None
 
+    def find_conflicts(self, email: str, gamer_tag: str) -> Set[str]:
+        """Which of "email" / "gamer_tag" are already taken, in one round trip."""
+        sql = """
+            SELECT email, gamer_tag FROM users WHERE email = %s
+            UNION ALL
+            SELECT email, gamer_tag FROM users WHERE gamer_tag = %s
+        """
+        conflicts = set()
+        with self._get_conn() as conn:
+            with conn.cursor(dictionary=True) as cur:
+                cur.execute(sql, (email, gamer_tag))
+                for row in cur.fetchall():
+                    if row["email"] == email:
+                        conflicts.add("email")
+                    if row["gamer_tag"] == gamer_tag:
+                        conflicts.add("gamer_tag")
+        return conflicts
+
     def insert(self, user: User) -> None:
+        """
+        Raises DuplicateEmailError / DuplicateGamerTagError when the unique
+        constraint on users.email / users.gamer_tag rejects the row.
+        """
         sql = """
             INSERT INTO users (id, email, password_hash, gamer_tag, is_verified, verification_token,
                                reset_token, reset_token_expires_at, created_at, updated_at)
@@ -79,12 +183,15 @@ class UserRepository:
         now = datetime.utcnow()
         with self._get_conn() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (
-                    str(user.id), user.email, user.password_hash, user.gamer_tag,
-                    user.is_verified, user.verification_token,
-                    user.reset_token, user.reset_token_expires_at, now, now
-                ))
-            conn.commit()
+                try:
+                    cur.execute(sql, (
+                        str(user.id), user.email, user.password_hash, user.gamer_tag,
+                        user.is_verified, user.verification_token,
+                        user.reset_token, user.reset_token_expires_at, now, now
+                    ))
+                except mysql.connector.IntegrityError as e:
+                    self._raise_duplicate(e)
+                    raise
 
     def update(self, user: User) -> None:
         sql = """
@@ -101,7 +208,6 @@ class UserRepository:
                     user.reset_token, user.reset_token_expires_at,
                     datetime.utcnow(), str(user.id)
                 ))
-            conn.commit()
 
     # ===== SESSION METHODS =====
 
@@ -113,7 +219,6 @@ class UserRepository:
         with self._get_conn() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (session.token, str(session.user_id), session.created_at, session.expires_at))
-            conn.commit()
 
     def get_session(self, token: str) -> Optional[Session]:
         sql = """
@@ -126,22 +231,133 @@ class UserRepository:
                 row = cur.fetchone()
                 return self._row_to_session(row) if row else None
 
-    def delete_session(self, token: str) -> None:
+    def get_user_by_session_token(self, token: str) -> Optional[Tuple[Session, User]]:
+        """Session and its user in a single JOIN query."""
+        sql = """
+            SELECT s.token, s.user_id, s.created_at AS session_created_at, s.expires_at,
+                   u.id, u.email, u.password_hash, u.gamer_tag, u.is_verified, u.verification_token,
+                   u.reset_token, u.reset_token_expires_at, u.created_at, u.updated_at
+            FROM sessions s JOIN users u ON u.id = s.user_id
+            WHERE s.token = %s
+        """
+        with self._get_conn() as conn:
+            with conn.cursor(dictionary=True) as cur:
+                cur.execute(sql, (token,))
+                row = cur.fetchone()
+                if not row:
+                    return None
+                session = self._row_to_session(dict(row, created_at=row["session_created_at"]))
+                return session, self._row_to_user(row)
+
+    def delete_session(self, token: str) -> bool:
+        """Returns True if a session was deleted."""
         sql = "DELETE FROM sessions WHERE token = %s"
         with self._get_conn() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (token,))
-            conn.commit()
+                deleted = cur.rowcount > 0
+        return deleted
 
-    def delete_expired_sessions(self) -> None:
+    def delete_expired_sessions(self, limit: Optional[int] = None) -> int:
+        """Delete expired sessions (at most `limit` of them, oldest first). Returns the row count."""
         sql = "DELETE FROM sessions WHERE expires_at < %s"
+        params = (datetime.utcnow(),)
+        if limit is not None:
+            sql += " ORDER BY expires_at LIMIT %s"
+            params += (limit,)
         with self._get_conn() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, (datetime.utcnow(),))
-            conn.commit()
+                cur.execute(sql, params)
+                deleted = cur.rowcount
+        return deleted
+
+    # ===== SIGNED-SESSION REVOCATIONS =====
+
+    def revoke_token(self, token_id: str, expires_at: datetime) -> None:
+        sql = "INSERT IGNORE INTO revoked_tokens (token_id, expires_at, revoked_at) VALUES (%s, %s, %s)"
+        with self._get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (token_id, expires_at, datetime.utcnow()))
+
+    def is_token_revoked(self, token_id: str) -> bool:
+        sql = "SELECT 1 FROM revoked_tokens WHERE token_id = %s"
+        with self._get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (token_id,))
+                return cur.fetchone() is not None
+
+    def revoke_user_sessions(self, user_id: str, revoked_at: datetime) -> None:
+        sql = "UPDATE users SET sessions_revoked_at = %s WHERE id = %s"
+        with self._get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (revoked_at, str(user_id)))
+
+    def load_revocations(self, since: datetime) -> Tuple[List[str], Dict[str, datetime]]:
+        with self._get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT token_id FROM revoked_tokens WHERE revoked_at > %s AND expires_at > %s",
+                    (since, datetime.utcnow())
+                )
+                token_ids = [row[0] for row in cur.fetchall()]
+                cur.execute("SELECT id, sessions_revoked_at FROM users WHERE sessions_revoked_at > %s", (since,))
+                users = {row[0]: row[1] for row in cur.fetchall()}
+        return token_ids, users
+
+    def delete_expired_revocations(self, limit: Optional[int] = None) -> int:
+        sql = "DELETE FROM revoked_tokens WHERE expires_at < %s"
+        params = (datetime.utcnow(),)
+        if limit is not None:
+            sql += " ORDER BY expires_at LIMIT %s"
+            params += (limit,)
+        with self._get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                deleted = cur.rowcount
+        return deleted
+
+    @contextmanager
+    def advisory_lock(self, name: str):
+        """
+        MySQL named lock held for the duration of the block; yields whether it
+        was acquired. Lets one worker across all processes/hosts own a job.
+        """
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT GET_LOCK(%s, 0)", (name,))
+                acquired = cur.fetchone()[0] == 1
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT RELEASE_LOCK(%s)", (name,))
+                        cur.fetchone()
 
     # ===== HELPER METHODS =====
 
+    def _for_update(self) -> str:
+        # in a unit of work the row is usually read to be written back; lock it so two
+        # concurrent flows (e.g. resets with the same token) can't both pass the check
+        return " FOR UPDATE" if self._bound_conn is not None else ""
+
+    def _raise_duplicate(self, error) -> None:
+        """Map a MySQL duplicate-key error (1062) onto the column that caused it."""
+        if getattr(error, "errno", None) != 1062:
+            return
+        # match the key name, not the whole message: the duplicate value is in there too
+        message = getattr(error, "msg", None) or str(error)
+        match = _DUPLICATE_KEY.search(message)
+        duplicate = _DUPLICATE_KEYS.get(match.group(1)) if match else None
+        if duplicate is not None:
+            raise duplicate(message) from error
+
+    def _reset_conn(self, conn) -> None:
+        # only a unit of work opens a transaction (autocommit otherwise), and it commits or
+        # rolls back before release; this catches one abandoned some other way, no round trip if not
+        if conn.in_transaction:
+            conn.rollback()
+
     def _row_to_user(self, row: dict) -> User:
         return User(
             id=row["id"],
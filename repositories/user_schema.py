@@ -0,0 +1,425 @@
+# python file that owns the users/sessions schema and its versioned migrations
+# every query UserRepository runs is a point lookup or a range delete, so every
+# one of them needs an index; check_query_plans() proves it with EXPLAIN:
+#   python -m repositories.user_schema migrate --backend sqlite --path users.db
+#   python -m repositories.user_schema check --backend mysql --database project_326 --user root
+
+import argparse
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from models.user import User, Session
+
+class QueryPlanError(Exception): pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    mysql: List[str] = field(default_factory=list)
+    sqlite: List[str] = field(default_factory=list)
+
+
+def _mysql_add_unique(table: str, key: str, column: str) -> List[str]:
+    """
+    ALTER TABLE ... ADD UNIQUE KEY unless the table already has a unique key on
+    exactly that column (MySQL has no ADD UNIQUE IF NOT EXISTS).
+    """
+    return [
+        f"""
+        SET @ddl = (
+            SELECT IF(COUNT(*) = 0, 'ALTER TABLE {table} ADD UNIQUE KEY {key} ({column})', 'DO 0')
+            FROM (
+                SELECT index_name FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = '{table}' AND non_unique = 0
+                GROUP BY index_name
+                HAVING COUNT(*) = 1 AND MAX(column_name) = '{column}'
+            ) AS unique_keys
+        )
+        """,
+        "PREPARE add_unique FROM @ddl",
+        "EXECUTE add_unique",
+        "DEALLOCATE PREPARE add_unique",
+    ]
+
+
+# Append only: a deployed migration is never edited, a new version is added instead.
+MIGRATIONS = [
+    Migration(
+        1, "users and sessions tables with their unique keys",
+        mysql=[
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id CHAR(36) NOT NULL PRIMARY KEY,
+                email VARCHAR(255) NOT NULL,
+                password_hash VARCHAR(255) NOT NULL,
+                gamer_tag VARCHAR(64) NOT NULL,
+                is_verified BOOLEAN NOT NULL DEFAULT FALSE,
+                verification_token VARCHAR(128) NULL,
+                reset_token VARCHAR(128) NULL,
+                reset_token_expires_at DATETIME(6) NULL,
+                created_at DATETIME(6) NOT NULL,
+                updated_at DATETIME(6) NOT NULL,
+                UNIQUE KEY uq_users_email (email),
+                UNIQUE KEY uq_users_gamer_tag (gamer_tag)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                token VARCHAR(64) NOT NULL PRIMARY KEY,
+                user_id CHAR(36) NOT NULL,
+                created_at DATETIME(6) NOT NULL,
+                expires_at DATETIME(6) NOT NULL,
+                CONSTRAINT fk_sessions_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """,
+        ],
+        sqlite=[
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id TEXT PRIMARY KEY,
+                email TEXT NOT NULL,
+                password_hash TEXT NOT NULL,
+                gamer_tag TEXT NOT NULL,
+                is_verified INTEGER NOT NULL DEFAULT 0,
+                verification_token TEXT,
+                reset_token TEXT,
+                reset_token_expires_at TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                token TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                created_at TEXT NOT NULL,
+                expires_at TEXT NOT NULL
+            )
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_users_email ON users (email)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_users_gamer_tag ON users (gamer_tag)",
+        ],
+    ),
+    Migration(
+        2, "secondary indexes for token lookups and the expired-session sweep",
+        mysql=[
+            """
+            ALTER TABLE users
+                ADD INDEX idx_users_verification_token (verification_token),
+                ADD INDEX idx_users_reset_token (reset_token)
+            """,
+            # sessions.user_id is already indexed by its foreign key
+            "ALTER TABLE sessions ADD INDEX idx_sessions_expires_at (expires_at)",
+        ],
+        sqlite=[
+            "CREATE INDEX IF NOT EXISTS idx_users_verification_token ON users (verification_token)",
+            "CREATE INDEX IF NOT EXISTS idx_users_reset_token ON users (reset_token)",
+            "CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)",
+            "CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id)",
+        ],
+    ),
+    Migration(
+        3, "revocations for signed session tokens",
+        mysql=[
+            """
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                token_id VARCHAR(64) NOT NULL PRIMARY KEY,
+                expires_at DATETIME(6) NOT NULL,
+                revoked_at DATETIME(6) NOT NULL,
+                INDEX idx_revoked_tokens_revoked_at (revoked_at),
+                INDEX idx_revoked_tokens_expires_at (expires_at)
+            ) ENGINE=InnoDB
+            """,
+            """
+            ALTER TABLE users
+                ADD COLUMN sessions_revoked_at DATETIME(6) NULL,
+                ADD INDEX idx_users_sessions_revoked_at (sessions_revoked_at)
+            """,
+        ],
+        sqlite=[
+            """
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                token_id TEXT PRIMARY KEY,
+                expires_at TEXT NOT NULL,
+                revoked_at TEXT NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens (revoked_at)",
+            "CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens (expires_at)",
+            "ALTER TABLE users ADD COLUMN sessions_revoked_at TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_users_sessions_revoked_at ON users (sessions_revoked_at)",
+        ],
+    ),
+    Migration(
+        # migration 1's CREATE TABLE IF NOT EXISTS left a users table that predates it without
+        # them; signup relies on these keys to catch duplicates. Fails (and is fixed forward)
+        # if that table already holds duplicate emails or gamer tags.
+        4, "unique keys on users.email and users.gamer_tag for tables created before migration 1",
+        mysql=(
+            _mysql_add_unique("users", "uq_users_email", "email")
+            + _mysql_add_unique("users", "uq_users_gamer_tag", "gamer_tag")
+        ),
+        # migration 1 already created these with CREATE UNIQUE INDEX IF NOT EXISTS
+        sqlite=[],
+    ),
+]
+
+_VERSION_TABLE = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT NOT NULL PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at DATETIME(6) NOT NULL
+        ) ENGINE=InnoDB
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """,
+}
+_PLACEHOLDER = {"mysql": "%s", "sqlite": "?"}
+
+
+def current_version(conn, dialect: str) -> int:
+    """Highest applied migration version (0 for an empty database)."""
+    cur = conn.cursor()
+    try:
+        cur.execute(_VERSION_TABLE[dialect])
+        cur.execute("SELECT MAX(version) FROM schema_migrations")
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    return row[0] or 0
+
+
+def migrate(conn, dialect: str, log=print) -> List[int]:
+    """
+    Apply every migration newer than the database's version, in order.
+    Returns the versions applied. On SQLite each migration is one
+    transaction; MySQL commits DDL implicitly, so there a failed migration
+    has to be fixed forward.
+    """
+    applied = []
+    version = current_version(conn, dialect)
+    placeholder = _PLACEHOLDER[dialect]
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        cur = conn.cursor()
+        try:
+            if dialect == "sqlite":
+                cur.execute("BEGIN")
+            for statement in getattr(migration, dialect):
+                cur.execute(statement)
+            cur.execute(
+                f"INSERT INTO schema_migrations (version, description, applied_at) "
+                f"VALUES ({placeholder}, {placeholder}, {placeholder})",
+                (migration.version, migration.description, str(datetime.utcnow()))
+            )
+            if dialect == "sqlite":
+                cur.execute("COMMIT")
+            else:
+                conn.commit()
+        except BaseException:
+            if dialect == "sqlite":
+                cur.execute("ROLLBACK")
+            raise
+        finally:
+            cur.close()
+        applied.append(migration.version)
+        log(f"[schema] applied migration {migration.version}: {migration.description}")
+    return applied
+
+
+# ===== QUERY PLAN CHECK =====
+
+def check_query_plans(store) -> List[Tuple[str, str]]:
+    """
+    Run every UserRepository query once inside a rolled-back unit of work,
+    EXPLAIN each one, and raise QueryPlanError if any of them reads a whole
+    table. Returns (sql, plan) for every query checked.
+
+    MySQL may prefer a scan on a nearly empty table, so run this against a
+    database with production-like row counts.
+    """
+    dialect = _dialect(store)
+    results = []
+    try:
+        with store.unit_of_work() as repo:
+            statements = _record_statements(repo, dialect)
+            try:
+                _exercise(repo)
+            finally:
+                _stop_recording(repo, dialect)
+            for sql, params in _queries_only(statements):
+                results.append((sql, _explain(repo, dialect, sql, params)))
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+    scans = [(sql, plan) for sql, plan in results if _is_full_scan(dialect, plan)]
+    if scans:
+        raise QueryPlanError("Full table scan in:\n" + "\n".join(
+            f"  {' '.join(sql.split())}\n    -> {plan}" for sql, plan in scans
+        ))
+    return results
+
+
+class _Rollback(Exception): pass
+
+
+class _RecordingConnection:
+    """Wraps a DB-API connection and notes every (sql, params) its cursors execute."""
+
+    def __init__(self, conn, statements):
+        self._conn = conn
+        self._statements = statements
+
+    def cursor(self, *args, **kwargs):
+        return _RecordingCursor(self._conn.cursor(*args, **kwargs), self._statements)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _RecordingCursor:
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+
+    def execute(self, sql, params=()):
+        self._statements.append((sql, params))
+        return self._cursor.execute(sql, params)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _dialect(store) -> str:
+    name = type(store).__name__
+    if name == "UserRepository":
+        return "mysql"
+    if name == "SQLiteUserRepository":
+        return "sqlite"
+    raise ValueError(f"{name} has no query planner to check")
+
+
+def _record_statements(repo, dialect: str) -> list:
+    statements = []
+    if dialect == "mysql":
+        repo._bound_conn = _RecordingConnection(repo._bound_conn, statements)
+    else:
+        # sqlite hands the trace callback the SQL with its parameters already inlined
+        repo._db.set_trace_callback(lambda sql: statements.append((sql, ())))
+    return statements
+
+
+def _stop_recording(repo, dialect: str) -> None:
+    if dialect == "mysql":
+        repo._bound_conn = repo._bound_conn._conn
+    else:
+        repo._db.set_trace_callback(None)
+
+
+def _exercise(repo) -> None:
+    """Call every query method once, with a throwaway user and sessions."""
+    user = User.create_new("plan-check@example.invalid", "x", "plan-check", verification_token="plan-check")
+    session = Session.create_new(user.id)
+    expired = Session(token="plan-check-expired", user_id=user.id, expires_at=datetime.utcnow() - timedelta(days=1))
+
+    repo.insert(user)
+    repo.get_by_email(user.email)
+    repo.get_by_gamer_tag(user.gamer_tag)
+    repo.get_by_id(str(user.id))
+    repo.get_by_verification_token(user.verification_token)
+    user.set_reset_token("plan-check")
+    repo.update(user)
+    repo.get_by_reset_token(user.reset_token)
+    repo.find_conflicts(user.email, user.gamer_tag)
+    repo.create_session(session)
+    repo.create_session(expired)
+    repo.get_session(session.token)
+    repo.get_user_by_session_token(session.token)
+    repo.delete_session(session.token)
+    repo.delete_expired_sessions(limit=10)
+    repo.delete_expired_sessions()
+    repo.revoke_token("plan-check", session.expires_at)
+    repo.is_token_revoked("plan-check")
+    repo.revoke_user_sessions(str(user.id), datetime.utcnow())
+    repo.load_revocations(datetime.utcnow() - timedelta(days=7))
+    repo.delete_expired_revocations(limit=10)
+
+
+def _explain(repo, dialect: str, sql: str, params) -> str:
+    if dialect == "mysql":
+        with repo._bound_conn.cursor(dictionary=True) as cur:
+            cur.execute("EXPLAIN " + sql, params)
+            rows = cur.fetchall()
+        return "; ".join(
+            f"{row['table']}:{row['type']}" + (f" key={row['key']}" if row.get("key") else "")
+            for row in rows
+        )
+    rows = repo._db.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    return "; ".join(row[3] for row in rows)
+
+
+def _is_full_scan(dialect: str, plan: str) -> bool:
+    if dialect == "mysql":
+        # type ALL is a full table scan; <union1,2> style rows are temporary results
+        return any(part.endswith(":ALL") and not part.startswith("<") for part in plan.split("; "))
+    # "SCAN users" reads the table; "SCAN users USING INDEX ..." / "SEARCH ..." don't
+    return any(re.match(r"SCAN (TABLE )?\w+$", part) for part in plan.split("; "))
+
+
+def _queries_only(statements) -> list:
+    # inserts can't scan, and BEGIN/COMMIT have no plan
+    return [s for s in statements if s[0].lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply user/session schema migrations or check repository query plans.")
+    parser.add_argument("command", choices=["migrate", "check"])
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--path", default="users.db", help="sqlite database file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="project_326")
+    args = parser.parse_args(argv)
+
+    from repositories.user_store import create_user_store
+    if args.backend == "mysql":
+        conn_params = {"host": args.host, "user": args.user, "password": args.password, "database": args.database}
+        store = create_user_store("mysql", conn_params=conn_params, pool_size=1)
+    else:
+        store = create_user_store("sqlite", path=args.path)
+
+    if args.command == "migrate":
+        applied = store.migrate()
+        print(f"[schema] {len(applied)} migration(s) applied")
+        return 0
+
+    try:
+        results = check_query_plans(store)
+    except QueryPlanError as e:
+        print(f"[schema] {e}")
+        return 1
+    for sql, plan in results:
+        print(f"[schema] ok  {' '.join(sql.split())[:80]}\n      -> {plan}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import ContextManager, Dict, List, Optional, Set, Tuple
+from models.user import User, Session
+
+class DuplicateEmailError(Exception): pass
+class DuplicateGamerTagError(Exception): pass
+
+
+class UserStore(ABC):
+    """
+    Storage backend for users and sessions.
+
+    UserRepository (MySQL), SQLiteUserRepository and InMemoryUserRepository
+    implement it with the same semantics, so AuthService and SessionSweeper
+    don't care which one main.py picked.
+    """
+
+    # ===== USER METHODS =====
+
+    @abstractmethod
+    def get_by_email(self, email: str) -> Optional[User]: ...
+
+    @abstractmethod
+    def get_by_gamer_tag(self, gamer_tag: str) -> Optional[User]: ...
+
+    @abstractmethod
+    def get_by_id(self, user_id: str) -> Optional[User]: ...
+
+    @abstractmethod
+    def get_by_verification_token(self, token: str) -> Optional[User]: ...
+
+    @abstractmethod
+    def get_by_reset_token(self, token: str) -> Optional[User]: ...
+
+    @abstractmethod
+    def find_conflicts(self, email: str, gamer_tag: str) -> Set[str]:
+        """Which of "email" / "gamer_tag" are already taken."""
+
+    @abstractmethod
+    def insert(self, user: User) -> None:
+        """Raises DuplicateEmailError / DuplicateGamerTagError if the email or gamer tag is taken."""
+
+    @abstractmethod
+    def update(self, user: User) -> None: ...
+
+    # ===== SESSION METHODS =====
+
+    @abstractmethod
+    def create_session(self, session: Session) -> None: ...
+
+    @abstractmethod
+    def get_session(self, token: str) -> Optional[Session]: ...
+
+    @abstractmethod
+    def get_user_by_session_token(self, token: str) -> Optional[Tuple[Session, User]]: ...
+
+    @abstractmethod
+    def delete_session(self, token: str) -> bool:
+        """Returns True if a session was deleted."""
+
+    @abstractmethod
+    def delete_expired_sessions(self, limit: Optional[int] = None) -> int:
+        """Delete expired sessions (at most `limit` of them, oldest first). Returns the count."""
+
+    # ===== SIGNED-SESSION REVOCATIONS =====
+
+    @abstractmethod
+    def revoke_token(self, token_id: str, expires_at: datetime) -> None:
+        """Record that a signed session token was revoked (kept until it would have expired anyway)."""
+
+    @abstractmethod
+    def is_token_revoked(self, token_id: str) -> bool: ...
+
+    @abstractmethod
+    def revoke_user_sessions(self, user_id: str, revoked_at: datetime) -> None:
+        """Revoke every signed session of the user issued up to revoked_at."""
+
+    @abstractmethod
+    def load_revocations(self, since: datetime) -> Tuple[List[str], Dict[str, datetime]]:
+        """(ids of unexpired tokens revoked after since, {user_id: revoked_at} for users revoked after since)."""
+
+    @abstractmethod
+    def delete_expired_revocations(self, limit: Optional[int] = None) -> int:
+        """Forget revoked tokens that have expired anyway (at most `limit`). Returns the count."""
+
+    # ===== COORDINATION =====
+
+    @abstractmethod
+    def unit_of_work(self) -> ContextManager["UserStore"]:
+        """Yields a store whose calls share one transaction: committed on exit, rolled back on error."""
+
+    @abstractmethod
+    def advisory_lock(self, name: str) -> ContextManager[bool]:
+        """Named lock held for the block; yields whether it was acquired (never waits)."""
+
+    def migrate(self) -> List[int]:
+        """Bring the schema up to date; returns the migration versions applied."""
+        return []
+
+    def after_fork(self) -> None:
+        """Called in each worker forked from a process that built the store; drop handles that can't be shared."""
+
+    def pool_stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+
+class LocalLocks:
+    """Process-local named locks, for backends with no shared server to hold a lock for us."""
+
+    def __init__(self):
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, name: str):
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        acquired = lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+
+
+def create_user_store(backend: str, **options) -> UserStore:
+    """
+    Build the configured backend:
+      "mysql"  -> UserRepository(conn_params, pool_size=..., ...)
+      "sqlite" -> SQLiteUserRepository(path) -- a file, or ":memory:"
+      "memory" -> InMemoryUserRepository()
+    Imports are lazy so e.g. the sqlite backend runs without mysql-connector installed.
+    """
+    if backend == "mysql":
+        from repositories.user_repository import UserRepository
+        return UserRepository(**options)
+    if backend == "sqlite":
+        from repositories.sqlite_user_repository import SQLiteUserRepository
+        return SQLiteUserRepository(**options)
+    if backend == "memory":
+        from repositories.memory_user_repository import InMemoryUserRepository
+        return InMemoryUserRepository(**options)
+    raise ValueError(f"Unknown user store backend: {backend!r}")
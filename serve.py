@@ -0,0 +1,306 @@
+# serve.py
+# Production entry point. The master process imports the app once, loads the read-only data
+# (game catalog, genre index, hot cache entries) and then forks workers that share those pages
+# copy-on-write, so a new worker is serving within moments instead of re-importing everything.
+# Each worker opens its own database handles, starts its background threads and fills its
+# caches before it starts accepting connections on the listening socket they all share.
+# Workers run the aiohttp front end from async_app.py (pip install aiohttp).
+#
+#   python serve.py --bind 0.0.0.0:8000        one worker per CPU
+#   kill -HUP <master pid>                     replace every worker, one at a time
+#   kill -TERM <master pid>                    finish in-flight requests, then exit
+#
+# A worker is replaced after --max-requests requests (plus jitter) or --max-age seconds. Its
+# replacement is started first and the old worker only stops once the new one is warm.
+
+import argparse
+import gc
+import importlib
+import os
+import random
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Dict, Optional
+
+# worker -> master messages on each worker's pipe
+_READY = b"R"
+_RETIRE = b"X"
+
+
+class Worker:
+    def __init__(self, pid: int, pipe: int, max_age: Optional[float]):
+        self.pid = pid
+        self.pipe = pipe
+        self.started_at = time.monotonic()
+        self.retire_at = self.started_at + max_age if max_age else None
+        self.ready = False
+        # due for replacement; keeps serving until its replacement is ready
+        self.retiring = False
+        self.stopped_at: Optional[float] = None
+
+
+class Master:
+    """Pre-forking process manager: keeps `size` warm workers serving on one shared socket."""
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        size: int,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        max_age: float = 0,
+        graceful_timeout: float = 30.0,
+        warm_up_timeout: float = 10.0
+    ):
+        self.sock = sock
+        self.size = size
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.max_age = max_age
+        self.graceful_timeout = graceful_timeout
+        self.warm_up_timeout = warm_up_timeout
+
+        self.workers: Dict[int, Worker] = {}
+        self._stopping = False
+        self._reload = False
+        self._failures = 0
+        self._next_spawn_at = 0.0
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        print(f"[serve] master {os.getpid()} serving on {self._address()} with {self.size} workers")
+
+        while True:
+            self._reap()
+            self._read_pipes()
+            if self._stopping:
+                for worker in self.workers.values():
+                    self._stop(worker)
+                if not self.workers:
+                    print("[serve] all workers stopped")
+                    return 0
+            else:
+                if self._reload:
+                    self._reload = False
+                    print("[serve] SIGHUP: replacing every worker")
+                    for worker in self.workers.values():
+                        worker.retiring = True
+                self._check_age()
+                self._scale()
+            self._kill_stragglers()
+            time.sleep(0.1)
+
+    # ===== HELPER METHODS =====
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _on_reload(self, signum, frame) -> None:
+        self._reload = True
+
+    def _scale(self) -> None:
+        serving = [w for w in self.workers.values() if w.stopped_at is None]
+        current = [w for w in serving if not w.retiring]
+        retiring = [w for w in serving if w.retiring]
+        starting = [w for w in current if not w.ready]
+
+        # a worker that died is replaced right away; planned replacements go one at a time
+        missing = self.size - len(current)
+        if retiring and starting:
+            missing = 0
+        elif retiring:
+            missing = min(missing, 1)
+        for _ in range(missing):
+            if time.monotonic() < self._next_spawn_at:
+                break
+            self._spawn()
+
+        # an old worker stops once a ready replacement has taken its place
+        ready = sum(1 for w in current if w.ready)
+        for worker in retiring[:max(0, ready + len(retiring) - self.size)]:
+            self._stop(worker)
+
+    def _check_age(self) -> None:
+        now = time.monotonic()
+        for worker in self.workers.values():
+            if worker.retire_at is not None and now >= worker.retire_at and not worker.retiring:
+                worker.retiring = True
+
+    def _spawn(self) -> None:
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            code = 1
+            try:
+                self._run_worker(write_end)
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+
+        os.close(write_end)
+        os.set_blocking(read_end, False)
+        # spread the age limit so workers started together don't all restart together
+        max_age = self.max_age * random.uniform(0.9, 1.1) if self.max_age else None
+        self.workers[pid] = Worker(pid, read_end, max_age)
+
+    def _run_worker(self, pipe: int) -> None:
+        for worker in self.workers.values():
+            os.close(worker.pipe)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+        started = time.monotonic()
+        app_main = sys.modules["main"]
+        app_main.after_fork(workers=self.size)
+        app_main.start_background()
+        buffered = app_main.warm_up(self.warm_up_timeout)
+
+        from aiohttp import web # type: ignore
+        import async_app
+        app = async_app.create_app()
+        if self.max_requests:
+            app.middlewares.append(_recycle_after(self.max_requests + random.randint(0, self.max_requests_jitter), pipe))
+
+        async def ready(app):
+            os.write(pipe, _READY)
+            print(f"[serve] worker {os.getpid()} ready in {time.monotonic() - started:.2f}s ({buffered} games buffered)")
+
+        app.on_startup.append(ready)
+        web.run_app(app, sock=self.sock, shutdown_timeout=self.graceful_timeout, print=None)
+        # requests are done; let the background threads finish what they started (e.g. an email batch)
+        app_main.stop_background()
+
+    def _read_pipes(self) -> None:
+        for worker in self.workers.values():
+            try:
+                data = os.read(worker.pipe, 64)
+            except BlockingIOError:
+                continue
+            if _READY in data and not worker.ready:
+                worker.ready = True
+                self._failures = 0
+            if _RETIRE in data and not worker.retiring:
+                worker.retiring = True
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            os.close(worker.pipe)
+            if worker.stopped_at is None and not self._stopping:
+                code = os.waitstatus_to_exitcode(status)
+                print(f"[serve] worker {pid} exited unexpectedly (code {code})")
+                if not worker.ready:
+                    # failing during startup: back off instead of fork-looping
+                    self._failures += 1
+                    self._next_spawn_at = time.monotonic() + min(30.0, 0.5 * 2 ** self._failures)
+
+    def _stop(self, worker: Worker) -> None:
+        if worker.stopped_at is None:
+            worker.stopped_at = time.monotonic()
+            os.kill(worker.pid, signal.SIGTERM)
+
+    def _kill_stragglers(self) -> None:
+        now = time.monotonic()
+        for worker in self.workers.values():
+            if worker.stopped_at is not None and now - worker.stopped_at > self.graceful_timeout + 5:
+                os.kill(worker.pid, signal.SIGKILL)
+
+    def _address(self) -> str:
+        host, port = self.sock.getsockname()[:2]
+        return f"{host}:{port}"
+
+
+def _recycle_after(limit: int, pipe: int):
+    """Middleware that asks the master for a replacement once this worker has served `limit` requests."""
+    from aiohttp import web # type: ignore
+    served = 0
+
+    @web.middleware
+    async def recycle(request, handler):
+        nonlocal served
+        try:
+            return await handler(request)
+        finally:
+            served += 1
+            if served == limit:
+                os.write(pipe, _RETIRE)
+
+    return recycle
+
+
+def default_workers() -> int:
+    """One worker per CPU this process may run on (async workers don't need more)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def bind(address: str, backlog: int = 2048) -> socket.socket:
+    host, _, port = address.rpartition(":")
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host.strip("[]") or "0.0.0.0", int(port)))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the app from a preloaded master and forked workers.")
+    parser.add_argument("--bind", default="127.0.0.1:8000", help="host:port to listen on")
+    parser.add_argument("--workers", type=int, default=0, help="number of workers (default: one per CPU)")
+    parser.add_argument("--max-requests", type=int, default=10_000, help="replace a worker after this many requests (0: never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=1_000)
+    parser.add_argument("--max-age", type=float, default=0, help="replace a worker after this many seconds (0: never)")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0, help="seconds a stopping worker gets to finish requests")
+    parser.add_argument("--warm-up-timeout", type=float, default=10.0, help="longest a new worker waits for its caches")
+    args = parser.parse_args(argv)
+
+    # bind first: a port already in use should fail before the slow part
+    sock = bind(args.bind)
+    size = args.workers or default_workers()
+
+    started = time.monotonic()
+    # background threads are started per worker after the fork, not here
+    os.environ["APP_PRELOAD"] = "1"
+    app_main = importlib.import_module("main")
+    if app_main.USER_STORE == "memory" and size > 1:
+        print("[serve] warning: the memory user store is per process; sessions won't be shared between workers")
+    app_main.preload()
+    # everything loaded so far lives for the whole run: keep the collector from touching
+    # (and so copying) those pages in every worker
+    gc.collect()
+    gc.freeze()
+    print(f"[serve] preloaded in {time.monotonic() - started:.2f}s")
+
+    return Master(
+        sock, size,
+        max_requests=args.max_requests,
+        max_requests_jitter=args.max_requests_jitter,
+        max_age=args.max_age,
+        graceful_timeout=args.graceful_timeout,
+        warm_up_timeout=args.warm_up_timeout,
+    ).run()
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,16 @@
+import logging
 import re
 import secrets
-import bcrypt
 from typing import Optional, Tuple
 from models.user import User, Session
-from repositories.user_repository import UserRepository
+from repositories.user_store import UserStore, DuplicateEmailError, DuplicateGamerTagError
 from services.email_service import EmailService
+from services.session_cache import SessionCache
+from services.password_hasher import PasswordHasher
+from services.login_throttle import LoginThrottle
+from services.session_tokens import SessionTokens
+
+logger = logging.getLogger(__name__)
 
 class EmailAlreadyExistsError(Exception): pass
 class GamerTagAlreadyExistsError(Exception): pass
@@ -18,9 +24,25 @@ class TokenExpiredError(Exception): pass
 class UserNotFoundError(Exception): pass
 
 class AuthService:
-    def __init__(self, user_repo: UserRepository, email_service: Optional[EmailService] = None):
+    def __init__(
+        self,
+        user_repo: UserStore,
+        email_service: Optional[EmailService] = None,
+        session_cache: Optional[SessionCache] = None,
+        join_session_lookup: bool = True,
+        password_hasher: Optional[PasswordHasher] = None,
+        login_throttle: Optional[LoginThrottle] = None,
+        session_tokens: Optional[SessionTokens] = None
+    ):
         self.user_repo = user_repo
         self.email_service = email_service
+        self.session_cache = session_cache
+        self.join_session_lookup = join_session_lookup
+        # bcrypt runs on its own bounded pool; raises HasherBusyError when it is saturated
+        self.password_hasher = password_hasher or PasswordHasher()
+        self.login_throttle = login_throttle
+        # signed-token mode: sessions are checked by HMAC instead of a sessions-table lookup
+        self.session_tokens = session_tokens
 
     def create_account(self, email: str, pwd: str, gamer_tag: str) -> Tuple[User, bool]:
         email = (email or "").strip().lower()
@@ -36,10 +58,12 @@ class AuthService:
         except Exception as e:
             raise WeakPasswordError(str(e))
 
-        if self.user_repo.get_by_email(email):
+        # one round trip up front so we don't burn a bcrypt hash on an obvious conflict;
+        # the unique constraints on insert still catch a concurrent signup
+        conflicts = self.user_repo.find_conflicts(email, gamer_tag)
+        if "email" in conflicts:
             raise EmailAlreadyExistsError("Email already in use.")
-
-        if self.user_repo.get_by_gamer_tag(gamer_tag):
+        if "gamer_tag" in conflicts:
             raise GamerTagAlreadyExistsError("Gamer tag already in use.")
 
         password_hash = self._hash_password(pwd)
@@ -51,7 +75,12 @@ class AuthService:
             gamer_tag=gamer_tag,
             verification_token=verification_token
         )
-        self.user_repo.insert(user)
+        try:
+            self.user_repo.insert(user)
+        except DuplicateEmailError:
+            raise EmailAlreadyExistsError("Email already in use.")
+        except DuplicateGamerTagError:
+            raise GamerTagAlreadyExistsError("Gamer tag already in use.")
 
         verification_sent = False
         if self.email_service:
@@ -63,33 +92,66 @@ class AuthService:
 
         return user, verification_sent
 
-    def login(self, email: str, pwd: str, require_verification: bool = False) -> Tuple[User, Session]:
+    def login(
+        self, email: str, pwd: str, require_verification: bool = False, client_ip: Optional[str] = None
+    ) -> Tuple[User, Session]:
         """
         Authenticate user and create a session.
+        Raises LoginThrottledError before touching the database when the email or IP is over its limit.
         """
         email = (email or "").strip().lower()
-        user = self.user_repo.get_by_email(email)
+        if self.login_throttle:
+            # counts as a failed attempt from here on, so concurrent guesses can't all slip under the limit
+            self.login_throttle.check(email, client_ip)
 
-        if not user or not user.verify_password(pwd):
+        try:
+            user = self.user_repo.get_by_email(email)
+            verified = bool(user) and self.password_hasher.verify(pwd, user.password_hash)
+        except Exception:
+            if self.login_throttle:
+                self.login_throttle.release(email)
+            raise
+
+        if not verified:
             raise InvalidCredentialsError("Invalid email or password.")
 
+        if self.login_throttle:
+            self.login_throttle.record_success(email)
+
         if require_verification and not user.is_verified:
             raise AccountNotVerifiedError("Please verify your email before signing in.")
 
-        self.user_repo.delete_expired_sessions()
-
-        session = Session.create_new(user_id=user.id, expiry_days=7)
-        self.user_repo.create_session(session)
+        if self.session_tokens:
+            session = self.session_tokens.issue(user.id)
+        else:
+            # expired sessions are purged by SessionSweeper, not on the login path.
+            # bcrypt ran outside the transaction so it never holds a pooled connection; re-read the
+            # hash in it so a password reset that landed meanwhile doesn't get a session for the old one
+            session = Session.create_new(user_id=user.id, expiry_days=7)
+            with self.user_repo.unit_of_work() as repo:
+                current = repo.get_by_id(str(user.id))
+                if not current or current.password_hash != user.password_hash:
+                    raise InvalidCredentialsError("Invalid email or password.")
+                repo.create_session(session)
+
+        # we only ever see the plaintext here, so this is where an old-cost hash gets upgraded.
+        # Started only now: the check above compares against the hash this rehash replaces
+        if self.password_hasher.needs_rehash(user.password_hash):
+            self._rehash_in_background(user, pwd)
 
         return user, session
 
     def logout(self, session_token: str) -> None:
         """Invalidate a session."""
-        session = self.user_repo.get_session(session_token)
-        if not session:
+        if self.session_cache:
+            self.session_cache.invalidate_token(session_token)
+        if self._is_signed(session_token):
+            if not self.session_tokens.verify(session_token):
+                raise InvalidSessionError("Invalid or expired session.")
+            self.session_tokens.revoke(session_token)
+            return
+        if not self.user_repo.delete_session(session_token):
             raise InvalidSessionError("Invalid or expired session.")
-        
-        self.user_repo.delete_session(session_token)
 
     def verify_account(self, token: str) -> User:
         """
@@ -107,16 +169,18 @@ class AuthService:
         if not token:
             raise InvalidTokenError("Verification token is required.")
 
-        user = self.user_repo.get_by_verification_token(token)
-        
-        if not user:
-            raise InvalidTokenError("Invalid or expired verification token.")
-        
-        if user.is_verified:
-            raise InvalidTokenError("Account is already verified.")
+        with self.user_repo.unit_of_work() as repo:
+            user = repo.get_by_verification_token(token)
 
-        user.mark_verified()
-        self.user_repo.update(user)
+            if not user:
+                raise InvalidTokenError("Invalid or expired verification token.")
+
+            if user.is_verified:
+                raise InvalidTokenError("Account is already verified.")
+
+            user.mark_verified()
+            repo.update(user)
+        self._invalidate_cached_user(user)
 
         return user
 
@@ -139,16 +203,18 @@ class AuthService:
             # Don't reveal that email is invalid for security
             return False
 
-        user = self.user_repo.get_by_email(email)
-        
-        if not user:
-            # Don't reveal that user doesn't exist for security
-            return False
+        with self.user_repo.unit_of_work() as repo:
+            user = repo.get_by_email(email)
 
-        # Generate reset token
-        reset_token = secrets.token_urlsafe(32)
-        user.set_reset_token(reset_token, expiry_hours=1)
-        self.user_repo.update(user)
+            if not user:
+                # Don't reveal that user doesn't exist for security
+                return False
+
+            # Generate reset token
+            reset_token = secrets.token_urlsafe(32)
+            user.set_reset_token(reset_token, expiry_hours=1)
+            repo.update(user)
+        self._invalidate_cached_user(user)
 
         # Send reset email
         if self.email_service:
@@ -179,13 +245,7 @@ class AuthService:
         if not token:
             raise InvalidTokenError("Reset token is required.")
 
-        user = self.user_repo.get_by_reset_token(token)
-        
-        if not user:
-            raise InvalidTokenError("Invalid reset token.")
-
-        if not user.is_reset_token_valid():
-            raise TokenExpiredError("Reset token has expired. Please request a new one.")
+        self._check_reset_token(self.user_repo.get_by_reset_token(token))
 
         # Validate new password
         try:
@@ -195,27 +255,103 @@ class AuthService:
         except Exception as e:
             raise WeakPasswordError(str(e))
 
-        # Update password
+        # hash outside the transaction so bcrypt never holds a pooled connection
         new_password_hash = self._hash_password(new_password)
-        user.update_password(new_password_hash)
-        user.clear_reset_token()
-        self.user_repo.update(user)
+
+        # re-read the token in the transaction: a concurrent reset may have used it already
+        with self.user_repo.unit_of_work() as repo:
+            user = self._check_reset_token(repo.get_by_reset_token(token))
+            user.update_password(new_password_hash)
+            user.clear_reset_token()
+            repo.update(user)
+        if self.session_tokens:
+            # a new password logs out every signed session issued with the old one
+            self.session_tokens.revoke_user(user.id)
+        self._invalidate_cached_user(user)
 
         return user
 
     def get_user_from_session(self, session_token: str) -> Optional[User]:
-        """Retrieve user from a session token."""
-        session = self.user_repo.get_session(session_token)
-        if not session or session.is_expired():
+        """Retrieve user from a session token (cached when a SessionCache is configured)."""
+        if not session_token:
             return None
-        
-        return self.user_repo.get_by_id(str(session.user_id))
+
+        # a signed token is checked (signature, expiry, revocation) before the cache,
+        # so a token revoked by another worker stops working even while it is cached here
+        claims = None
+        if self._is_signed(session_token):
+            claims = self.session_tokens.verify(session_token)
+            if not claims:
+                return None
+
+        if self.session_cache:
+            user = self.session_cache.get(session_token)
+            if user:
+                return user
+
+        if claims:
+            user = self.user_repo.get_by_id(claims.user_id)
+            if user and self.session_cache:
+                self.session_cache.put(session_token, user, claims.expires_at)
+            return user
+
+        if self.join_session_lookup:
+            found = self.user_repo.get_user_by_session_token(session_token)
+            if not found:
+                return None
+            session, user = found
+            if session.is_expired():
+                return None
+        else:
+            session = self.user_repo.get_session(session_token)
+            if not session or session.is_expired():
+                return None
+            user = self.user_repo.get_by_id(str(session.user_id))
+
+        if user and self.session_cache:
+            self.session_cache.put(session_token, user, session.expires_at)
+        return user
 
     # ===== PRIVATE HELPERS =====
 
+    def _is_signed(self, session_token: str) -> bool:
+        # database-backed tokens issued before signed mode was turned on keep working
+        return self.session_tokens is not None and SessionTokens.is_signed(session_token)
+
+    def _invalidate_cached_user(self, user: User) -> None:
+        if self.session_cache:
+            self.session_cache.invalidate_user(user.id)
+
+    def _check_reset_token(self, user: Optional[User]) -> User:
+        if not user:
+            raise InvalidTokenError("Invalid reset token.")
+        if not user.is_reset_token_valid():
+            raise TokenExpiredError("Reset token has expired. Please request a new one.")
+        return user
+
     def _hash_password(self, pwd: str) -> str:
-        salt = bcrypt.gensalt(rounds=12)
-        return bcrypt.hashpw(pwd.encode("utf-8"), salt).decode("utf-8")
+        return self.password_hasher.hash(pwd)
+
+    def _rehash_in_background(self, user: User, pwd: str) -> None:
+        old_hash = user.password_hash
+        future = self.password_hasher.hash_in_background(pwd)
+        if future is None:
+            return  # pool is busy; the next login tries again
+
+        def store(done):
+            try:
+                new_hash = done.result()
+                with self.user_repo.unit_of_work() as repo:
+                    current = repo.get_by_id(str(user.id))
+                    # skip if the password was changed meanwhile
+                    if current and current.password_hash == old_hash:
+                        current.update_password(new_hash)
+                        repo.update(current)
+            except Exception:
+                # runs on a bcrypt worker thread, so nobody else would see the error
+                logger.exception("rehash failed for user %s", user.id)
+
+        future.add_done_callback(store)
 
     def _is_valid_email(self, email: str) -> bool:
         return re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email) is not None
@@ -0,0 +1,322 @@
+import os
+import random
+import smtplib
+import socket
+import sqlite3
+import threading
+import time
+from email import message_from_string, policy
+from email.message import EmailMessage
+from typing import List, Optional, Tuple
+
+class EmailQueueFullError(Exception): pass
+
+
+class EmailQueue:
+    """
+    Durable outbox for transactional email.
+
+    enqueue() writes the message to a sqlite file and returns; background
+    workers send it. Each worker keeps one SMTP connection open across
+    messages and batches (closed after idle_timeout seconds without work),
+    claims up to batch_size due messages at a time and retries failures
+    with exponential backoff plus jitter. A message is given up on after
+    max_attempts tries, or straight away if the server rejects it with a
+    5xx. A claimed batch is leased to the claiming process; messages that
+    were mid-send when it died are picked up by any worker once the claim
+    is lease_timeout seconds old (live senders finish long before that).
+
+    For local testing point it at any SMTP sink, e.g.
+        python -m aiosmtpd -n -l localhost:1025
+    """
+
+    def __init__(
+        self,
+        path: str = "email_outbox.db",
+        smtp_host: str = "localhost",
+        smtp_port: int = 25,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        workers: int = 2,
+        batch_size: int = 20,
+        max_pending: int = 10_000,
+        max_attempts: int = 8,
+        base_backoff: float = 5.0,
+        max_backoff: float = 15 * 60,
+        idle_timeout: float = 30.0,
+        smtp_timeout: float = 10.0,
+        lease_timeout: float = 10 * 60
+    ):
+        self.path = path
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.idle_timeout = idle_timeout
+        self.smtp_timeout = smtp_timeout
+        self.lease_timeout = lease_timeout
+        # written on the rows this process claims
+        self.claimant = _claimant()
+
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._stats = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "rejected": 0, "batches": 0, "connections": 0, "errors": 0}
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " message TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " claimed_by TEXT,"
+            " claimed_at REAL)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if "claimed_by" not in columns:
+            # outbox files from before claims were leased
+            self._db.execute("ALTER TABLE outbox ADD COLUMN claimed_by TEXT")
+            self._db.execute("ALTER TABLE outbox ADD COLUMN claimed_at REAL")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+        self._db.commit()
+        # messages not yet sent or given up on, kept up to date here instead of counted per enqueue;
+        # re-counted when a sender goes idle, to take in other processes' changes to the file
+        self._pending = self._count_pending()
+
+    def enqueue(self, message: EmailMessage) -> int:
+        """Persist a message for delivery and return its outbox id. Raises EmailQueueFullError when at max_pending."""
+        now = time.time()
+        with self._work:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise EmailQueueFullError(f"Email outbox is full ({self._pending} messages waiting).")
+            cur = self._db.execute(
+                "INSERT INTO outbox (message, status, next_attempt_at, created_at) VALUES (?, 'pending', ?, ?)",
+                (message.as_string(), now, now)
+            )
+            self._db.commit()
+            self._pending += 1
+            self._stats["enqueued"] += 1
+            self._work.notify()
+        return cur.lastrowid
+
+    def start(self) -> "EmailQueue":
+        if not self._threads:
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._loop, name=f"email-sender-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        with self._work:
+            self._work.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until nothing is due or being sent; True if that happened within timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                busy = self._db.execute(
+                    "SELECT COUNT(*) FROM outbox WHERE status = 'sending'"
+                    " OR (status = 'pending' AND next_attempt_at <= ?)", (time.time(),)
+                ).fetchone()[0]
+            if not busy:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def after_fork(self) -> None:
+        """
+        In a forked worker: open its own connection (a SQLite handle must not
+        be used on both sides of a fork). Call before start(). Workers can share
+        one outbox file; claiming a batch is atomic across processes.
+        """
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self.claimant = _claimant()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, pending_estimate=self._pending)
+            for status, count in self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"):
+                stats[status] = count
+        return stats
+
+    # ===== PRIVATE HELPERS =====
+
+    def _loop(self) -> None:
+        smtp = None
+        last_used = time.monotonic()
+        # outcomes not yet written back (the outbox was busy); written before claiming more
+        results = []
+        errors = 0
+        while not self._stop.is_set():
+            try:
+                if results:
+                    self._finish(results)
+                    results = []
+                batch = self._claim()
+                if not batch:
+                    if smtp is not None and time.monotonic() - last_used > self.idle_timeout:
+                        smtp = self._close(smtp)
+                    with self._work:
+                        self._work.wait(self._until_next_due())
+                    errors = 0
+                    continue
+
+                with self._lock:
+                    self._stats["batches"] += 1
+                for i, (message_id, text, attempts) in enumerate(batch):
+                    if smtp is None:
+                        try:
+                            smtp = self._connect()
+                        except (smtplib.SMTPException, OSError) as e:
+                            # server down or misconfigured: nothing in the batch is at fault, retry it all later
+                            results.extend((mid, att, str(e) or type(e).__name__, False) for mid, _, att in batch[i:])
+                            break
+                    try:
+                        # send_message writes CRLF line endings, as SMTP requires
+                        smtp.send_message(message_from_string(text, policy=policy.SMTP))
+                        results.append((message_id, attempts, None, False))
+                    except smtplib.SMTPRecipientsRefused as e:
+                        results.append((message_id, attempts, f"recipients refused: {e.recipients}", True))
+                    except smtplib.SMTPResponseException as e:
+                        # 4xx is worth another try later, 5xx never will be accepted
+                        permanent = e.smtp_code >= 500
+                        results.append((message_id, attempts, f"{e.smtp_code} {e.smtp_error!r}", permanent))
+                    except (smtplib.SMTPException, OSError) as e:
+                        # the connection is gone; everything left in the batch waits for the next try
+                        smtp = self._close(smtp)
+                        results.extend((mid, att, str(e) or type(e).__name__, False) for mid, _, att in batch[i:])
+                        break
+                last_used = time.monotonic()
+                self._finish(results)
+                results = []
+                errors = 0
+            except Exception as e:
+                # e.g. "database is locked" while another process holds the outbox; a dead sender
+                # thread would leave the queue filling up with nothing to send it
+                delay = min(self.max_backoff, self.base_backoff * 2 ** min(errors, 16))
+                errors += 1
+                with self._lock:
+                    self._stats["errors"] += 1
+                print(f"[EmailQueue] sender error, retrying in {delay:.1f}s: {e!r}")
+                self._stop.wait(delay)
+        self._close(smtp)
+
+    def _claim(self) -> List[Tuple[int, str, int]]:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock before reading, so two processes can't claim the same rows
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # due messages, plus ones whose sender has held them past the lease (it died mid-batch)
+                rows = self._db.execute(
+                    "SELECT id, message, attempts FROM outbox"
+                    " WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND COALESCE(claimed_at, 0) < ?)"
+                    " ORDER BY next_attempt_at LIMIT ?", (now, now - self.lease_timeout, self.batch_size)
+                ).fetchall()
+                if rows:
+                    self._db.executemany(
+                        "UPDATE outbox SET status = 'sending', claimed_by = ?, claimed_at = ? WHERE id = ?",
+                        [(self.claimant, now, row[0]) for row in rows]
+                    )
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+            if not rows:
+                self._pending = self._count_pending()
+        return rows
+
+    def _finish(self, results) -> None:
+        """results: (id, attempts before this try, error or None, permanent)."""
+        now = time.time()
+        counts = {"sent": 0, "failed": 0, "retried": 0}
+        given_up = []
+        with self._lock:
+            try:
+                # only rows still claimed by this process: a lease that ran out belongs to whoever
+                # reclaimed it, and so does counting it (rowcount 0 here)
+                for message_id, attempts, error, permanent in results:
+                    if error is None:
+                        cur = self._db.execute("DELETE FROM outbox WHERE id = ? AND claimed_by = ?", (message_id, self.claimant))
+                        outcome = "sent"
+                    elif permanent or attempts + 1 >= self.max_attempts:
+                        cur = self._db.execute(
+                            "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ?, claimed_by = NULL"
+                            " WHERE id = ? AND claimed_by = ?",
+                            (attempts + 1, error, message_id, self.claimant)
+                        )
+                        outcome = "failed"
+                    else:
+                        delay = min(self.max_backoff, self.base_backoff * 2 ** attempts) * random.uniform(0.8, 1.2)
+                        cur = self._db.execute(
+                            "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?,"
+                            " claimed_by = NULL WHERE id = ? AND claimed_by = ?",
+                            (attempts + 1, now + delay, error, message_id, self.claimant)
+                        )
+                        outcome = "retried"
+                    if cur.rowcount:
+                        counts[outcome] += 1
+                        if outcome == "failed":
+                            given_up.append((message_id, error))
+                self._db.commit()
+            except BaseException:
+                # leave no transaction open for the next BEGIN IMMEDIATE; the caller retries the results
+                self._db.rollback()
+                raise
+            self._pending -= counts["sent"] + counts["failed"]
+            for outcome, count in counts.items():
+                self._stats[outcome] += count
+        for message_id, error in given_up:
+            print(f"[EmailQueue] giving up on message {message_id}: {error}")
+
+    def _count_pending(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM outbox WHERE status != 'failed'").fetchone()[0]
+
+    def _until_next_due(self) -> float:
+        row = self._db.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'").fetchone()
+        if row[0] is None:
+            return self.idle_timeout
+        return min(self.idle_timeout, max(0.05, row[0] - time.time()))
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.smtp_timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        with self._lock:
+            self._stats["connections"] += 1
+        return smtp
+
+    def _close(self, smtp) -> None:
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except Exception:
+                pass
+        return None
+
+
+def _claimant() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
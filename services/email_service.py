@@ -1,18 +1,56 @@
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Optional
+from services.email_queue import EmailQueue
+
 class EmailService:
-    def __init__(self, sender_name: str = "What Should I Play?", base_url: str = "http://localhost:5000"):
+    def __init__(
+        self,
+        sender_name: str = "What Should I Play?",
+        base_url: str = "http://localhost:5000",
+        sender_address: str = "no-reply@localhost",
+        outbox: Optional[EmailQueue] = None
+    ):
         self.sender_name = sender_name
         self.base_url = base_url
+        self.sender_address = sender_address
+        # with an outbox, sending just enqueues and background workers talk SMTP;
+        # without one, messages are only printed (local development)
+        self.outbox = outbox
 
     def send_verification_email(self, to_email: str, token: str) -> None:
         """Send email verification link."""
         verification_link = f"{self.base_url}/api/auth/verify-email?token={token}"
-        # TODO: integrate real email provider
-        print(f"[EmailService] Send verification email to {to_email}")
-        print(f"[EmailService] Verification link: {verification_link}")
+        if self.outbox is None:
+            print(f"[EmailService] Send verification email to {to_email}")
+            print(f"[EmailService] Verification link: {verification_link}")
+            return
+        self.outbox.enqueue(self._message(
+            to_email,
+            "Verify your email",
+            f"Welcome! Confirm your email address by opening this link:\n\n{verification_link}\n"
+        ))
 
     def send_password_reset_email(self, to_email: str, token: str) -> None:
         """Send password reset link."""
         reset_link = f"{self.base_url}/api/auth/reset-password?token={token}"
-        # TODO: integrate real email provider
-        print(f"[EmailService] Send password reset email to {to_email}")
-        print(f"[EmailService] Reset link: {reset_link}")
\ No newline at end of file
+        if self.outbox is None:
+            print(f"[EmailService] Send password reset email to {to_email}")
+            print(f"[EmailService] Reset link: {reset_link}")
+            return
+        self.outbox.enqueue(self._message(
+            to_email,
+            "Reset your password",
+            f"Someone asked to reset your password. If it was you, open this link within an hour:\n\n{reset_link}\n"
+            "\nIf it wasn't, you can ignore this email.\n"
+        ))
+
+    # ===== PRIVATE HELPERS =====
+
+    def _message(self, to_email: str, subject: str, body: str) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((self.sender_name, self.sender_address))
+        message["To"] = to_email
+        message["Subject"] = subject
+        message.set_content(body)
+        return message
\ No newline at end of file
@@ -0,0 +1,156 @@
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+class LoginThrottledError(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SlidingWindowCounter:
+    """
+    Per-key event counts over the last `window` seconds.
+
+    The window is split into `buckets` slots; each key keeps one fixed-size
+    array of slot counts (plus the newest slot number), and slots older than
+    the window are zeroed as time moves on. At most `max_keys` keys are kept:
+    the least recently touched key is evicted first, and since a key idle
+    for a whole window has nothing left to count, evicting it loses nothing.
+    """
+
+    def __init__(self, limit: int, window: float, buckets: int = 6, max_keys: int = 100_000):
+        self.limit = limit
+        self.window = window
+        self.buckets = buckets
+        self.max_keys = max_keys
+        self._width = window / buckets
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"allowed": 0, "limited": 0, "evictions": 0}
+
+    def hit(self, key: str) -> Tuple[bool, float]:
+        """Count one event unless the key is already at its limit. Returns (allowed, retry_after)."""
+        return self._check(key, count=True)
+
+    def peek(self, key: str) -> Tuple[bool, float]:
+        """Like hit(), but without counting anything."""
+        return self._check(key, count=False)
+
+    def add(self, key: str) -> None:
+        """Count one event whether or not the key is over its limit."""
+        with self._lock:
+            counts, slot = self._counts(key, time.time())
+            counts[1 + slot % self.buckets] += 1
+
+    def release(self, key: str) -> None:
+        """Uncount the newest event still inside the window (a hit() that turned out not to count)."""
+        with self._lock:
+            if key not in self._entries:
+                return
+            counts, slot = self._counts(key, time.time())
+            for newer in range(slot, slot - self.buckets, -1):
+                if counts[1 + newer % self.buckets]:
+                    counts[1 + newer % self.buckets] -= 1
+                    return
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["keys"] = len(self._entries)
+        stats.update({"limit": self.limit, "window": self.window})
+        return stats
+
+    # ===== HELPER METHODS =====
+
+    def _check(self, key: str, count: bool) -> Tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            if not count and key not in self._entries:
+                return True, 0.0
+            counts, slot = self._counts(key, now)
+            if sum(counts[1:]) >= self.limit:
+                self._stats["limited"] += 1
+                # the oldest slot rolls out of the window at the end of the current one
+                return False, (slot + 1) * self._width - now
+            if count:
+                counts[1 + slot % self.buckets] += 1
+                self._stats["allowed"] += 1
+            return True, 0.0
+
+    def _counts(self, key: str, now: float):
+        """The key's counts array ([newest slot, slot counts...]) advanced to the current slot."""
+        slot = int(now // self._width)
+        counts = self._entries.get(key)
+        if counts is None:
+            counts = self._entries[key] = array("Q", [slot] + [0] * self.buckets)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        else:
+            self._entries.move_to_end(key)
+            newest = counts[0]
+            for stale in range(newest + 1, min(slot, newest + self.buckets) + 1):
+                counts[1 + stale % self.buckets] = 0
+            counts[0] = max(newest, slot)
+        return counts, slot
+
+
+class LoginThrottle:
+    """
+    Sheds sign-in attempts before they reach the database or bcrypt.
+
+    - per client IP: every attempt counts (covers credential stuffing across
+      many accounts from one address)
+    - per email: failed attempts count and a successful login clears them
+      (covers guessing one account's password from many addresses)
+
+    check() takes the email's slot up front, so guesses already waiting on
+    bcrypt count against the limit; record_success() gives it back and
+    release() returns one that never got an answer.
+    """
+
+    def __init__(
+        self,
+        ip_limit: int = 30,
+        ip_window: float = 60,
+        email_limit: int = 5,
+        email_window: float = 5 * 60,
+        max_keys: int = 100_000
+    ):
+        self.by_ip = SlidingWindowCounter(ip_limit, ip_window, max_keys=max_keys)
+        self.by_email = SlidingWindowCounter(email_limit, email_window, max_keys=max_keys)
+
+    def check(self, email: str, client_ip: Optional[str] = None) -> None:
+        """
+        Raises LoginThrottledError if this attempt is over either limit. Otherwise
+        counts it against the IP and, as a failure until told otherwise, the email.
+        """
+        allowed, retry_after = self.by_email.hit(email)
+        if allowed and client_ip:
+            allowed, retry_after = self.by_ip.hit(client_ip)
+            if not allowed:
+                self.by_email.release(email)
+        if not allowed:
+            raise LoginThrottledError(
+                "Too many sign-in attempts. Please try again later.",
+                retry_after=max(1, math.ceil(retry_after))
+            )
+
+    def record_success(self, email: str) -> None:
+        """The password was right: clear the email's failures, this attempt's included."""
+        self.by_email.reset(email)
+
+    def release(self, email: str) -> None:
+        """The attempt ended without checking the password (e.g. the hasher was busy): don't count it."""
+        self.by_email.release(email)
+
+    def stats(self) -> dict:
+        return {"by_ip": self.by_ip.stats(), "by_email": self.by_email.stats()}
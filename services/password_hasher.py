@@ -0,0 +1,179 @@
+import argparse
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+import bcrypt
+
+class HasherBusyError(Exception): pass
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a small dedicated thread pool.
+
+    bcrypt releases the GIL while it works, so `workers` hashes really do run
+    in parallel while request threads just wait on the result. At most
+    `max_queue` jobs may wait for a free worker; past that, calls fail fast
+    with HasherBusyError (a 503) instead of piling up behind each other.
+
+    `rounds` is the target bcrypt cost for new hashes. calibrate() picks it
+    from a per-hash latency budget on this machine; run it once per hardware
+    (python -m services.password_hasher) and pin the result in config, since
+    timing noise can move the measured cost by one between runs.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queue: int = 32, rounds: int = 12, samples: int = 1000):
+        self.workers = workers or os.cpu_count() or 2
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._latency = {"hash": deque(maxlen=samples), "verify": deque(maxlen=samples), "wait": deque(maxlen=samples)}
+        self._stats = {"hashes": 0, "verifications": 0, "rejected": 0, "max_queued": 0, "background_skipped": 0}
+
+    def hash(self, pwd: str) -> str:
+        return self._run("hash", self._hash, pwd)
+
+    def verify(self, pwd: str, password_hash: str) -> bool:
+        return self._run("verify", self._verify, pwd, password_hash)
+
+    def hash_in_background(self, pwd: str) -> Optional[Future]:
+        """
+        Queue a hash without waiting for it. Returns None (and does nothing)
+        when the pool is saturated, so background work never takes a slot
+        an interactive request needs.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["background_skipped"] += 1
+            return None
+        try:
+            future = self._submit("hash", self._hash, pwd)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if the hash was made with a lower cost than the current target (hashes are never weakened)."""
+        return cost_of(password_hash) < self.rounds
+
+    def calibrate(self, target_seconds: float, min_rounds: int = 10, max_rounds: int = 16) -> int:
+        """
+        Set rounds to the highest cost whose hash fits in target_seconds here.
+        Every extra round doubles the work, so one cheap timed probe is enough
+        to extrapolate. Returns the chosen cost.
+        """
+        probe_rounds = 8
+        salt = bcrypt.gensalt(rounds=probe_rounds)
+        probe = []
+        for _ in range(3):
+            started = time.perf_counter()
+            bcrypt.hashpw(b"calibration-probe", salt)
+            probe.append(time.perf_counter() - started)
+        # the fastest run is the least disturbed by other load on the machine
+        per_hash = min(probe)
+        rounds = probe_rounds + int(math.floor(math.log2(target_seconds / per_hash))) if per_hash > 0 else max_rounds
+        self.rounds = max(min_rounds, min(max_rounds, rounds))
+        print(f"[PasswordHasher] cost {self.rounds} (~{per_hash * 2 ** (self.rounds - probe_rounds) * 1000:.0f} ms/hash, budget {target_seconds * 1000:.0f} ms)")
+        return self.rounds
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+            })
+            latency = {name: list(samples) for name, samples in self._latency.items()}
+        for name, samples in latency.items():
+            stats[f"{name}_ms"] = _percentiles(samples)
+        return stats
+
+    # ===== PRIVATE HELPERS =====
+
+    def _run(self, kind: str, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HasherBusyError("Server is busy, please try again shortly.")
+        try:
+            return self._submit(kind, fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _submit(self, kind: str, fn, *args) -> Future:
+        with self._lock:
+            self._queued += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._queued)
+        return self._get_executor().submit(self._timed, kind, fn, time.monotonic(), *args)
+
+    def _timed(self, kind: str, fn, submitted_at: float, *args):
+        started = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._latency["wait"].append(started - submitted_at)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._latency[kind].append(time.monotonic() - started)
+                self._stats["hashes" if kind == "hash" else "verifications"] += 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # created on first use so importing the app doesn't start threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _hash(self, pwd: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(pwd.encode("utf-8"), salt).decode("utf-8")
+
+    def _verify(self, pwd: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(pwd.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+def cost_of(password_hash: str) -> int:
+    """The cost factor stored in a bcrypt hash ("$2b$12$..." -> 12)."""
+    try:
+        return int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return -1
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"count": 0, "p50": None, "p95": None, "max": None}
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+    return {"count": len(samples), "p50": pick(0.5), "p95": pick(0.95), "max": round(samples[-1] * 1000, 2)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the bcrypt cost that fits a per-hash time budget on this machine.")
+    parser.add_argument("--target", type=float, default=0.25, help="seconds one hash may take")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    args = parser.parse_args(argv)
+
+    rounds = PasswordHasher(workers=1).calibrate(args.target, args.min_rounds, args.max_rounds)
+    print(f"BCRYPT_ROUNDS={rounds}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
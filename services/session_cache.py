@@ -0,0 +1,86 @@
+import dataclasses
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from models.user import User
+
+class SessionCache:
+    """
+    In-process LRU cache of session token -> resolved User.
+
+    Entries live for at most `ttl` seconds and never past the session's own
+    expiry. AuthService invalidates explicitly on logout, password reset and
+    user updates; the TTL bounds how long another worker process can keep
+    serving an entry it never heard was invalidated.
+    """
+
+    def __init__(self, max_entries: int = 50_000, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tokens_by_user = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, token: str) -> Optional[User]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            user, expires_at, session_expires_at = entry
+            if expires_at <= now or datetime.utcnow() > session_expires_at:
+                self._drop(token)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(token)
+            self._stats["hits"] += 1
+        # hand out a copy so callers can't mutate the cached object
+        return dataclasses.replace(user)
+
+    def put(self, token: str, user: User, session_expires_at: datetime) -> None:
+        with self._lock:
+            self._drop(token)
+            self._entries[token] = (dataclasses.replace(user), time.monotonic() + self.ttl, session_expires_at)
+            self._tokens_by_user.setdefault(str(user.id), set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._stats["evictions"] += 1
+
+    def invalidate_token(self, token: str) -> None:
+        with self._lock:
+            if self._drop(token):
+                self._stats["invalidations"] += 1
+
+    def invalidate_user(self, user_id) -> None:
+        """Forget every cached session of this user (their data or credentials changed)."""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(str(user_id), ())):
+                self._drop(token)
+                self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    # ===== PRIVATE HELPERS =====
+
+    def _drop(self, token: str) -> bool:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return False
+        user_id = str(entry[0].id)
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+        return True
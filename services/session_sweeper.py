@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Optional
+from repositories.user_store import UserStore
+
+class SessionSweeper:
+    """
+    Periodically deletes expired sessions in small batches.
+
+    Each batch is its own short DELETE ... LIMIT transaction so it never holds
+    locks long enough to stall logins. A database advisory lock makes sure
+    only one worker (across every process) sweeps at a time.
+
+    sweep_revocations also clears expired signed-token revocations; turn it
+    on only with signed sessions (the revoked_tokens table exists then).
+    """
+
+    LOCK_NAME = "project_326.session_sweeper"
+
+    def __init__(
+        self,
+        user_repo: UserStore,
+        interval: float = 5 * 60,
+        batch_size: int = 1000,
+        max_batches: int = 100,
+        pause: float = 0.05,
+        sweep_revocations: bool = False
+    ):
+        self.user_repo = user_repo
+        self.sweep_revocations = sweep_revocations
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.pause = pause
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "skipped_runs": 0, "failed_runs": 0, "deleted_total": 0, "last_run": None}
+
+    def start(self) -> "SessionSweeper":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="session-sweeper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> dict:
+        """
+        One sweep. Returns {"deleted", "revocations_deleted", "batches", "seconds", "skipped"};
+        skipped is True when another worker holds the sweep lock.
+        """
+        started = time.monotonic()
+        deleted = revocations_deleted = batches = 0
+        with self.user_repo.advisory_lock(self.LOCK_NAME) as acquired:
+            if acquired:
+                deleted, batches = self._sweep(self.user_repo.delete_expired_sessions)
+                if self.sweep_revocations:
+                    # revoked signed tokens only need remembering until they'd have expired anyway
+                    revocations_deleted, more = self._sweep(self.user_repo.delete_expired_revocations)
+                    batches += more
+
+        result = {
+            "deleted": deleted,
+            "revocations_deleted": revocations_deleted,
+            "batches": batches,
+            "seconds": round(time.monotonic() - started, 4),
+            "skipped": not acquired
+        }
+        with self._lock:
+            self._stats["runs" if acquired else "skipped_runs"] += 1
+            self._stats["deleted_total"] += deleted
+            self._stats["last_run"] = result
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    # ===== PRIVATE HELPERS =====
+
+    def _sweep(self, delete_batch) -> tuple:
+        """Call delete_batch(limit=batch_size) until a short batch. Returns (deleted, batches)."""
+        deleted = batches = 0
+        while batches < self.max_batches and not self._stop.is_set():
+            count = delete_batch(limit=self.batch_size)
+            batches += 1
+            deleted += count
+            if count < self.batch_size:
+                break
+            # let concurrent logins in between batches
+            time.sleep(self.pause)
+        return deleted, batches
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                result = self.run_once()
+                if not result["skipped"]:
+                    print(f"[SessionSweeper] deleted {result['deleted']} expired sessions "
+                          f"in {result['batches']} batches ({result['seconds']}s)")
+            except Exception as e:
+                with self._lock:
+                    self._stats["failed_runs"] += 1
+                print(f"[SessionSweeper] sweep failed: {e}")
@@ -0,0 +1,269 @@
+import base64
+import hashlib
+import hmac
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+from models.user import Session
+from repositories.user_store import UserStore
+
+
+class TokenClaims(NamedTuple):
+    user_id: str
+    issued_ms: int
+    expires_ms: int
+    token_id: str
+
+    @property
+    def expires_at(self) -> datetime:
+        return _from_ms(self.expires_ms)
+
+
+class BloomFilter:
+    """Fixed-size set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.size = max(64, int(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] >> (position & 7) & 1 for position in self._positions(item))
+
+    def _positions(self, item: str):
+        # double hashing: k positions out of two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+
+class SessionTokens:
+    """
+    Signed, self-contained session tokens:
+
+        s1.<user id>.<issued ms>.<expires ms>.<token id>.<HMAC-SHA256>
+
+    verify() needs no database: it checks the signature and expiry, then the
+    revocation state kept in memory:
+    - revoked token ids go in a Bloom filter; the rare hit is confirmed
+      against the database (and remembered), so a false positive never
+      logs anybody out
+    - a password reset revokes every token the user was issued until then,
+      kept as user id -> cutoff
+
+    Revocations from this process apply immediately. Ones made by other
+    workers are pulled from the database every `refresh_interval` seconds,
+    and the filter is rebuilt from scratch every `rebuild_interval` seconds
+    so expired revocations drop out of it.
+    """
+
+    PREFIX = "s1"
+
+    def __init__(
+        self,
+        secret: str,
+        user_repo: UserStore,
+        ttl: timedelta = timedelta(days=7),
+        refresh_interval: float = 5,
+        rebuild_interval: float = 10 * 60,
+        capacity: int = 100_000,
+        fp_rate: float = 0.01,
+        max_confirmed: int = 10_000
+    ):
+        if not secret:
+            raise ValueError("SessionTokens needs a non-empty secret")
+        self._key = secret.encode("utf-8")
+        self.user_repo = user_repo
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.max_confirmed = max_confirmed
+
+        self._lock = threading.Lock()
+        self._filter = BloomFilter(capacity, fp_rate)
+        self._user_cutoffs: Dict[str, int] = {}
+        self._confirmed = OrderedDict()
+        self._loaded_until: Optional[datetime] = None
+        self._last_rebuild = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"issued": 0, "verified": 0, "rejected": 0, "revoked": 0, "filter_hits": 0, "db_checks": 0, "rebuilds": 0}
+
+    @classmethod
+    def is_signed(cls, token: str) -> bool:
+        return bool(token) and token.startswith(cls.PREFIX + ".")
+
+    def issue(self, user_id) -> Session:
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        body = ".".join((self.PREFIX, str(user_id), str(_ms(now)), str(_ms(expires_at)), secrets.token_urlsafe(16)))
+        with self._lock:
+            self._stats["issued"] += 1
+        return Session(token=f"{body}.{self._sign(body)}", user_id=user_id, created_at=now, expires_at=expires_at)
+
+    def verify(self, token: str) -> Optional[TokenClaims]:
+        """Claims of a valid, unexpired, unrevoked token; None otherwise."""
+        claims = self._parse(token)
+        ok = (
+            claims is not None
+            and claims.expires_ms > _ms(datetime.utcnow())
+            and not self._is_revoked(claims)
+        )
+        with self._lock:
+            self._stats["verified" if ok else "rejected"] += 1
+        return claims if ok else None
+
+    def revoke(self, token: str) -> bool:
+        """Revoke one token (logout). Returns False if it wasn't a valid token to begin with."""
+        claims = self._parse(token)
+        if claims is None:
+            return False
+        self.user_repo.revoke_token(claims.token_id, claims.expires_at)
+        with self._lock:
+            self._filter.add(claims.token_id)
+            self._remember(claims.token_id, True)
+            self._stats["revoked"] += 1
+        return True
+
+    def revoke_user(self, user_id) -> None:
+        """Revoke every token issued to the user so far (password reset)."""
+        now = datetime.utcnow()
+        self.user_repo.revoke_user_sessions(str(user_id), now)
+        with self._lock:
+            self._user_cutoffs[str(user_id)] = _ms(now)
+
+    def refresh(self) -> None:
+        """Pull revocations made by other workers since the last refresh; rebuild the filter when due."""
+        if self._loaded_until is None or time.monotonic() - self._last_rebuild >= self.rebuild_interval:
+            self.rebuild()
+            return
+        # overlap a little so a revocation committed slightly out of order isn't missed
+        since = self._loaded_until - timedelta(seconds=2)
+        now = datetime.utcnow()
+        token_ids, users = self.user_repo.load_revocations(since)
+        with self._lock:
+            for token_id in token_ids:
+                self._filter.add(token_id)
+                # a cached "not revoked" from an earlier false positive would outlive the revocation
+                self._confirmed.pop(token_id, None)
+            self._merge_cutoffs(users)
+            self._loaded_until = now
+
+    def rebuild(self) -> None:
+        """Reload every live revocation into a fresh, right-sized filter."""
+        now = datetime.utcnow()
+        token_ids, users = self.user_repo.load_revocations(now - self.ttl)
+        bloom = BloomFilter(max(self.capacity, 2 * len(token_ids)), self.fp_rate)
+        for token_id in token_ids:
+            bloom.add(token_id)
+        with self._lock:
+            self._filter = bloom
+            self._user_cutoffs = {}
+            self._merge_cutoffs(users)
+            self._confirmed.clear()
+            self._loaded_until = now
+            self._last_rebuild = time.monotonic()
+            self._stats["rebuilds"] += 1
+
+    def start(self) -> "SessionTokens":
+        self.rebuild()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="session-revocations", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "filter_entries": self._filter.count,
+                "filter_bytes": len(self._filter._bits),
+                "revoked_users": len(self._user_cutoffs),
+            })
+        return stats
+
+    # ===== PRIVATE HELPERS =====
+
+    def _sign(self, body: str) -> str:
+        mac = hmac.new(self._key, body.encode("utf-8"), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(mac).rstrip(b"=").decode("ascii")
+
+    def _parse(self, token: str) -> Optional[TokenClaims]:
+        """Claims of a well-formed token with a valid signature (expiry and revocation not checked)."""
+        if not self.is_signed(token):
+            return None
+        body, _, signature = token.rpartition(".")
+        if not hmac.compare_digest(signature, self._sign(body)):
+            return None
+        try:
+            _, user_id, issued_ms, expires_ms, token_id = body.split(".")
+            return TokenClaims(user_id, int(issued_ms), int(expires_ms), token_id)
+        except ValueError:
+            return None
+
+    def _is_revoked(self, claims: TokenClaims) -> bool:
+        with self._lock:
+            cutoff = self._user_cutoffs.get(claims.user_id)
+            if cutoff is not None and claims.issued_ms <= cutoff:
+                return True
+            if claims.token_id not in self._filter:
+                return False
+            self._stats["filter_hits"] += 1
+            known = self._confirmed.get(claims.token_id)
+        if known is not None:
+            return known
+
+        revoked = self.user_repo.is_token_revoked(claims.token_id)
+        with self._lock:
+            self._stats["db_checks"] += 1
+            self._remember(claims.token_id, revoked)
+        return revoked
+
+    def _remember(self, token_id: str, revoked: bool) -> None:
+        self._confirmed[token_id] = revoked
+        self._confirmed.move_to_end(token_id)
+        while len(self._confirmed) > self.max_confirmed:
+            self._confirmed.popitem(last=False)
+
+    def _merge_cutoffs(self, users: Dict[str, datetime]) -> None:
+        for user_id, revoked_at in users.items():
+            cutoff = _ms(revoked_at)
+            if cutoff > self._user_cutoffs.get(str(user_id), 0):
+                self._user_cutoffs[str(user_id)] = cutoff
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[SessionTokens] revocation refresh failed: {e}")
+
+
+def _ms(value: datetime) -> int:
+    return int((value - _EPOCH).total_seconds() * 1000)
+
+def _from_ms(value: int) -> datetime:
+    return _EPOCH + timedelta(milliseconds=value)
+
+_EPOCH = datetime(1970, 1, 1)
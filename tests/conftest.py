@@ -0,0 +1,124 @@
+# python file that sets up imports for the tests
+# the game modules import each other as package.* (the name repositories/ is deployed under),
+# so register a package by that name over repositories/ and put the project root on the path
+
+import json
+import os
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+if "package" not in sys.modules:
+    package = types.ModuleType("package")
+    package.__path__ = [os.path.join(ROOT, "repositories")]
+    sys.modules["package"] = package
+
+
+@pytest.fixture
+def steam_cache(tmp_path):
+    """Point steam_game_info at a fresh, empty metadata cache for the test."""
+    from package import steam_game_info
+    return steam_game_info.configure_cache(path=str(tmp_path / "steam_cache.db"))
+
+
+class StubSteam:
+    """
+    Local stand-in for the two Steam store endpoints. `games` maps appid -> appdetails data
+    (a missing appid answers success: false), `reviews` maps appid -> review_score_desc, and
+    `delay` holds seconds to wait before answering, per endpoint ("details" / "reviews").
+    """
+
+    def __init__(self):
+        self.games = {}
+        self.reviews = {}
+        self.delay = {"details": 0.0, "reviews": 0.0}
+        self.status = 200
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def add_game(self, appid, name, genres=(), review="Very Positive"):
+        self.games[appid] = {
+            "name": name,
+            "genres": [{"description": genre} for genre in genres],
+            "header_image": f"https://example.test/{appid}.jpg",
+            "short_description": f"About {name}",
+            "release_date": {"date": "1 Jan, 2020"},
+        }
+        if review is not None:
+            self.reviews[appid] = review
+
+    def count(self, kind):
+        with self._lock:
+            return sum(1 for request_kind, _, _ in self.requests if request_kind == kind)
+
+    def connections(self):
+        with self._lock:
+            return len({port for _, _, port in self.requests})
+
+    def answer(self, handler):
+        url = urlparse(handler.path)
+        if url.path == "/api/appdetails":
+            kind, appid = "details", int(parse_qs(url.query)["appids"][0])
+        elif url.path.startswith("/appreviews/"):
+            kind, appid = "reviews", int(url.path.rsplit("/", 1)[1])
+        else:
+            return 404, {}
+        with self._lock:
+            self.requests.append((kind, appid, handler.client_address[1]))
+        time.sleep(self.delay[kind])
+        if self.status != 200:
+            return self.status, {}
+        if kind == "details":
+            data = self.games.get(appid)
+            return 200, {str(appid): {"success": True, "data": data} if data else {"success": False}}
+        return 200, {"success": 1, "query_summary": {"review_score_desc": self.reviews.get(appid, "No user reviews")}}
+
+
+@pytest.fixture
+def steam_server():
+    """A StubSteam served over HTTP on localhost, with steam_game_info pointed at it."""
+    from package import steam_game_info
+    stub = StubSteam()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, payload = stub.answer(self)
+            body = json.dumps(payload).encode("utf-8")
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # the client gave up waiting (timeout tests)
+                self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    previous = (steam_game_info.STORE_URL, steam_game_info.DETAILS_TIMEOUT, steam_game_info.REVIEWS_TIMEOUT)
+    steam_game_info.configure_http(store_url=f"http://127.0.0.1:{server.server_address[1]}")
+    # a fresh rate limit and circuit breaker, so earlier tests' traffic doesn't count
+    steam_game_info.configure_upstream()
+    try:
+        yield stub
+    finally:
+        steam_game_info.configure_http(store_url=previous[0], details_timeout=previous[1], reviews_timeout=previous[2])
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,94 @@
+# tests for the content-hashed, precompressed stylesheet bundles
+
+import gzip
+import os
+
+import pytest
+from flask import Flask, render_template_string
+
+from assets import AssetBundles, CACHE_CONTROL, minify_css
+
+BASE_CSS = "/* reset */\nbody {\n  margin : 0;\n}\n"
+CARD_CSS = "a :hover { content: \"  keep  /* this */ \"; width: calc(1px + 2px); }\n"
+
+
+@pytest.fixture
+def app(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "base.css").write_text(BASE_CSS)
+    (static / "css" / "card.css").write_text(CARD_CSS)
+    return Flask("assets_test", static_folder=str(static))
+
+
+@pytest.fixture
+def bundles(app):
+    return AssetBundles(app, {"app.css": ["css/base.css", "css/card.css"]})
+
+
+def test_minify_keeps_strings_and_meaningful_spaces():
+    assert minify_css(BASE_CSS) == "body{margin :0}"
+    assert minify_css(CARD_CSS) == 'a :hover{content:"  keep  /* this */ ";width:calc(1px + 2px)}'
+
+
+def test_build_writes_a_hashed_bundle_and_a_gzip_copy(bundles):
+    filename = bundles.build()["app.css"]
+    assert filename.startswith("app.") and filename.endswith(".css")
+    path = os.path.join(bundles.out_dir, filename)
+    with open(path, "rb") as f:
+        content = f.read()
+    assert content == minify_css(BASE_CSS + "\n" + CARD_CSS).encode("utf-8")
+    with open(path + ".gz", "rb") as f:
+        assert gzip.decompress(f.read()) == content
+    # unchanged content builds to the same name
+    assert bundles.build()["app.css"] == filename
+
+
+def test_resolve_picks_the_copy_the_client_accepts(bundles):
+    filename = bundles.build()["app.css"]
+    path = os.path.join(bundles.out_dir, filename)
+    assert bundles.resolve(filename, "gzip, deflate") == (path + ".gz", "gzip")
+    assert bundles.resolve(filename, "") == (path, None)
+    assert bundles.resolve("app.000000000000.css") is None
+    assert bundles.resolve("../../secrets.css") is None
+
+
+def test_bundle_is_served_as_immutable(app, bundles):
+    filename = bundles.build()["app.css"]
+    response = app.test_client().get(f"/assets/{filename}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == CACHE_CONTROL
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert app.test_client().get("/assets/nope.css").status_code == 404
+
+
+def test_previous_build_stays_available(app, bundles):
+    first = bundles.build()["app.css"]
+    with open(os.path.join(app.static_folder, "css", "base.css"), "a") as f:
+        f.write("p { color: red; }\n")
+    second = bundles.build()["app.css"]
+    assert second != first
+    assert bundles.resolve(first) is not None and bundles.resolve(second) is not None
+
+
+def test_page_links_the_current_build(app, bundles):
+    with app.test_request_context():
+        # nothing built it yet, so the first render does
+        html = render_template_string('{{ stylesheet_links("app.css") }}')
+    assert html == f'<link rel="stylesheet" href="/assets/{bundles.built["app.css"]}">'
+
+
+def test_sources_are_read_from_source_dir(app, tmp_path):
+    elsewhere = tmp_path / "styles"
+    elsewhere.mkdir()
+    (elsewhere / "only.css").write_text("h1 { margin: 0; }")
+    bundles = AssetBundles(app, {"app.css": ["only.css"]}, source_dir=str(elsewhere))
+    with open(os.path.join(bundles.out_dir, bundles.build()["app.css"])) as f:
+        assert f.read() == "h1{margin:0}"
+
+
+def test_missing_source_fails_the_build(app, bundles):
+    os.remove(os.path.join(app.static_folder, "css", "card.css"))
+    with pytest.raises(OSError):
+        bundles.build()
@@ -0,0 +1,99 @@
+# tests for the aiohttp front end: native game routes and the WSGI fallback
+
+import asyncio
+import os
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer # type: ignore
+from flask import Flask, request
+
+# only the routes are under test here, not main's background workers
+os.environ["APP_PRELOAD"] = "1"
+
+import async_app
+from package import random_game
+from package.upstream_guard import UpstreamError
+
+GAME = {"appid": 10, "name": "Counter-Strike", "genres": ["Action"]}
+
+
+class FakeAuth:
+    def get_user_from_session(self, token):
+        return {"id": "user-1"} if token == "good" else None
+
+
+def _flask_app():
+    app = Flask("fallback")
+
+    @app.post("/echo")
+    def echo():
+        return request.get_data(as_text=True).upper(), 201, {"X-Echo": request.headers.get("X-Test", "")}
+
+    return app
+
+
+def _get(path, **kwargs):
+    """Runs one request against a fresh app and returns (status, headers, body)."""
+    async def run():
+        app = async_app.create_app(wsgi_app=_flask_app(), auth_service=FakeAuth(), blocking_workers=2)
+        async with TestClient(TestServer(app)) as client:
+            method = kwargs.pop("method", "GET")
+            async with client.request(method, path, **kwargs) as response:
+                return response.status, response.headers, await response.read()
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def games(monkeypatch):
+    async def random_game_async(any_genres=None, all_genres=None):
+        if any_genres == ["Broken"]:
+            raise UpstreamError("steam is down")
+        return None if any_genres else dict(GAME)
+
+    async def games_async(appids):
+        return {10: dict(GAME)}, [appid for appid in appids if appid != 10], []
+
+    async def next_game_async(session_token, any_genres=None, all_genres=None):
+        return dict(GAME, session=session_token)
+
+    monkeypatch.setattr(random_game, "get_random_game_async", random_game_async)
+    monkeypatch.setattr(random_game, "get_games_async", games_async)
+    monkeypatch.setattr(random_game, "get_next_game_async", next_game_async)
+
+
+def test_random_game_is_served_natively(games):
+    status, _, body = _get("/game/random")
+    assert status == 200 and b"Counter-Strike" in body
+
+
+def test_filters_with_no_match_are_a_404(games):
+    status, _, body = _get("/game/random?any_genre=Puzzle")
+    assert status == 404 and b"No games match" in body
+
+
+def test_bad_count_is_a_400(games):
+    assert _get("/game/random?count=zero")[0] == 400
+    assert _get(f"/game/random?count={random_game.MAX_BATCH + 1}")[0] == 400
+
+
+def test_bulk_lookup_reports_missing_ids(games):
+    status, _, body = _get("/games?ids=10,11")
+    assert status == 200 and b'"missing": [11]' in body
+    assert _get("/games?ids=ten")[0] == 400
+
+
+def test_next_game_needs_a_valid_session(games):
+    assert _get("/game/next")[0] == 400
+    assert _get("/game/next", headers={"X-Session-Token": "bad"})[0] == 401
+    status, _, body = _get("/game/next", headers={"X-Session-Token": "good"})
+    assert status == 200 and b'"session": "good"' in body
+
+
+def test_upstream_outage_is_a_503(games):
+    assert _get("/game/random?any_genre=Broken")[0] == 503
+
+
+def test_other_routes_fall_through_to_the_wsgi_app():
+    status, headers, body = _get("/echo", method="POST", data=b"hello", headers={"X-Test": "yes"})
+    assert (status, body, headers["X-Echo"]) == (201, b"HELLO", "yes")
+    assert _get("/no/such/page")[0] == 404
@@ -0,0 +1,66 @@
+# tests for the parallel batch lookups behind /game/random?count=N and /games?ids=...
+
+import time
+
+import pytest
+
+from package import random_game
+from package.game_repository import GameRepository
+
+
+class FakeLookup:
+    """Stands in for get_steam_game_info: `dead` ids are unavailable, `broken` ids raise."""
+
+    def __init__(self, dead=(), broken=(), delay=0.0):
+        self.dead = set(dead)
+        self.broken = set(broken)
+        self.delay = delay
+
+    def __call__(self, appid, cc="us", lang="en"):
+        time.sleep(self.delay)
+        if appid in self.broken:
+            raise OSError("timed out")
+        if appid in self.dead:
+            return None
+        return {"appid": appid, "name": f"Game {appid}"}
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    """An empty local store and a catalog of app ids 1..30."""
+    path = tmp_path / "games.txt"
+    path.write_text("".join(f"{appid}\n" for appid in range(1, 31)))
+    monkeypatch.setattr(random_game, "game_catalog", random_game.game_catalog)
+    monkeypatch.setattr(random_game, "_genre_index", None)
+    monkeypatch.setattr(random_game, "game_repository", GameRepository(str(tmp_path / "games.db")))
+    random_game.configure_catalog(str(path))
+
+
+def test_get_games_splits_missing_and_failed(catalog, monkeypatch):
+    monkeypatch.setattr(random_game, "get_steam_game_info", FakeLookup(dead=[2], broken=[3]))
+    games, missing, failed = random_game.get_games([1, 2, 3, 2, 4])
+    assert sorted(games) == [1, 4]
+    assert games[4]["name"] == "Game 4"
+    assert missing == [2]
+    assert failed == [3]
+
+
+def test_get_games_resolves_in_parallel(catalog, monkeypatch):
+    monkeypatch.setattr(random_game, "get_steam_game_info", FakeLookup(delay=0.2))
+    started = time.monotonic()
+    games, _, _ = random_game.get_games(list(range(1, 9)))
+    assert len(games) == 8
+    assert time.monotonic() - started < 0.6
+
+
+def test_random_batch_is_distinct_and_replaces_delisted_picks(catalog, monkeypatch):
+    monkeypatch.setattr(random_game, "get_steam_game_info", FakeLookup(dead=[1, 2]))
+    for _ in range(20):
+        appids = [game["appid"] for game in random_game.get_random_games(10)]
+        assert len(set(appids)) == 10
+        assert not {1, 2} & set(appids)
+
+
+def test_random_batch_is_capped(catalog, monkeypatch):
+    monkeypatch.setattr(random_game, "get_steam_game_info", FakeLookup())
+    assert len(random_game.get_random_games(50)) == random_game.MAX_BATCH
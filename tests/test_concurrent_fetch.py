@@ -0,0 +1,49 @@
+# tests for the pooled, concurrent appdetails + appreviews fetch
+
+import time
+
+from package import steam_game_info
+
+
+def test_details_and_reviews_are_fetched_in_parallel(steam_cache, steam_server):
+    steam_server.add_game(10, "Counter-Strike", ["Action"])
+    steam_server.delay = {"details": 0.3, "reviews": 0.3}
+
+    started = time.monotonic()
+    game = steam_game_info.get_steam_game_info(10)
+    elapsed = time.monotonic() - started
+
+    assert game["name"] == "Counter-Strike"
+    assert game["genres"] == ["Action"]
+    assert game["price"] == "Free"
+    assert game["review_summary"] == "Very Positive"
+    # one round trip, not two back to back
+    assert elapsed < 0.55
+
+
+def test_lookups_reuse_kept_alive_connections(steam_cache, steam_server):
+    for appid in range(1, 9):
+        steam_server.add_game(appid, f"Game {appid}")
+    for appid in range(1, 9):
+        assert steam_game_info.get_steam_game_info(appid)["name"] == f"Game {appid}"
+
+    assert steam_server.count("details") == steam_server.count("reviews") == 8
+    # at most one connection for appdetails and one for the reviews call running beside it
+    assert steam_server.connections() <= 2
+
+
+def test_slow_reviews_time_out_to_a_placeholder(steam_cache, steam_server):
+    steam_server.add_game(10, "Counter-Strike")
+    steam_server.delay["reviews"] = 1.0
+    steam_game_info.configure_http(reviews_timeout=0.2)
+
+    started = time.monotonic()
+    game = steam_game_info.get_steam_game_info(10)
+    assert time.monotonic() - started < 0.9
+    assert game["name"] == "Counter-Strike"
+    assert game["review_summary"] == "No reviews"
+
+
+def test_delisted_game_returns_none(steam_cache, steam_server):
+    assert steam_game_info.get_steam_game_info(404) is None
+    assert steam_server.count("details") == 1
@@ -0,0 +1,137 @@
+# tests for the fixed-size database connection pool
+
+import itertools
+import threading
+
+import pytest
+
+from package import connection_pool
+from package.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    numbers = itertools.count()
+
+    def __init__(self):
+        self.number = next(self.numbers)
+        self.closed = False
+        self.rollbacks = 0
+        self.fail_rollback = False
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise OSError("connection lost")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    """Stands in for the time module inside connection_pool only."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(connection_pool, "time", clock)
+    return clock
+
+
+def test_idle_connection_is_reused():
+    pool = ConnectionPool(FakeConnection, size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    stats = pool.stats()
+    assert stats["created"] == 1 and stats["acquired"] == 2 and stats["idle"] == 1
+
+
+def test_acquire_times_out_when_every_connection_is_busy():
+    pool = ConnectionPool(FakeConnection, size=2, acquire_timeout=0.05)
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["open"] == 2
+    for pooled in held:
+        pool.release(pooled)
+
+
+def test_waiter_gets_the_released_connection():
+    pool = ConnectionPool(FakeConnection, size=1, acquire_timeout=2)
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    waiter.join(2)
+    assert got and got[0].conn is held.conn
+    assert pool.stats()["waited"] == 1
+
+
+def test_error_rolls_back_and_keeps_the_connection():
+    pool = ConnectionPool(FakeConnection, size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError("bad input")
+    assert conn.rollbacks == 1 and not conn.closed
+    with pool.connection() as again:
+        assert again is conn
+
+
+def test_connection_that_cannot_roll_back_is_replaced():
+    pool = ConnectionPool(FakeConnection, size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            conn.fail_rollback = True
+            raise ValueError("bad input")
+    assert conn.closed
+    with pool.connection() as again:
+        assert again is not conn
+    assert pool.stats()["open"] == 1
+
+
+def test_old_connections_are_retired(clock):
+    pool = ConnectionPool(FakeConnection, size=1, max_lifetime=60)
+    with pool.connection() as first:
+        pass
+    clock.now += 61
+    with pool.connection() as second:
+        assert second is not first
+    assert first.closed and pool.stats()["expired"] == 1
+
+
+def test_idle_connection_is_health_checked(clock):
+    healthy = {"ok": False}
+    pool = ConnectionPool(FakeConnection, size=1, check_idle_after=30, is_healthy=lambda conn: healthy["ok"])
+    with pool.connection() as first:
+        pass
+    clock.now += 10
+    with pool.connection() as conn:
+        assert conn is first
+    clock.now += 31
+    with pool.connection() as conn:
+        assert conn is not first
+    assert pool.stats()["failed_health_checks"] == 1
+
+
+def test_reset_runs_on_release_and_drops_broken_connections():
+    def reset(conn):
+        conn.rollback()
+
+    pool = ConnectionPool(FakeConnection, size=1, reset=reset)
+    with pool.connection() as conn:
+        pass
+    assert conn.rollbacks == 1
+
+    conn.fail_rollback = True
+    with pool.connection():
+        pass
+    assert conn.closed and pool.stats()["idle"] == 0
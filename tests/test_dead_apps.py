@@ -0,0 +1,82 @@
+# tests for the negative cache of app ids Steam reports as unavailable
+
+import pytest
+
+from package import game_cache, random_game, steam_game_info
+from package.game_cache import DeadAppCache
+
+HOUR = 60 * 60
+
+
+class FakeClock:
+    """Stands in for the time module inside game_cache only."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(game_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def dead(tmp_path, clock):
+    return DeadAppCache(path=str(tmp_path / "cache.db"), base_ttl=HOUR, max_ttl=4 * HOUR)
+
+
+def test_backoff_doubles_up_to_the_cap(dead, clock):
+    windows = []
+    for _ in range(4):
+        windows.append(dead.mark_dead(10) - clock.now)
+    assert windows == [HOUR, 2 * HOUR, 4 * HOUR, 4 * HOUR]
+
+
+def test_dead_only_inside_the_window(dead, clock):
+    dead.mark_dead(10)
+    assert dead.should_skip(10)
+    assert not dead.is_dead(10, "de")
+    clock.now += HOUR
+    assert not dead.should_skip(10)
+    assert dead.stats()["skipped"] == 1
+
+
+def test_revived_app_starts_over(dead, clock):
+    dead.mark_dead(10)
+    dead.mark_dead(10)
+    dead.mark_alive(10)
+    assert not dead.is_dead(10)
+    assert dead.mark_dead(10) - clock.now == HOUR
+
+
+def test_dead_apps_survive_a_restart(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    DeadAppCache(path=path).mark_dead(10)
+    assert DeadAppCache(path=path).is_dead(10)
+
+
+def test_delisted_app_is_not_refetched_until_its_retry(steam_cache, steam_server, clock):
+    assert steam_game_info.get_steam_game_info(404) is None
+    assert steam_game_info.get_steam_game_info(404) is None
+    assert steam_server.count("details") == 1
+
+    clock.now += HOUR
+    steam_server.add_game(404, "Back on the store")
+    assert steam_game_info.get_steam_game_info(404)["name"] == "Back on the store"
+    assert not steam_game_info.dead_apps.is_dead(404)
+
+
+def test_random_picks_leave_dead_apps_out(steam_cache, tmp_path, monkeypatch):
+    path = tmp_path / "games.txt"
+    path.write_text("1\n2\n3\n")
+    monkeypatch.setattr(random_game, "game_catalog", random_game.game_catalog)
+    monkeypatch.setattr(random_game, "_genre_index", None)
+    random_game.configure_catalog(str(path))
+
+    steam_game_info.dead_apps.mark_dead(2)
+    assert {random_game.draw_catalog_appid() for _ in range(50)} == {1, 3}
@@ -0,0 +1,209 @@
+# tests for the SMTP outbox: pending -> sending -> sent / retried / failed
+
+import smtplib
+import sqlite3
+import time
+from email.message import EmailMessage
+
+import pytest
+
+from services.email_queue import EmailQueue, EmailQueueFullError
+
+
+class FakeSMTP:
+    """Records what it sends; replies[recipient] is a list of errors to raise, one per try."""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.sent = []
+
+    def send_message(self, message):
+        errors = self.replies.get(message["To"])
+        if errors:
+            raise errors.pop(0)
+        self.sent.append(message["To"])
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def make_queue(tmp_path, monkeypatch):
+    queues = []
+
+    def make(replies=None, **options):
+        smtp = FakeSMTP(replies or {})
+        monkeypatch.setattr(EmailQueue, "_connect", lambda self: smtp)
+        options.setdefault("base_backoff", 0.01)
+        options.setdefault("workers", 1)
+        queue = EmailQueue(str(tmp_path / "outbox.db"), **options)
+        queues.append(queue)
+        return queue, smtp
+
+    yield make
+    for queue in queues:
+        queue.stop(2)
+
+
+def _message(to):
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = to
+    message["Subject"] = "hello"
+    message.set_content("line one\nline two\n")
+    return message
+
+
+def _rows(queue):
+    return queue._db.execute("SELECT status, attempts, last_error FROM outbox ORDER BY id").fetchall()
+
+
+def test_sent_messages_leave_the_outbox(make_queue):
+    queue, smtp = make_queue()
+    for i in range(3):
+        queue.enqueue(_message(f"user{i}@example.com"))
+    queue.start()
+    assert queue.flush(5)
+    assert sorted(smtp.sent) == ["user0@example.com", "user1@example.com", "user2@example.com"]
+    assert _rows(queue) == []
+    assert queue.stats()["sent"] == 3 and queue.stats()["pending_estimate"] == 0
+
+
+def test_temporary_failure_is_retried(make_queue):
+    queue, smtp = make_queue({"later@example.com": [smtplib.SMTPResponseException(451, b"try again")]})
+    queue.enqueue(_message("later@example.com"))
+    queue.start()
+    deadline = time.monotonic() + 5
+    while not smtp.sent and time.monotonic() < deadline:
+        queue.flush(1)
+    assert smtp.sent == ["later@example.com"]
+    assert queue.stats()["retried"] == 1
+
+
+def test_permanent_failure_is_given_up_at_once(make_queue):
+    queue, smtp = make_queue({"gone@example.com": [smtplib.SMTPResponseException(550, b"no such user")]})
+    queue.enqueue(_message("gone@example.com"))
+    queue.start()
+    assert queue.flush(5)
+    [(status, attempts, error)] = _rows(queue)
+    assert (status, attempts) == ("failed", 1) and error.startswith("550")
+    assert queue.stats()["pending_estimate"] == 0
+
+
+def test_gives_up_after_max_attempts(make_queue):
+    errors = [smtplib.SMTPResponseException(421, b"busy") for _ in range(5)]
+    queue, smtp = make_queue({"busy@example.com": errors}, max_attempts=3)
+    queue.enqueue(_message("busy@example.com"))
+    queue.start()
+    deadline = time.monotonic() + 5
+    while _rows(queue)[0][0] != "failed" and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert _rows(queue)[0][:2] == ("failed", 3)
+    assert smtp.sent == []
+
+
+def test_full_outbox_rejects_new_messages(make_queue):
+    queue, _ = make_queue(max_pending=2)
+    queue.enqueue(_message("a@example.com"))
+    queue.enqueue(_message("b@example.com"))
+    with pytest.raises(EmailQueueFullError):
+        queue.enqueue(_message("c@example.com"))
+    queue.start()
+    assert queue.flush(5)
+    queue.enqueue(_message("c@example.com"))
+
+
+def test_only_expired_claims_are_reclaimed(make_queue):
+    queue, smtp = make_queue(lease_timeout=60)
+    stuck, live = queue.enqueue(_message("stuck@example.com")), queue.enqueue(_message("live@example.com"))
+    now = time.time()
+    # one claim from a process that died long ago, one a live process took a moment ago
+    queue._db.execute("UPDATE outbox SET status = 'sending', claimed_by = 'dead:1', claimed_at = ? WHERE id = ?", (now - 120, stuck))
+    queue._db.execute("UPDATE outbox SET status = 'sending', claimed_by = 'live:2', claimed_at = ? WHERE id = ?", (now, live))
+    queue._db.commit()
+
+    claimed = queue._claim()
+    assert [row[0] for row in claimed] == [stuck]
+    queue._finish([(stuck, 0, None, False)])
+    assert smtp.sent == []
+    assert queue._db.execute("SELECT id, claimed_by FROM outbox").fetchall() == [(live, "live:2")]
+
+
+def test_result_for_a_lost_claim_is_ignored(make_queue):
+    queue, _ = make_queue()
+    message_id = queue.enqueue(_message("a@example.com"))
+    [(claimed_id, _, attempts)] = queue._claim()
+    # our lease ran out and another process reclaimed the row
+    queue._db.execute("UPDATE outbox SET claimed_by = 'other:1' WHERE id = ?", (message_id,))
+    queue._db.commit()
+    queue._finish([(claimed_id, attempts, None, False)])
+    assert queue._db.execute("SELECT claimed_by FROM outbox").fetchall() == [("other:1",)]
+
+
+def test_legacy_outbox_file_is_upgraded(tmp_path):
+    path = str(tmp_path / "old.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, status TEXT NOT NULL,"
+        " attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, last_error TEXT, created_at REAL NOT NULL)"
+    )
+    db.execute("INSERT INTO outbox (message, status, next_attempt_at, created_at) VALUES (?, 'sending', 0, 0)",
+               (_message("old@example.com").as_string(),))
+    db.commit()
+    db.close()
+
+    queue = EmailQueue(path)
+    assert queue.stats()["pending_estimate"] == 1
+    # a claim from before leases has no claimed_at; it counts as expired
+    assert len(queue._claim()) == 1
+
+
+def test_lost_claim_is_not_counted(make_queue):
+    queue, _ = make_queue()
+    first, second = queue.enqueue(_message("a@example.com")), queue.enqueue(_message("b@example.com"))
+    claimed = queue._claim()
+    queue._db.execute("UPDATE outbox SET claimed_by = 'other:1' WHERE id = ?", (first,))
+    queue._db.commit()
+    queue._finish([(message_id, attempts, None, False) for message_id, _, attempts in claimed])
+    stats = queue.stats()
+    assert (stats["sent"], stats["pending_estimate"]) == (1, 1)
+    assert queue._db.execute("SELECT id FROM outbox").fetchall() == [(first,)]
+
+
+def test_sender_survives_a_locked_outbox(make_queue, monkeypatch):
+    queue, smtp = make_queue()
+    claim = EmailQueue._claim
+    failures = []
+
+    def locked_once(self):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return claim(self)
+
+    monkeypatch.setattr(EmailQueue, "_claim", locked_once)
+    queue.enqueue(_message("a@example.com"))
+    queue.start()
+    assert queue.flush(5)
+    assert smtp.sent == ["a@example.com"]
+    assert queue.stats()["errors"] == 1
+
+
+def test_unrecorded_results_are_written_on_the_next_pass(make_queue, monkeypatch):
+    queue, smtp = make_queue()
+    finish = EmailQueue._finish
+    failures = []
+
+    def locked_once(self, results):
+        if not failures:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        return finish(self, results)
+
+    monkeypatch.setattr(EmailQueue, "_finish", locked_once)
+    queue.enqueue(_message("a@example.com"))
+    queue.start()
+    assert queue.flush(5)
+    # sent once, recorded once the outbox was free again
+    assert smtp.sent == ["a@example.com"]
+    assert queue.stats()["sent"] == 1 and _rows(queue) == []
@@ -0,0 +1,84 @@
+# tests for the pre-resolved random game buffer
+
+import itertools
+import time
+
+import pytest
+
+from package import random_game
+from package.game_buffer import RandomGameBuffer
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _counter():
+    numbers = itertools.count()
+    return lambda: {"appid": next(numbers)}
+
+
+@pytest.fixture
+def buffer():
+    buffers = []
+
+    def make(resolve, **kwargs):
+        buffers.append(RandomGameBuffer(resolve, **kwargs).start())
+        return buffers[-1]
+
+    yield make
+    for started in buffers:
+        started.stop(timeout=2)
+
+
+def test_fills_up_to_the_high_watermark(buffer):
+    games = buffer(_counter(), low_watermark=2, high_watermark=5)
+    assert _wait_for(lambda: len(games) == 5)
+    time.sleep(0.05)
+    assert len(games) == 5
+    assert games.stats()["produced"] == 5
+
+
+def test_pops_in_order_and_refills_below_the_low_watermark(buffer):
+    games = buffer(_counter(), low_watermark=2, high_watermark=4)
+    assert _wait_for(lambda: len(games) == 4)
+    assert [games.pop()["appid"] for _ in range(3)] == [0, 1, 2]
+    assert _wait_for(lambda: len(games) == 4)
+    assert games.pop()["appid"] == 3
+
+
+def test_underrun_returns_none():
+    games = RandomGameBuffer(_counter(), low_watermark=1, high_watermark=2)
+    assert games.pop() is None
+    assert games.stats()["underruns"] == 1
+
+
+def test_failed_resolves_do_not_stop_the_producer(buffer):
+    calls = itertools.count()
+
+    def resolve():
+        n = next(calls)
+        if n < 4:
+            raise OSError("Steam is down")
+        return None if n == 4 else {"appid": n}
+
+    games = buffer(resolve, low_watermark=1, high_watermark=3, failure_backoff=0.01)
+    assert _wait_for(lambda: len(games) == 3)
+    assert games.stats()["resolve_failures"] == 5
+
+
+def test_rejects_bad_watermarks():
+    with pytest.raises(ValueError):
+        RandomGameBuffer(_counter(), low_watermark=4, high_watermark=4)
+
+
+def test_random_game_pops_from_a_running_buffer(buffer, monkeypatch):
+    games = buffer(lambda: {"name": "Buffered"}, low_watermark=1, high_watermark=2)
+    assert _wait_for(lambda: len(games) == 2)
+    monkeypatch.setattr(random_game, "random_game_buffer", games)
+    assert random_game.get_random_game() == {"name": "Buffered"}
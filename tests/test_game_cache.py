@@ -0,0 +1,109 @@
+# tests for the Steam metadata cache and the cached get_steam_game_info
+
+import pytest
+
+from package import game_cache, steam_game_info
+from package.game_cache import GameInfoCache
+
+KEY = ("details", 10, "us", "en")
+DETAILS = {"name": "Counter-Strike", "price": "$9.99", "genres": ["Action"]}
+
+
+class FakeClock:
+    """Stands in for the time module inside game_cache only."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(game_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GameInfoCache(path=str(tmp_path / "cache.db"), max_entries=2)
+
+
+class FakeSteam:
+    """Replaces the two upstream fetches and counts the calls that reach them."""
+
+    def __init__(self, monkeypatch):
+        self.details = {10: DETAILS}
+        self.reviews = {10: "Very Positive"}
+        self.calls = []
+        monkeypatch.setattr(steam_game_info, "fetch_app_details", self.fetch_app_details)
+        monkeypatch.setattr(steam_game_info, "fetch_review_summary", self.fetch_review_summary)
+
+    def fetch_app_details(self, appid, cc="us", lang="en"):
+        self.calls.append(("details", appid))
+        return self.details.get(appid)
+
+    def fetch_review_summary(self, appid):
+        self.calls.append(("reviews", appid))
+        return self.reviews.get(appid)
+
+
+def test_entry_expires_after_its_ttl(cache, clock):
+    cache.set(KEY, DETAILS, ttl=60)
+    clock.now += 59
+    assert cache.get(KEY) == DETAILS
+    clock.now += 2
+    assert cache.get(KEY) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicted_entry_is_read_back_from_disk(cache):
+    for appid in (1, 2, 3):
+        cache.set(("details", appid, "us", "en"), {"appid": appid}, ttl=60)
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["memory_entries"] == 2
+
+    assert cache.get(("details", 1, "us", "en")) == {"appid": 1}
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["hits"] == 0
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    GameInfoCache(path=path).set(KEY, DETAILS, ttl=60)
+    assert GameInfoCache(path=path).get(KEY) == DETAILS
+
+
+def test_invalidate_and_clear(cache):
+    cache.set(KEY, DETAILS, ttl=60)
+    cache.set(("reviews", 10, "us", "en"), "Positive", ttl=60)
+    cache.invalidate(KEY)
+    assert cache.get(KEY) is None
+    cache.clear()
+    assert cache.get(("reviews", 10, "us", "en")) is None
+
+
+def test_repeat_lookups_skip_the_network(steam_cache, monkeypatch):
+    steam = FakeSteam(monkeypatch)
+    first = steam_game_info.get_steam_game_info(10)
+    second = steam_game_info.get_steam_game_info(10)
+    assert first == second == dict(DETAILS, review_summary="Very Positive")
+    assert sorted(steam.calls) == [("details", 10), ("reviews", 10)]
+
+
+def test_failed_review_fetch_is_not_cached(steam_cache, monkeypatch):
+    steam = FakeSteam(monkeypatch)
+    steam.reviews = {}
+    assert steam_game_info.get_steam_game_info(10)["review_summary"] == "No reviews"
+
+    steam.reviews = {10: "Mixed"}
+    assert steam_game_info.get_steam_game_info(10)["review_summary"] == "Mixed"
+    assert steam.calls.count(("details", 10)) == 1
+    assert steam.calls.count(("reviews", 10)) == 2
+
+
+def test_unavailable_game_returns_none(steam_cache, monkeypatch):
+    FakeSteam(monkeypatch)
+    assert steam_game_info.get_steam_game_info(99) is None
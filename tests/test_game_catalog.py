@@ -0,0 +1,101 @@
+# tests for the lazily loaded game id catalog and its mmap snapshot
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from package import game_catalog
+from package.game_cache import DeadAppCache, GameInfoCache
+from package.game_catalog import GameCatalog, read_game_ids, write_snapshot
+from package.game_repository import GameRepository
+
+
+@pytest.fixture
+def games_txt(tmp_path):
+    path = tmp_path / "games.txt"
+    path.write_text("10\n20\n\n10\n30\n 20 \n")
+    return str(path)
+
+
+def _age(path, seconds):
+    mtime = os.path.getmtime(path) - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_ids_are_deduplicated_in_file_order(games_txt):
+    ids = read_game_ids(games_txt)
+    assert ids.typecode == "I"
+    assert list(ids) == [10, 20, 30]
+
+
+def test_nothing_is_read_until_first_use(tmp_path):
+    catalog = GameCatalog(str(tmp_path / "missing.txt"))
+    assert catalog.source is None
+    with pytest.raises(FileNotFoundError):
+        len(catalog)
+
+
+def test_current_snapshot_is_memory_mapped(games_txt, tmp_path):
+    snapshot = str(tmp_path / "games.bin")
+    write_snapshot(read_game_ids(games_txt), snapshot)
+    _age(games_txt, 60)
+
+    catalog = GameCatalog(games_txt, snapshot=snapshot)
+    assert list(catalog) == [10, 20, 30]
+    assert catalog.source == snapshot
+    assert catalog[1] == 20 and len(catalog) == 3
+
+
+def test_snapshot_older_than_the_text_file_is_ignored(games_txt, tmp_path):
+    snapshot = str(tmp_path / "games.bin")
+    write_snapshot([1, 2], snapshot)
+    _age(snapshot, 60)
+
+    catalog = GameCatalog(games_txt, snapshot=snapshot)
+    assert list(catalog) == [10, 20, 30]
+    assert catalog.source == games_txt
+
+
+def test_corrupt_snapshot_falls_back_to_the_text_file(games_txt, tmp_path):
+    snapshot = tmp_path / "games.bin"
+    snapshot.write_bytes(b"not a snapshot at all")
+    _age(games_txt, 60)
+
+    catalog = GameCatalog(games_txt, snapshot=str(snapshot))
+    assert list(catalog) == [10, 20, 30]
+    assert catalog.source == games_txt
+
+
+def test_cli_builds_a_snapshot(games_txt, tmp_path, capsys):
+    snapshot = str(tmp_path / "games.bin")
+    assert game_catalog.main([games_txt, snapshot]) == 0
+    assert "3 unique app ids" in capsys.readouterr().out
+    assert list(GameCatalog(str(tmp_path / "gone.txt"), snapshot=snapshot)) == [10, 20, 30]
+
+
+def test_importing_the_app_creates_no_files(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import sys, types; "
+        "package = types.ModuleType('package'); "
+        f"package.__path__ = [{os.path.join(root, 'repositories')!r}]; "
+        "sys.modules['package'] = package; "
+        "import main"
+    )
+    env = dict(os.environ, PYTHONPATH=root, APP_PRELOAD="1")
+    subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, check=True)
+    assert os.listdir(tmp_path) == []
+
+
+def test_stores_open_their_files_on_first_use(tmp_path):
+    repo = GameRepository(str(tmp_path / "games.db"))
+    cache = GameInfoCache(str(tmp_path / "steam_cache.db"))
+    dead = DeadAppCache(str(tmp_path / "steam_cache.db"))
+    assert os.listdir(tmp_path) == []
+
+    assert repo.count() == 0
+    assert cache.get(("details", 10, "us", "en")) is None
+    assert not dead.is_dead(10)
+    assert sorted(os.listdir(tmp_path)) == ["games.db", "steam_cache.db"]
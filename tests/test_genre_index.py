@@ -0,0 +1,130 @@
+# tests for the genre -> bitset index
+
+import random
+
+import pytest
+
+from package import random_game
+from package.game_repository import GameRepository
+from package.genre_index import GenreIndex, _nth_set_bit
+
+APPIDS = [10, 20, 30, 40, 50]
+
+
+def _index():
+    index = GenreIndex(APPIDS)
+    index.update(10, ["Action"])
+    index.update(20, ["Action", "RPG"])
+    index.update(30, ["RPG", "Indie"])
+    index.update(40, ["Indie", "Puzzle"])
+    return index
+
+
+def test_match_any_and_all():
+    index = _index()
+    assert index.appids_for(index.match(any_of=["Action", "Puzzle"])) == [10, 20, 40]
+    assert index.appids_for(index.match(all_of=["Action", "RPG"])) == [20]
+    assert index.appids_for(index.match(any_of=["RPG"], all_of=["Indie"])) == [30]
+    assert index.match(any_of=["Strategy"]) == 0
+
+
+def test_no_filter_matches_only_known_games():
+    index = _index()
+    assert index.appids_for(index.match()) == [10, 20, 30, 40]
+    assert len(index) == 4
+
+
+def test_update_replaces_and_drops_genres():
+    index = _index()
+    index.update(20, ["Puzzle"])
+    assert index.appids_for(index.match(any_of=["Action"])) == [10]
+    assert index.appids_for(index.match(any_of=["Puzzle"])) == [20, 40]
+
+    index.update(40, None)
+    assert index.appids_for(index.match(any_of=["Puzzle"])) == [20]
+    assert "Indie" in index.genre_counts() and index.genre_counts()["Indie"] == 1
+    assert len(index) == 3
+
+
+def test_unknown_appid_is_ignored():
+    index = _index()
+    index.update(999, ["Action"])
+    assert index.appids_for(index.match(any_of=["Action"])) == [10, 20]
+
+
+def test_pick_stays_inside_the_bitset():
+    index = _index()
+    rng = random.Random(7)
+    rpg = index.match(any_of=["RPG"])
+    assert {index.pick(rpg, rng) for _ in range(50)} == {20, 30}
+    assert index.pick(0, rng) is None
+
+
+def test_sample_draws_distinct_matches():
+    index = _index()
+    rng = random.Random(7)
+    assert sorted(index.sample(index.match(), 10, rng)) == [10, 20, 30, 40]
+    sample = index.sample(index.match(any_of=["Action", "Indie"]), 2, rng)
+    assert len(set(sample)) == 2 and set(sample) <= {10, 20, 30, 40}
+    assert index.sample(0, 3, rng) == []
+
+
+def test_unindexed_is_everything_not_known():
+    index = _index()
+    assert index.appids_for(index.unindexed()) == [50]
+    index.update(20, None)
+    assert index.appids_for(index.unindexed()) == [20, 50]
+
+
+class GenreLookup:
+    """Stands in for get_steam_game_info: even app ids are Action games, odd ones Puzzle."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, appid, cc="us", lang="en"):
+        self.calls.append(appid)
+        return {"appid": appid, "genres": ["Action"] if appid % 2 == 0 else ["Puzzle"]}
+
+
+@pytest.fixture
+def cold_catalog(tmp_path, monkeypatch, steam_cache):
+    """A catalog of as many games as one probe looks up, no local store and no cached metadata."""
+    path = tmp_path / "games.txt"
+    path.write_text("".join(f"{appid}\n" for appid in range(1, random_game.UNINDEXED_PROBES + 1)))
+    monkeypatch.setattr(random_game, "game_catalog", random_game.game_catalog)
+    monkeypatch.setattr(random_game, "_genre_index", None)
+    monkeypatch.setattr(random_game, "game_repository", GameRepository(str(tmp_path / "games.db")))
+    random_game.configure_catalog(str(path))
+    lookup = GenreLookup()
+    monkeypatch.setattr(random_game, "get_steam_game_info", lookup)
+    return lookup
+
+
+def test_filter_on_a_cold_index_looks_games_up(cold_catalog):
+    assert len(random_game.get_genre_index()) == 0
+    assert random_game.get_random_game(any_genres=["Puzzle"])["appid"] % 2 == 1
+    assert random_game.get_random_game(all_genres=["Strategy"]) is None
+
+
+def test_filtered_batch_on_a_cold_index_looks_games_up(cold_catalog):
+    games = random_game.get_random_games(3, any_genres=["Action"])
+    assert len({game["appid"] for game in games}) == 3
+    assert all(game["appid"] % 2 == 0 for game in games)
+
+
+def test_next_game_on_a_cold_index_looks_games_up(cold_catalog):
+    assert random_game.get_next_game("token", any_genres=["Action"])["genres"] == ["Action"]
+
+
+def test_fully_indexed_catalog_is_not_probed(cold_catalog):
+    index = random_game.get_genre_index()
+    for appid in index.appids:
+        index.update(appid, ["Action"])
+    assert random_game.get_random_game(any_genres=["Puzzle"]) is None
+    assert cold_catalog.calls == []
+
+
+def test_nth_set_bit_across_bytes():
+    bits = (1 << 2) | (1 << 9) | (1 << 64) | (1 << 1000)
+    assert [_nth_set_bit(bits, n) for n in range(4)] == [2, 9, 64, 1000]
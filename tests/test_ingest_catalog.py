@@ -0,0 +1,116 @@
+# tests for the local game store and the offline catalog ingester
+
+import time
+
+import pytest
+
+from package import ingest_catalog, random_game
+from package.game_repository import GameRepository
+
+
+def _game(name, genres=()):
+    return {"name": name, "genres": list(genres), "review_summary": "Positive"}
+
+
+@pytest.fixture
+def repo(tmp_path):
+    return GameRepository(str(tmp_path / "games.db"))
+
+
+def test_store_indexes_games_by_availability_and_genre(repo):
+    repo.upsert(10, _game("Counter-Strike", ["Action"]))
+    repo.upsert(20, _game("Portal", ["Action", "Puzzle"]))
+    repo.upsert(30, None)
+
+    assert repo.get(20)["name"] == "Portal"
+    assert repo.get(30) is None
+    assert repo.available_ids() == [10, 20]
+    assert repo.ids_by_genre("Action") == [10, 20]
+    assert repo.ids_by_genre("Puzzle") == [20]
+    assert repo.count() == 3
+
+    repo.upsert(20, _game("Portal", ["Puzzle"]))
+    assert repo.ids_by_genre("Action") == [10]
+
+
+def test_store_module_is_imported_once():
+    # imported under two names it would be two modules with two GameRepository classes
+    assert random_game.GameRepository is ingest_catalog.GameRepository is GameRepository
+
+
+def test_stale_ids_are_missing_or_old(repo):
+    repo.upsert(10, _game("Fresh"))
+    repo.upsert(20, _game("Old"), fetched_at=time.time() - 7200)
+    assert repo.stale_ids([10, 20, 30], max_age=3600) == [20, 30]
+
+
+def test_ingest_stores_results_and_resumes(repo, monkeypatch):
+    fetched = []
+
+    def fetch_game(appid, cc="us", lang="en"):
+        fetched.append(appid)
+        if appid == 3:
+            raise OSError("timed out")
+        return None if appid == 2 else _game(f"Game {appid}")
+
+    monkeypatch.setattr(ingest_catalog, "fetch_game", fetch_game)
+    stats = ingest_catalog.ingest(repo, [1, 2, 3, 4], workers=2, rate=1000, log=lambda message: None)
+    assert (stats["stored"], stats["unavailable"], stats["failed"], stats["skipped"]) == (2, 1, 1, 0)
+    assert repo.available_ids() == [1, 4]
+
+    # a second run only retries what failed
+    fetched.clear()
+    stats = ingest_catalog.ingest(repo, [1, 2, 3, 4], workers=2, rate=1000, log=lambda message: None)
+    assert fetched == [3]
+    assert stats["skipped"] == 3
+
+
+def test_failed_review_fetch_leaves_the_game_for_the_next_run(monkeypatch):
+    attempts = []
+    monkeypatch.setattr(ingest_catalog, "fetch_app_details", lambda appid, cc, lang: _game("Portal"))
+    monkeypatch.setattr(ingest_catalog, "fetch_review_summary", lambda appid: attempts.append(appid))
+    with pytest.raises(ingest_catalog.ReviewsUnavailable):
+        ingest_catalog.fetch_game(20, review_attempts=3, backoff=0)
+    assert attempts == [20, 20, 20]
+
+    monkeypatch.setattr(ingest_catalog, "fetch_review_summary", lambda appid: "No user reviews")
+    assert ingest_catalog.fetch_game(20, backoff=0)["review_summary"] == "No user reviews"
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    """Point random_game at a small games.txt; returns a function that writes the ids."""
+    monkeypatch.setattr(random_game, "game_catalog", random_game.game_catalog)
+    monkeypatch.setattr(random_game, "_genre_index", None)
+    path = tmp_path / "games.txt"
+
+    def use(appids):
+        path.write_text("".join(f"{appid}\n" for appid in appids))
+        random_game.configure_catalog(str(path))
+
+    return use
+
+
+def _no_network(appid, cc="us", lang="en"):
+    raise AssertionError("Steam should not be called")
+
+
+def test_random_game_is_served_from_the_local_store(repo, catalog, monkeypatch):
+    catalog([10, 20])
+    repo.upsert(10, _game("Counter-Strike"))
+    repo.upsert(20, _game("Portal"))
+    monkeypatch.setattr(random_game, "game_repository", repo)
+    monkeypatch.setattr(random_game, "get_steam_game_info", _no_network)
+
+    names = {random_game.get_random_game()["name"] for _ in range(30)}
+    assert names == {"Counter-Strike", "Portal"}
+
+
+def test_partial_store_still_draws_from_the_whole_catalog(repo, catalog, monkeypatch):
+    catalog([10, 20, 30])
+    repo.upsert(10, _game("Counter-Strike"))
+    monkeypatch.setattr(random_game, "game_repository", repo)
+    monkeypatch.setattr(random_game, "get_steam_game_info", lambda appid, cc="us", lang="en": _game(f"Steam {appid}"))
+
+    names = {random_game.get_random_game()["name"] for _ in range(60)}
+    assert names == {"Counter-Strike", "Steam 20", "Steam 30"}
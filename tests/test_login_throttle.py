@@ -0,0 +1,180 @@
+# tests for the sliding-window sign-in throttle
+
+import threading
+import time
+
+import pytest
+
+from models.user import User
+from repositories.memory_user_repository import InMemoryUserRepository
+from services import login_throttle
+from services.auth_service import AuthService, InvalidCredentialsError
+from services.login_throttle import LoginThrottle, LoginThrottledError, SlidingWindowCounter
+from services.password_hasher import HasherBusyError
+
+
+@pytest.fixture
+def now(monkeypatch):
+    clock = [6000.0]
+    monkeypatch.setattr(login_throttle.time, "time", lambda: clock[0])
+    return clock
+
+
+def test_counter_limits_within_the_window(now):
+    counter = SlidingWindowCounter(limit=3, window=60, buckets=6)
+    assert [counter.hit("k")[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = counter.hit("k")
+    assert not allowed and 0 < retry_after <= 10
+
+
+def test_counter_forgets_hits_older_than_the_window(now):
+    counter = SlidingWindowCounter(limit=2, window=60, buckets=6)
+    counter.hit("k")
+    now[0] += 30
+    counter.hit("k")
+    assert not counter.hit("k")[0]
+    # the first hit's slot rolls out, the second one is still inside the window
+    now[0] += 31
+    assert counter.hit("k")[0]
+    assert not counter.hit("k")[0]
+    now[0] += 61
+    assert counter.hit("k")[0]
+
+
+def test_peek_does_not_count(now):
+    counter = SlidingWindowCounter(limit=1, window=60)
+    assert counter.peek("k") == (True, 0.0)
+    assert counter.peek("k") == (True, 0.0)
+    assert counter.hit("k")[0]
+    assert not counter.peek("k")[0]
+
+
+def test_least_recently_used_key_is_evicted(now):
+    counter = SlidingWindowCounter(limit=1, window=60, max_keys=2)
+    for key in ("a", "b", "c"):
+        counter.hit(key)
+    stats = counter.stats()
+    assert stats["keys"] == 2 and stats["evictions"] == 1
+    assert counter.hit("a")[0]
+
+
+def test_release_uncounts_the_newest_hit(now):
+    counter = SlidingWindowCounter(limit=2, window=60, buckets=6)
+    counter.hit("k")
+    now[0] += 20
+    counter.hit("k")
+    counter.release("k")
+    assert counter.hit("k")[0]
+    assert not counter.hit("k")[0]
+    counter.release("missing")
+    assert counter.stats()["keys"] == 1
+
+
+def test_failed_logins_lock_the_email(now):
+    throttle = LoginThrottle(email_limit=3, email_window=300)
+    for _ in range(3):
+        throttle.check("a@b.com", "10.0.0.1")
+    with pytest.raises(LoginThrottledError) as error:
+        throttle.check("a@b.com", "10.0.0.2")
+    assert error.value.retry_after >= 1
+    # other accounts are unaffected
+    throttle.check("c@d.com", "10.0.0.2")
+
+
+def test_attempts_in_flight_count_against_the_email(now):
+    # no verdict has come back for any of them yet
+    throttle = LoginThrottle(email_limit=3, email_window=300)
+    for i in range(3):
+        throttle.check("a@b.com", f"10.0.0.{i}")
+    with pytest.raises(LoginThrottledError):
+        throttle.check("a@b.com", "10.0.0.9")
+
+
+def test_success_clears_the_email_failures(now):
+    throttle = LoginThrottle(email_limit=2, email_window=300)
+    throttle.check("a@b.com")
+    throttle.check("a@b.com")
+    throttle.record_success("a@b.com")
+    throttle.check("a@b.com")
+    throttle.check("a@b.com")
+
+
+def test_released_attempts_do_not_count(now):
+    throttle = LoginThrottle(email_limit=1, email_window=300)
+    throttle.check("a@b.com")
+    throttle.release("a@b.com")
+    throttle.check("a@b.com")
+
+
+def test_ip_rejection_does_not_spend_the_email(now):
+    throttle = LoginThrottle(ip_limit=1, ip_window=60, email_limit=1, email_window=300)
+    throttle.check("a@b.com", "10.0.0.1")
+    throttle.record_success("a@b.com")
+    with pytest.raises(LoginThrottledError):
+        throttle.check("a@b.com", "10.0.0.1")
+    throttle.check("a@b.com", "10.0.0.2")
+
+
+def test_every_attempt_counts_against_the_ip(now):
+    throttle = LoginThrottle(ip_limit=3, ip_window=60)
+    for i in range(3):
+        throttle.check(f"user{i}@b.com", "10.0.0.1")
+    with pytest.raises(LoginThrottledError):
+        throttle.check("user9@b.com", "10.0.0.1")
+    throttle.check("user9@b.com", "10.0.0.2")
+
+
+class SlowHasher:
+    """Stands in for PasswordHasher: verify() waits for `release`, so guesses pile up in flight."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.verifying = []
+        self.error = None
+
+    def verify(self, pwd, password_hash):
+        self.verifying.append(pwd)
+        if self.error:
+            raise self.error
+        self.release.wait(5)
+        return False
+
+    def needs_rehash(self, password_hash):
+        return False
+
+
+def test_concurrent_guesses_stop_at_the_email_limit():
+    repo = InMemoryUserRepository()
+    repo.insert(User.create_new("ada@example.com", "hash", "ada"))
+    hasher = SlowHasher()
+    auth = AuthService(repo, password_hasher=hasher, login_throttle=LoginThrottle(email_limit=3))
+    throttled = []
+
+    def guess(i):
+        try:
+            auth.login("ada@example.com", f"guess-{i}", client_ip=f"10.0.0.{i}")
+        except LoginThrottledError:
+            throttled.append(i)
+        except InvalidCredentialsError:
+            pass
+
+    threads = [threading.Thread(target=guess, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    while len(throttled) < 7 and any(thread.is_alive() for thread in threads):
+        time.sleep(0.01)
+    hasher.release.set()
+    for thread in threads:
+        thread.join()
+    assert (len(hasher.verifying), len(throttled)) == (3, 7)
+
+
+def test_busy_hasher_gives_the_attempt_back():
+    repo = InMemoryUserRepository()
+    repo.insert(User.create_new("ada@example.com", "hash", "ada"))
+    hasher = SlowHasher()
+    hasher.error = HasherBusyError("busy")
+    auth = AuthService(repo, password_hasher=hasher, login_throttle=LoginThrottle(email_limit=1))
+    for _ in range(3):
+        with pytest.raises(HasherBusyError):
+            auth.login("ada@example.com", "guess")
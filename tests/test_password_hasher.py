@@ -0,0 +1,103 @@
+# tests for the bounded bcrypt worker pool
+
+import threading
+import time
+
+import pytest
+
+from repositories.memory_user_repository import InMemoryUserRepository
+from services.auth_service import AuthService
+from services.password_hasher import PasswordHasher, HasherBusyError, cost_of
+
+PASSWORD = "Correct-Horse-9"
+
+
+@pytest.fixture
+def blocked_hasher():
+    """A one-worker hasher with no queue whose hashes wait for `release` to be set."""
+    hasher = PasswordHasher(workers=1, max_queue=0, rounds=4)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash(pwd):
+        started.set()
+        release.wait(5)
+        return "hashed"
+
+    hasher._hash = slow_hash
+    hasher.started, hasher.release = started, release
+    yield hasher
+    release.set()
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_hash_and_verify_round_trip():
+    hasher = PasswordHasher(workers=2, rounds=4)
+    password_hash = hasher.hash("hunter2")
+    assert password_hash.startswith("$2b$04$")
+    assert hasher.verify("hunter2", password_hash)
+    assert not hasher.verify("hunter3", password_hash)
+
+    stats = hasher.stats()
+    assert (stats["hashes"], stats["verifications"], stats["rejected"]) == (1, 2, 0)
+    assert stats["hash_ms"]["count"] == 1 and stats["verify_ms"]["count"] == 2
+
+
+def test_full_pool_rejects_instead_of_queueing(blocked_hasher):
+    worker = threading.Thread(target=blocked_hasher.hash, args=("first",))
+    worker.start()
+    assert blocked_hasher.started.wait(2)
+
+    with pytest.raises(HasherBusyError):
+        blocked_hasher.hash("second")
+    assert blocked_hasher.stats()["rejected"] == 1
+
+    blocked_hasher.release.set()
+    worker.join(2)
+    assert blocked_hasher.hash("third") == "hashed"
+
+
+def test_background_hash_is_skipped_when_the_pool_is_full(blocked_hasher):
+    worker = threading.Thread(target=blocked_hasher.hash, args=("first",))
+    worker.start()
+    assert blocked_hasher.started.wait(2)
+    assert blocked_hasher.hash_in_background("later") is None
+    assert blocked_hasher.stats()["background_skipped"] == 1
+
+    blocked_hasher.release.set()
+    worker.join(2)
+    assert blocked_hasher.hash_in_background("later").result(2) == "hashed"
+
+
+def test_calibrate_stays_inside_its_bounds():
+    hasher = PasswordHasher(workers=1)
+    assert hasher.calibrate(3600, min_rounds=4, max_rounds=6) == 6
+    assert hasher.calibrate(1e-9, min_rounds=4, max_rounds=6) == 4
+    assert hasher.rounds == 4
+
+
+def test_lower_cost_hashes_need_a_rehash():
+    hasher = PasswordHasher(workers=1, rounds=5)
+    assert hasher.needs_rehash(PasswordHasher(rounds=4)._hash(PASSWORD))
+    assert not hasher.needs_rehash(hasher._hash(PASSWORD))
+    assert not hasher.needs_rehash(PasswordHasher(rounds=6)._hash(PASSWORD))
+    assert cost_of("not a bcrypt hash") == -1
+
+
+def test_login_upgrades_an_old_hash():
+    repo = InMemoryUserRepository()
+    hasher = PasswordHasher(workers=1, rounds=4)
+    auth = AuthService(repo, password_hasher=hasher)
+    user, _ = auth.create_account("ada@example.com", PASSWORD, "ada")
+
+    hasher.rounds = 5
+    auth.login("ada@example.com", PASSWORD)
+    assert _wait_for(lambda: cost_of(repo.get_by_id(str(user.id)).password_hash) == 5)
+    assert hasher.verify(PASSWORD, repo.get_by_id(str(user.id)).password_hash)
@@ -0,0 +1,103 @@
+# tests for the background refresher and stale-while-revalidate lookups
+
+import threading
+import time
+
+import pytest
+
+from package import steam_game_info
+from package.game_refresher import GameRefresher
+
+KEY = ("details", 10, "us", "en")
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FakeCache:
+    def __init__(self, expiring=()):
+        self._expiring = list(expiring)
+
+    def expiring(self, before):
+        return [(key, expires_at) for key, expires_at in self._expiring if expires_at < before]
+
+
+@pytest.fixture
+def refresher_running():
+    steam_game_info.start_refresher(workers=1, scan_interval=60)
+    yield steam_game_info.refresher
+    steam_game_info.refresher.stop(timeout=2)
+
+
+def test_burst_of_stale_reads_is_refreshed_once():
+    release = threading.Event()
+    refreshed = []
+
+    def refresh(key):
+        release.wait(2)
+        refreshed.append(key)
+
+    refresher = GameRefresher(refresh, FakeCache(), workers=2, scan_interval=60).start()
+    try:
+        assert [refresher.enqueue(KEY) for _ in range(5)] == [True, False, False, False, False]
+        release.set()
+        assert _wait_for(lambda: refresher.stats()["refreshed"] == 1)
+        assert refreshed == [KEY]
+        # done, so the next stale read may queue it again
+        assert refresher.enqueue(KEY)
+    finally:
+        refresher.stop(timeout=2)
+
+
+def test_failed_refresh_is_counted():
+    def refresh(key):
+        raise OSError("Steam is down")
+
+    refresher = GameRefresher(refresh, FakeCache(), workers=1, scan_interval=60).start()
+    try:
+        refresher.enqueue(KEY)
+        assert _wait_for(lambda: refresher.stats()["failed"] == 1)
+    finally:
+        refresher.stop(timeout=2)
+
+
+def test_scan_refreshes_entries_before_they_expire():
+    refreshed = []
+    cache = FakeCache([(KEY, time.time() + 10), (("details", 20, "us", "en"), time.time() + 3600)])
+    refresher = GameRefresher(refreshed.append, cache, workers=1, scan_interval=0.05, refresh_ahead=60, jitter=0)
+    refresher.start()
+    try:
+        assert _wait_for(lambda: KEY in refreshed)
+        assert ("details", 20, "us", "en") not in refreshed
+    finally:
+        refresher.stop(timeout=2)
+
+
+def test_full_queue_drops_new_keys():
+    refresher = GameRefresher(lambda key: None, FakeCache(), max_queue=1)
+    assert refresher.enqueue(KEY)
+    assert not refresher.enqueue(("details", 20, "us", "en"))
+    assert refresher.stats()["dropped"] == 1
+
+
+def test_stale_copy_is_served_while_it_is_refetched(steam_cache, steam_server, refresher_running):
+    steam_server.add_game(10, "Counter-Strike 2")
+    steam_cache.set(KEY, {"name": "Counter-Strike", "genres": []}, ttl=-1, stale_ttl=3600)
+    steam_cache.set(("reviews", 10, "us", "en"), "Positive", ttl=3600)
+
+    assert steam_game_info.get_steam_game_info(10)["name"] == "Counter-Strike"
+    assert _wait_for(lambda: steam_cache.get(KEY) is not None)
+    assert steam_game_info.get_steam_game_info(10)["name"] == "Counter-Strike 2"
+    assert steam_server.count("details") == 1
+
+
+def test_stale_copy_is_not_served_without_a_refresher(steam_cache, steam_server):
+    steam_server.add_game(10, "Counter-Strike 2")
+    steam_cache.set(KEY, {"name": "Counter-Strike", "genres": []}, ttl=-1, stale_ttl=3600)
+    assert steam_game_info.get_steam_game_info(10)["name"] == "Counter-Strike 2"
@@ -0,0 +1,117 @@
+# tests for the pre-forking server's worker bookkeeping (no processes are forked)
+
+import asyncio
+import os
+import socket
+
+from aiohttp import web # type: ignore
+from aiohttp.test_utils import TestClient, TestServer # type: ignore
+
+import serve
+
+
+class FakeMaster(serve.Master):
+    """Master whose workers are plain records: spawning and stopping only note what happened."""
+
+    def __init__(self, size):
+        super().__init__(sock=None, size=size)
+        self.next_pid = 100
+        self.stopped = []
+
+    def _spawn(self):
+        self.next_pid += 1
+        self.workers[self.next_pid] = serve.Worker(self.next_pid, -1, max_age=None)
+
+    def _stop(self, worker):
+        worker.stopped_at = 0.0
+        self.stopped.append(worker.pid)
+
+    def ready_all(self):
+        for worker in self.workers.values():
+            worker.ready = True
+
+
+def test_starts_the_missing_workers_at_once():
+    master = FakeMaster(size=3)
+    master._scale()
+    assert len(master.workers) == 3 and master.stopped == []
+
+
+def test_planned_replacement_waits_for_the_new_worker():
+    master = FakeMaster(size=2)
+    master._scale()
+    master.ready_all()
+    old = min(master.workers)
+    master.workers[old].retiring = True
+
+    master._scale()
+    assert len(master.workers) == 3 and master.stopped == []
+    # still warming up: no second spawn, and the old worker keeps serving
+    master._scale()
+    assert len(master.workers) == 3 and master.stopped == []
+
+    master.ready_all()
+    master._scale()
+    assert master.stopped == [old]
+
+
+def test_reload_replaces_workers_one_at_a_time():
+    master = FakeMaster(size=2)
+    master._scale()
+    master.ready_all()
+    old = set(master.workers)
+    for worker in master.workers.values():
+        worker.retiring = True
+
+    for _ in range(4):
+        master._scale()
+        assert sum(1 for w in master.workers.values() if not w.ready) <= 1
+        master.ready_all()
+    assert sorted(master.stopped) == sorted(old)
+    assert sum(1 for w in master.workers.values() if w.stopped_at is None) == 2
+
+
+def test_ready_and_retire_messages_are_read_from_the_pipe():
+    master = FakeMaster(size=1)
+    read_end, write_end = os.pipe()
+    os.set_blocking(read_end, False)
+    master.workers[1] = serve.Worker(1, read_end, max_age=None)
+    try:
+        master._read_pipes()
+        os.write(write_end, serve._READY + serve._RETIRE)
+        master._read_pipes()
+        assert master.workers[1].ready and master.workers[1].retiring
+    finally:
+        os.close(read_end)
+        os.close(write_end)
+
+
+def test_worker_asks_for_retirement_after_its_request_limit():
+    read_end, write_end = os.pipe()
+    os.set_blocking(read_end, False)
+
+    async def run():
+        app = web.Application(middlewares=[serve._recycle_after(3, write_end)])
+        app.router.add_get("/", lambda request: web.Response(text="ok"))
+        async with TestClient(TestServer(app)) as client:
+            for _ in range(5):
+                async with client.get("/") as response:
+                    assert response.status == 200
+
+    try:
+        asyncio.run(run())
+        assert os.read(read_end, 64) == serve._RETIRE
+    finally:
+        os.close(read_end)
+        os.close(write_end)
+
+
+def test_bind_listens_on_an_inheritable_socket():
+    sock = serve.bind("127.0.0.1:0")
+    try:
+        assert sock.get_inheritable()
+        client = socket.create_connection(sock.getsockname()[:2], timeout=2)
+        client.close()
+    finally:
+        sock.close()
+    assert serve.default_workers() >= 1
@@ -0,0 +1,117 @@
+# tests for the in-process session token -> user cache
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.user import Session, User
+from services import session_cache
+from services.auth_service import AuthService
+from services.session_cache import SessionCache
+
+
+class FakeClock:
+    """Stands in for the time module inside session_cache only."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(session_cache, "time", clock)
+    return clock
+
+
+class FakeUserRepo:
+    """The two session calls AuthService makes, counting the lookups that reach the store."""
+
+    def __init__(self):
+        self.sessions = {}
+        self.lookups = 0
+
+    def get_user_by_session_token(self, token):
+        self.lookups += 1
+        return self.sessions.get(token)
+
+    def delete_session(self, token):
+        return self.sessions.pop(token, None) is not None
+
+
+def _user(tag="gamer"):
+    return User(id=uuid.uuid4(), email=f"{tag}@example.com", password_hash="x", gamer_tag=tag)
+
+
+def _later(days=1):
+    return datetime.utcnow() + timedelta(days=days)
+
+
+def test_hit_returns_a_copy(clock):
+    cache = SessionCache()
+    user = _user()
+    cache.put("t", user, _later())
+    cached = cache.get("t")
+    assert cached == user and cached is not user
+    cached.gamer_tag = "changed"
+    assert cache.get("t").gamer_tag == "gamer"
+
+
+def test_entry_lives_for_the_ttl_only(clock):
+    cache = SessionCache(ttl=60)
+    cache.put("t", _user(), _later())
+    clock.now += 59
+    assert cache.get("t") is not None
+    clock.now += 2
+    assert cache.get("t") is None
+
+
+def test_entry_never_outlives_its_session(clock):
+    cache = SessionCache(ttl=60)
+    cache.put("t", _user(), datetime.utcnow() - timedelta(seconds=1))
+    assert cache.get("t") is None
+
+
+def test_invalidate_user_drops_all_their_tokens(clock):
+    cache = SessionCache()
+    user, other = _user("a"), _user("b")
+    cache.put("t1", user, _later())
+    cache.put("t2", user, _later())
+    cache.put("t3", other, _later())
+    cache.invalidate_user(user.id)
+    assert cache.get("t1") is None and cache.get("t2") is None
+    assert cache.get("t3") is not None
+
+    cache.invalidate_token("t3")
+    assert cache.get("t3") is None
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = SessionCache(max_entries=2)
+    cache.put("a", _user("a"), _later())
+    cache.put("b", _user("b"), _later())
+    cache.get("a")
+    cache.put("c", _user("c"), _later())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_auth_service_serves_repeat_lookups_from_the_cache():
+    repo = FakeUserRepo()
+    user = _user()
+    repo.sessions["t"] = (Session(token="t", user_id=user.id, expires_at=_later()), user)
+    auth = AuthService(repo, session_cache=SessionCache())
+
+    assert auth.get_user_from_session("t").id == user.id
+    assert auth.get_user_from_session("t").id == user.id
+    assert repo.lookups == 1
+
+    auth.logout("t")
+    assert auth.get_user_from_session("t") is None
+    assert repo.lookups == 2
@@ -0,0 +1,90 @@
+# tests for the batched background sweep of expired sessions
+
+import time
+from contextlib import contextmanager
+
+from services.session_sweeper import SessionSweeper
+
+
+class FakeUserRepo:
+    """`expired` sessions waiting to be deleted; `lock_free` is whether this worker gets the sweep lock."""
+
+    def __init__(self, expired=0, lock_free=True, revocations=0):
+        self.expired = expired
+        self.lock_free = lock_free
+        self.revocations = revocations
+        self.batches = []
+
+    @contextmanager
+    def advisory_lock(self, name):
+        yield self.lock_free
+
+    def delete_expired_sessions(self, limit=1000):
+        deleted = min(limit, self.expired)
+        self.expired -= deleted
+        self.batches.append(deleted)
+        return deleted
+
+    def delete_expired_revocations(self, limit=1000):
+        deleted = min(limit, self.revocations)
+        self.revocations -= deleted
+        return deleted
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_deletes_in_batches_until_a_short_one():
+    repo = FakeUserRepo(expired=2500)
+    result = SessionSweeper(repo, batch_size=1000, pause=0).run_once()
+    assert repo.batches == [1000, 1000, 500]
+    assert (result["deleted"], result["skipped"]) == (2500, False)
+
+
+def test_one_run_stops_at_max_batches():
+    repo = FakeUserRepo(expired=10_000)
+    sweeper = SessionSweeper(repo, batch_size=1000, max_batches=2, pause=0)
+    assert sweeper.run_once()["deleted"] == 2000
+    assert repo.expired == 8000
+    assert sweeper.stats()["deleted_total"] == 2000
+
+
+def test_skips_when_another_worker_is_sweeping():
+    repo = FakeUserRepo(expired=10, lock_free=False)
+    sweeper = SessionSweeper(repo)
+    assert sweeper.run_once()["skipped"]
+    assert repo.batches == []
+    assert sweeper.stats()["skipped_runs"] == 1
+
+
+def test_background_loop_survives_a_failed_run():
+    class BrokenRepo(FakeUserRepo):
+        def delete_expired_sessions(self, limit=1000):
+            raise OSError("database is away")
+
+    sweeper = SessionSweeper(BrokenRepo(expired=10), interval=0.01).start()
+    try:
+        assert _wait_for(lambda: sweeper.stats()["failed_runs"] >= 2)
+    finally:
+        sweeper.stop(timeout=2)
+
+
+def test_revocations_are_left_alone_by_default():
+    class NoRevocationsTable(FakeUserRepo):
+        def delete_expired_revocations(self, limit=1000):
+            raise AssertionError("revoked_tokens only exists with signed sessions")
+
+    result = SessionSweeper(NoRevocationsTable(expired=10), pause=0).run_once()
+    assert (result["deleted"], result["revocations_deleted"]) == (10, 0)
+
+
+def test_expired_revocations_are_swept_with_signed_sessions():
+    repo = FakeUserRepo(expired=10, revocations=1500)
+    result = SessionSweeper(repo, batch_size=1000, pause=0, sweep_revocations=True).run_once()
+    assert (result["deleted"], result["revocations_deleted"], result["batches"]) == (10, 1500, 3)
@@ -0,0 +1,90 @@
+# tests for the signed session tokens and their Bloom-filter revocation set
+
+import secrets
+
+from repositories.user_store import create_user_store
+from services.session_tokens import BloomFilter, SessionTokens
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    items = [secrets.token_hex(8) for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert bloom.count == 1000
+
+
+def test_bloom_filter_false_positive_rate_is_near_target():
+    bloom = BloomFilter(capacity=2000, fp_rate=0.01)
+    for i in range(2000):
+        bloom.add(f"revoked-{i}")
+    false_positives = sum(f"live-{i}" in bloom for i in range(20_000))
+    assert false_positives / 20_000 < 0.03
+
+
+def test_empty_bloom_filter_contains_nothing():
+    bloom = BloomFilter(capacity=10)
+    assert "anything" not in bloom
+
+
+def _tokens(store=None, **options):
+    return SessionTokens("test-secret", store or create_user_store("memory"), **options)
+
+
+def test_issue_and_verify():
+    tokens = _tokens()
+    session = tokens.issue("user-1")
+    claims = tokens.verify(session.token)
+    assert claims is not None and claims.user_id == "user-1"
+
+
+def test_tampered_or_foreign_tokens_are_rejected():
+    tokens = _tokens()
+    token = tokens.issue("user-1").token
+    body, _, signature = token.rpartition(".")
+    assert tokens.verify(body.replace("user-1", "user-2") + "." + signature) is None
+    assert _tokens().verify(token) is not None
+    assert SessionTokens("other-secret", create_user_store("memory")).verify(token) is None
+    assert tokens.verify("not-a-signed-token") is None
+
+
+def test_revoke_applies_here_and_in_other_workers_after_refresh():
+    store = create_user_store("memory")
+    here, there = _tokens(store), _tokens(store)
+    here.rebuild()
+    there.rebuild()
+    token = here.issue("user-1").token
+    assert there.verify(token) is not None
+
+    assert here.revoke(token)
+    assert here.verify(token) is None
+    there.refresh()
+    assert there.verify(token) is None
+
+
+def test_revoke_user_cuts_off_every_earlier_token():
+    store = create_user_store("memory")
+    tokens = _tokens(store)
+    tokens.rebuild()
+    first, second = tokens.issue("user-1").token, tokens.issue("user-1").token
+    other = tokens.issue("user-2").token
+    tokens.revoke_user("user-1")
+    assert tokens.verify(first) is None and tokens.verify(second) is None
+    assert tokens.verify(other) is not None
+
+
+def test_refresh_drops_a_cached_not_revoked_answer():
+    store = create_user_store("memory")
+    here, there = _tokens(store), _tokens(store)
+    here.rebuild()
+    there.rebuild()
+    token = here.issue("user-1").token
+    claims = there.verify(token)
+    # as if the filter had hit falsely and the database said "not revoked"
+    there._filter.add(claims.token_id)
+    assert there.verify(token) is not None
+
+    here.revoke(token)
+    there.refresh()
+    assert there.verify(token) is None
@@ -0,0 +1,77 @@
+# tests for the Feistel permutation and the per-session no-repeat walk
+
+import threading
+
+import pytest
+
+from package.shuffle_stream import FeistelPermutation, ShuffleSessions
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 100, 1000, 4097])
+def test_permutation_is_a_bijection(size):
+    permutation = FeistelPermutation(size, seed=12345)
+    assert sorted(permutation(i) for i in range(size)) == list(range(size))
+
+
+def test_permutation_depends_on_the_seed():
+    first = [FeistelPermutation(1000, seed=1)(i) for i in range(1000)]
+    second = [FeistelPermutation(1000, seed=2)(i) for i in range(1000)]
+    assert first != second
+    assert first == [FeistelPermutation(1000, seed=1)(i) for i in range(1000)]
+
+
+def test_permutation_rejects_empty_range():
+    with pytest.raises(ValueError):
+        FeistelPermutation(0, seed=1)
+
+
+def test_session_sees_every_position_once_per_pass():
+    sessions = ShuffleSessions()
+    first_pass = [sessions.next_position("s", 50) for _ in range(50)]
+    second_pass = [sessions.next_position("s", 50) for _ in range(50)]
+    assert sorted(first_pass) == list(range(50))
+    assert sorted(second_pass) == list(range(50))
+    assert sessions.stats()["new_passes"] == 1
+
+
+def test_sessions_walk_independently():
+    sessions = ShuffleSessions()
+    a = [sessions.next_position("a", 200) for _ in range(200)]
+    b = [sessions.next_position("b", 200) for _ in range(200)]
+    assert sorted(a) == sorted(b) == list(range(200))
+    assert a != b
+
+
+def test_allowed_bitset_restricts_positions():
+    sessions = ShuffleSessions()
+    allowed = (1 << 3) | (1 << 10) | (1 << 17)
+    picks = [sessions.next_position("s", 20, allowed) for _ in range(3)]
+    assert sorted(picks) == [3, 10, 17]
+    assert sessions.next_position("s", 20, 0) is None
+
+
+def test_oldest_session_is_evicted():
+    sessions = ShuffleSessions(max_sessions=2)
+    for key in ("a", "b", "c"):
+        sessions.next_position(key, 10)
+    assert len(sessions) == 2
+    assert sessions.stats()["evictions"] == 1
+
+
+def test_concurrent_requests_never_share_a_position():
+    sessions = ShuffleSessions()
+    picks = []
+    start = threading.Barrier(8)
+
+    def draw():
+        start.wait()
+        mine = [sessions.next_position("s", 2000) for _ in range(200)]
+        picks.extend(mine)
+
+    threads = [threading.Thread(target=draw) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(picks)) == len(picks) == 1600
+    assert sessions.stats()["draws"] == 1600
@@ -0,0 +1,159 @@
+# tests for UserRepository.unit_of_work, on a fake MySQL connection
+
+import uuid
+
+import mysql.connector # type: ignore
+import pytest
+
+from models.user import Session
+from repositories.connection_pool import ConnectionPool
+from repositories.user_repository import UserRepository
+from repositories.user_store import DuplicateEmailError, DuplicateGamerTagError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append(" ".join(sql.split()))
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+
+class FakeConnection:
+    """Records statements and transaction boundaries instead of talking to MySQL."""
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.transactions = 0
+        self.in_transaction = False
+
+    def cursor(self, dictionary=False):
+        # autocommit: a lone statement never leaves a transaction open
+        return FakeCursor(self)
+
+    def start_transaction(self):
+        self.transactions += 1
+        self.in_transaction = True
+
+    def commit(self):
+        self.commits += 1
+        self.in_transaction = False
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def repo():
+    repo = UserRepository({})
+    repo.connections = []
+
+    def connect():
+        repo.connections.append(FakeConnection())
+        return repo.connections[-1]
+
+    repo.pool = ConnectionPool(connect=connect, size=2, reset=repo._reset_conn)
+    return repo
+
+
+def _session():
+    return Session(token="t-1", user_id=uuid.uuid4())
+
+
+def test_unit_of_work_runs_on_one_connection_and_commits_once(repo):
+    with repo.unit_of_work() as uow:
+        uow.delete_session("old")
+        uow.create_session(_session())
+        assert repo.pool.stats()["in_use"] == 1
+
+    [conn] = repo.connections
+    assert conn.transactions == 1
+    assert conn.commits == 1 and conn.rollbacks == 0
+    assert [statement.split()[0] for statement in conn.statements] == ["DELETE", "INSERT"]
+    assert repo.pool.stats()["in_use"] == 0
+
+
+def test_unit_of_work_rolls_back_when_the_block_raises(repo):
+    with pytest.raises(RuntimeError):
+        with repo.unit_of_work() as uow:
+            uow.create_session(_session())
+            raise RuntimeError("password changed meanwhile")
+
+    [conn] = repo.connections
+    assert conn.commits == 0 and conn.rollbacks == 1
+    assert repo.pool.stats()["in_use"] == 0
+
+
+def test_nested_unit_of_work_joins_the_outer_one(repo):
+    with repo.unit_of_work() as outer:
+        with outer.unit_of_work() as inner:
+            assert inner is outer
+            inner.create_session(_session())
+        outer.delete_session("t-1")
+
+    [conn] = repo.connections
+    assert conn.commits == 1
+
+
+def test_unit_of_work_leaves_the_repository_unbound(repo):
+    with repo.unit_of_work():
+        pass
+    repo.delete_session("t-1")
+    repo.delete_session("t-2")
+    # outside a unit of work every call borrows (and returns) a pooled connection
+    assert repo.pool.stats()["acquired"] == 3
+
+
+def test_single_calls_need_no_commit_or_rollback(repo):
+    repo.get_by_email("a@example.com")
+    repo.delete_session("t-1")
+    [conn] = repo.connections
+    assert conn.transactions == conn.commits == conn.rollbacks == 0
+
+
+def test_reads_inside_a_unit_of_work_lock_the_row(repo):
+    repo.get_by_id("u-1")
+    with repo.unit_of_work() as uow:
+        uow.get_by_id("u-1")
+    [outside, inside] = repo.connections[0].statements
+    assert not outside.endswith("FOR UPDATE")
+    assert inside.endswith("FOR UPDATE")
+
+
+@pytest.mark.parametrize("key, error", [
+    ("users.uq_users_email", DuplicateEmailError),
+    ("uq_users_gamer_tag", DuplicateGamerTagError),
+    ("email", DuplicateEmailError),
+    ("gamer_tag", DuplicateGamerTagError),
+])
+def test_duplicate_key_is_matched_by_key_name(repo, key, error):
+    # the duplicate value is user input and may itself contain a column name
+    duplicate = mysql.connector.IntegrityError(msg=f"Duplicate entry 'gamer_tag@email.com' for key '{key}'", errno=1062)
+    with pytest.raises(error):
+        repo._raise_duplicate(duplicate)
+
+
+def test_other_integrity_errors_are_left_alone(repo):
+    repo._raise_duplicate(mysql.connector.IntegrityError(msg="Column 'email' cannot be null", errno=1048))
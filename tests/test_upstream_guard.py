@@ -0,0 +1,179 @@
+# tests for the token bucket and the circuit breaker that guard calls to Steam
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests # type: ignore
+
+from package import rate_limiter, steam_game_info, upstream_guard
+from package.rate_limiter import TokenBucket
+from package.upstream_guard import CircuitBreaker, CircuitOpenError, UpstreamError, UpstreamGuard, UpstreamThrottledError
+
+
+class FakeClock:
+    """Stands in for the time module inside rate_limiter and upstream_guard only."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # the modules' own name, not the time module: asyncio's loop must keep the real clock
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(upstream_guard, "time", clock)
+    return clock
+
+
+def test_bucket_spends_its_burst_then_refills(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    clock.now += 0.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now += 100
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_bucket_acquire_waits_for_tokens(clock):
+    bucket = TokenBucket(rate=4, capacity=1)
+    assert bucket.acquire()
+    started = clock.now
+    assert bucket.acquire()
+    assert clock.now - started == pytest.approx(0.25)
+
+
+def test_bucket_acquire_gives_up_at_timeout(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.5)
+
+
+def test_bucket_acquire_async():
+    bucket = TokenBucket(rate=100, capacity=1)
+
+    async def twice():
+        return await bucket.acquire_async(), await bucket.acquire_async(timeout=1.0)
+
+    assert asyncio.run(twice()) == (True, True)
+    assert not bucket.try_acquire()
+
+
+def test_bucket_rejects_more_tokens_than_it_can_hold():
+    bucket = TokenBucket(rate=1, capacity=2)
+    with pytest.raises(ValueError):
+        bucket.acquire(3)
+    with pytest.raises(ValueError):
+        asyncio.run(bucket.acquire_async(3, timeout=1))
+    assert bucket.acquire(2)
+
+
+def test_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_breaker_release_trial_frees_the_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1)
+    breaker.record_failure()
+    clock.now += 1
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+
+
+def test_guard_short_circuits_when_open(clock):
+    guard = UpstreamGuard(rate=100, burst=100, failure_threshold=2, reset_timeout=30)
+
+    def failing():
+        raise OSError("boom")
+
+    for key in ("a", "b"):
+        with pytest.raises(OSError):
+            guard.call(key, failing)
+    with pytest.raises(CircuitOpenError):
+        guard.call("c", lambda: "never called")
+    stats = guard.stats()
+    assert stats["failures"] == 2 and stats["short_circuited"] == 1 and stats["breaker_state"] == "open"
+
+
+def test_guard_throttles_without_tripping_the_breaker(clock):
+    guard = UpstreamGuard(rate=1, burst=1, max_wait=0, failure_threshold=1)
+    assert guard.call("a", lambda: 1) == 1
+    with pytest.raises(UpstreamThrottledError):
+        guard.call("b", lambda: 2)
+    assert guard.breaker.state == "closed"
+
+
+def test_guard_ignores_errors_is_failure_rejects(clock):
+    guard = UpstreamGuard(rate=100, burst=100, failure_threshold=1, is_failure=lambda e: not isinstance(e, KeyError))
+
+    def missing():
+        raise KeyError("not on the store")
+
+    with pytest.raises(KeyError):
+        guard.call("a", missing)
+    assert guard.breaker.state == "closed"
+
+
+def test_concurrent_lookups_share_one_request(steam_cache, steam_server):
+    steam_server.add_game(10, "Counter-Strike")
+    steam_server.delay["details"] = 0.3
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        names = list(pool.map(lambda _: steam_game_info.get_steam_game_info(10)["name"], range(5)))
+    assert names == ["Counter-Strike"] * 5
+    assert steam_server.count("details") == 1
+
+
+def test_outage_opens_the_breaker(steam_cache, steam_server):
+    steam_server.status = 503
+    steam_game_info.configure_upstream(failure_threshold=1)
+    with pytest.raises(requests.HTTPError):
+        steam_game_info.get_steam_game_info(10)
+
+    with pytest.raises(UpstreamError):
+        steam_game_info.get_steam_game_info(20)
+    assert [appid for _, appid, _ in steam_server.requests] == [10] * len(steam_server.requests)
+
+
+def test_stale_copy_beats_an_error(steam_cache, steam_server):
+    steam_server.status = 503
+    steam_cache.set(("details", 10, "us", "en"), {"name": "Counter-Strike", "genres": []}, ttl=-1, stale_ttl=3600)
+    game = steam_game_info.get_steam_game_info(10)
+    assert game["name"] == "Counter-Strike"
+    assert game["review_summary"] == "No reviews"
@@ -0,0 +1,64 @@
+# tests for the versioned user schema migrations (on SQLite)
+
+import sqlite3
+
+import pytest
+
+from models.user import User, Session
+from repositories import user_schema
+from repositories.user_store import DuplicateEmailError, DuplicateGamerTagError, create_user_store
+
+
+def test_migrate_applies_every_version_once():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    applied = user_schema.migrate(conn, "sqlite", log=lambda message: None)
+    assert applied == [migration.version for migration in user_schema.MIGRATIONS]
+    assert user_schema.current_version(conn, "sqlite") == user_schema.MIGRATIONS[-1].version
+    assert user_schema.migrate(conn, "sqlite", log=lambda message: None) == []
+
+
+def test_migrations_are_numbered_in_order():
+    versions = [migration.version for migration in user_schema.MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_migrate_resumes_from_the_current_version(monkeypatch):
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    every = user_schema.MIGRATIONS
+    monkeypatch.setattr(user_schema, "MIGRATIONS", every[:1])
+    assert user_schema.migrate(conn, "sqlite", log=lambda message: None) == [1]
+    monkeypatch.setattr(user_schema, "MIGRATIONS", every)
+    assert user_schema.migrate(conn, "sqlite", log=lambda message: None) == [m.version for m in every[1:]]
+
+
+def test_failed_migration_rolls_back(monkeypatch):
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    last = user_schema.MIGRATIONS[-1].version
+    broken = user_schema.Migration(last + 1, "broken", sqlite=["CREATE TABLE half_done (id INTEGER)", "NOT SQL"])
+    monkeypatch.setattr(user_schema, "MIGRATIONS", user_schema.MIGRATIONS + [broken])
+    with pytest.raises(sqlite3.Error):
+        user_schema.migrate(conn, "sqlite", log=lambda message: None)
+    assert user_schema.current_version(conn, "sqlite") == last
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "half_done" not in tables
+
+
+def _user(email, gamer_tag):
+    return User.create_new(email=email, password_hash="x", gamer_tag=gamer_tag)
+
+
+def test_unique_keys_reject_duplicates():
+    store = create_user_store("sqlite", path=":memory:")
+    store.insert(_user("a@b.com", "tag"))
+    with pytest.raises(DuplicateEmailError):
+        store.insert(_user("a@b.com", "other"))
+    with pytest.raises(DuplicateGamerTagError):
+        store.insert(_user("c@d.com", "tag"))
+
+
+def test_every_query_uses_an_index():
+    store = create_user_store("sqlite", path=":memory:")
+    user = _user("a@b.com", "tag")
+    store.insert(user)
+    store.create_session(Session.create_new(user_id=user.id, expiry_days=1))
+    assert user_schema.check_query_plans(store)
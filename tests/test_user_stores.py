@@ -0,0 +1,121 @@
+# tests for the SQLite and in-memory user store backends
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.user import User, Session
+from repositories.user_store import create_user_store, DuplicateEmailError, DuplicateGamerTagError
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return create_user_store("sqlite", path=str(tmp_path / "users.db"))
+    return create_user_store("memory")
+
+
+def _user(email="ada@example.com", gamer_tag="ada"):
+    return User.create_new(email, "hash", gamer_tag, verification_token=f"verify-{gamer_tag}")
+
+
+def _session(user, **age):
+    session = Session.create_new(user.id)
+    if age:
+        session.expires_at = datetime.utcnow() - timedelta(**age)
+    return session
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_user_store("postgres")
+
+
+def test_users_are_found_by_every_index(store):
+    user = _user()
+    store.insert(user)
+    for found in (store.get_by_email("ada@example.com"), store.get_by_gamer_tag("ada"),
+                  store.get_by_id(str(user.id)), store.get_by_verification_token("verify-ada")):
+        assert found.id == str(user.id) and found.email == "ada@example.com"
+    assert store.get_by_email("nobody@example.com") is None
+
+
+def test_email_and_gamer_tag_are_unique(store):
+    store.insert(_user())
+    assert store.find_conflicts("ada@example.com", "ada") == {"email", "gamer_tag"}
+    with pytest.raises(DuplicateEmailError):
+        store.insert(_user(gamer_tag="other"))
+    with pytest.raises(DuplicateGamerTagError):
+        store.insert(_user(email="other@example.com"))
+
+
+def test_update_moves_the_indexes(store):
+    user = _user()
+    store.insert(user)
+    user = store.get_by_id(str(user.id))
+    user.mark_verified()
+    user.set_reset_token("reset-ada")
+    store.update(user)
+    assert store.get_by_verification_token("verify-ada") is None
+    assert store.get_by_reset_token("reset-ada").is_verified
+
+
+def test_returned_users_are_copies(store):
+    user = _user()
+    store.insert(user)
+    store.get_by_id(str(user.id)).gamer_tag = "changed"
+    assert store.get_by_id(str(user.id)).gamer_tag == "ada"
+
+
+def test_sessions_resolve_to_their_user(store):
+    user = _user()
+    store.insert(user)
+    session = _session(user)
+    store.create_session(session)
+    found_session, found_user = store.get_user_by_session_token(session.token)
+    assert found_session.token == session.token and found_user.email == "ada@example.com"
+    assert store.delete_session(session.token)
+    assert not store.delete_session(session.token)
+    assert store.get_user_by_session_token(session.token) is None
+
+
+def test_expired_sessions_are_deleted_oldest_first(store):
+    user = _user()
+    store.insert(user)
+    live = _session(user)
+    oldest, older, old = _session(user, days=3), _session(user, days=2), _session(user, days=1)
+    for session in (live, old, oldest, older):
+        store.create_session(session)
+
+    assert store.delete_expired_sessions(limit=2) == 2
+    assert store.get_session(oldest.token) is None and store.get_session(older.token) is None
+    assert store.delete_expired_sessions() == 1
+    assert store.get_session(live.token) is not None
+
+
+def test_unit_of_work_rolls_back_on_error(store):
+    kept, dropped = _user(), _user(email="bob@example.com", gamer_tag="bob")
+    store.insert(kept)
+    session = _session(kept)
+    with pytest.raises(RuntimeError):
+        with store.unit_of_work() as uow:
+            uow.insert(dropped)
+            uow.create_session(session)
+            raise RuntimeError("boom")
+    assert store.get_by_email("bob@example.com") is None
+    assert store.get_session(session.token) is None
+    assert store.get_by_email("ada@example.com") is not None
+
+    with store.unit_of_work() as uow:
+        uow.insert(dropped)
+    assert store.get_by_email("bob@example.com") is not None
+
+
+def test_advisory_lock_is_exclusive(store):
+    with store.advisory_lock("sweep") as first:
+        with store.advisory_lock("sweep") as second:
+            assert first and not second
+        with store.advisory_lock("other") as other:
+            assert other
+    with store.advisory_lock("sweep") as again:
+        assert again